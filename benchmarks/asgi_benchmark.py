@@ -0,0 +1,287 @@
+"""
+Throughput benchmark of the dashboard and detail pages under WSGI and ASGI.
+
+Seeds a temporary SQLite database with a synthetic dataset (see
+``load_benchmark.py``), then requests each page concurrently through the WSGI
+and ASGI handlers of the project, in process: from a pool of threads for WSGI and
+from concurrent tasks of an event loop for ASGI. Three modes are compared:
+
+- ``wsgi``: the sync views under the WSGI handler.
+- ``asgi-sync``: the sync views under the ASGI handler, which runs them in threads.
+- ``asgi-async``: the async views (``ASYNC_VIEWS``, see ``contracts/async_views.py``)
+  under the ASGI handler.
+
+Pages are served from the fragment cache after the first request; ``--no-cache``
+disables caching so every request loads its data.
+
+Usage:
+    python benchmarks/asgi_benchmark.py [--scale 1] [--requests 200] [--concurrency 10]
+        [--no-cache] [--output asgi_benchmark.json]
+"""
+import argparse
+import asyncio
+import importlib
+import io
+import json
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+
+import django  # noqa: E402
+from django.conf import settings  # noqa: E402
+
+from load_benchmark import seed  # noqa: E402
+
+MODES = {
+    'wsgi': False,
+    'asgi-sync': False,
+    'asgi-async': True,
+}
+
+HOST = 'localhost'
+
+
+def use_async_views(enabled):
+    """
+    Select the sync or async page views by reloading the URLconfs.
+    """
+    import config.urls
+    import contracts.urls
+    from django.urls import clear_url_caches
+
+    settings.ASYNC_VIEWS = enabled
+    importlib.reload(contracts.urls)
+    importlib.reload(config.urls)
+    clear_url_caches()
+
+
+def session_cookie():
+    """
+    Return the Cookie header of a logged in session of a new superuser.
+    """
+    from django.contrib.auth.models import User
+    from django.test import Client
+
+    client = Client()
+    client.force_login(User.objects.create_superuser('benchmark', 'benchmark@example.com', 'benchmark'))
+    return f'{settings.SESSION_COOKIE_NAME}={client.cookies[settings.SESSION_COOKIE_NAME].value}'
+
+
+def page_urls():
+    """
+    Return (name, URL) pairs of the pages to benchmark, for a sample of the data.
+    """
+    from django.urls import reverse
+    from contracts.models import Contract, ReportingPeriod
+
+    contract = Contract.objects.order_by('pk').first()
+    period = ReportingPeriod.objects.filter(contract=contract).order_by('-start_date').first()
+    return [
+        ('dashboard', reverse('contracts:dashboard')),
+        ('contract_detail', reverse('contracts:contract_detail', args=[contract.pk])),
+        ('reporting_period_detail', reverse('contracts:reporting_period_detail', args=[period.pk])),
+    ]
+
+
+def wsgi_get(application, url, cookie):
+    """
+    Request a URL from a WSGI application and return the status code.
+    """
+    statuses = []
+    environ = {
+        'REQUEST_METHOD': 'GET',
+        'PATH_INFO': url,
+        'QUERY_STRING': '',
+        'SERVER_NAME': HOST,
+        'SERVER_PORT': '80',
+        'SERVER_PROTOCOL': 'HTTP/1.1',
+        'REMOTE_ADDR': '127.0.0.1',
+        'HTTP_HOST': HOST,
+        'HTTP_COOKIE': cookie,
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': 'http',
+        'wsgi.input': io.BytesIO(),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+    response = application(environ, lambda status, headers, exc_info=None: statuses.append(status))
+    try:
+        b''.join(response)
+    finally:
+        response.close()
+    return int(statuses[0].split()[0])
+
+
+async def asgi_get(application, url, cookie):
+    """
+    Request a URL from an ASGI application and return the status code.
+    """
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': 'GET',
+        'scheme': 'http',
+        'path': url,
+        'raw_path': url.encode(),
+        'query_string': b'',
+        'root_path': '',
+        'headers': [(b'host', HOST.encode()), (b'cookie', cookie.encode())],
+        'client': ('127.0.0.1', 50000),
+        'server': (HOST, 80),
+    }
+    messages = [{'type': 'http.request', 'body': b'', 'more_body': False}]
+    disconnected = asyncio.Event()
+    statuses = []
+
+    async def receive():
+        if messages:
+            return messages.pop()
+        # The client stays connected until the response is sent
+        await disconnected.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            statuses.append(message['status'])
+
+    try:
+        await application(scope, receive, send)
+    finally:
+        disconnected.set()
+    return statuses[0]
+
+
+def summarize(latencies, elapsed, statuses):
+    latencies = sorted(latencies)
+    return {
+        'requests_per_second': round(len(latencies) / elapsed, 1),
+        'median_ms': round(statistics.median(latencies) * 1000, 1),
+        'p95_ms': round(latencies[int(len(latencies) * 0.95) - 1] * 1000, 1),
+        'errors': sum(status != 200 for status in statuses),
+    }
+
+
+def run_wsgi(url, cookie, requests, concurrency):
+    """
+    Send ``requests`` requests for a URL to the WSGI handler from ``concurrency`` threads.
+    """
+    from django.core.handlers.wsgi import WSGIHandler
+
+    application = WSGIHandler()
+
+    def timed_get(_):
+        start = time.perf_counter()
+        status = wsgi_get(application, url, cookie)
+        return time.perf_counter() - start, status
+
+    wsgi_get(application, url, cookie)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        results = list(pool.map(timed_get, range(requests)))
+    elapsed = time.perf_counter() - start
+    return summarize([latency for latency, _ in results], elapsed, [status for _, status in results])
+
+
+def run_asgi(url, cookie, requests, concurrency):
+    """
+    Send ``requests`` requests for a URL to the ASGI handler, ``concurrency`` at a time.
+    """
+    from django.core.handlers.asgi import ASGIHandler
+
+    application = ASGIHandler()
+
+    async def run():
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def timed_get():
+            async with semaphore:
+                start = time.perf_counter()
+                status = await asgi_get(application, url, cookie)
+                return time.perf_counter() - start, status
+
+        await asgi_get(application, url, cookie)
+        start = time.perf_counter()
+        results = await asyncio.gather(*(timed_get() for _ in range(requests)))
+        return results, time.perf_counter() - start
+
+    results, elapsed = asyncio.run(run())
+    return summarize([latency for latency, _ in results], elapsed, [status for _, status in results])
+
+
+def print_results(mode, results):
+    print(f'\n== {mode}')
+    for name, page in results.items():
+        print(
+            f'  {name:<28} {page["requests_per_second"]:>8.1f} req/s'
+            f'  median {page["median_ms"]:>7.1f} ms  p95 {page["p95_ms"]:>7.1f} ms  errors {page["errors"]}'
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', type=int, default=1, help='Scale factor of the dataset')
+    parser.add_argument('--requests', type=int, default=200, help='Requests per page and mode')
+    parser.add_argument('--concurrency', type=int, default=10, help='Concurrent requests')
+    parser.add_argument('--no-cache', action='store_true', help='Disable caching, so every request loads its data')
+    parser.add_argument('--output', default='asgi_benchmark.json', help='JSON file the results are written to')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        settings.DATABASES['default']['NAME'] = Path(directory) / 'asgi_benchmark.sqlite3'
+        settings.METRICS_STORE = Path(directory) / 'metrics.sqlite3'
+        if args.no_cache:
+            settings.CACHES = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+        django.setup()
+        logging.getLogger('contracts.instrumentation').setLevel(logging.ERROR)
+
+        from django.core.management import call_command
+        from django.db import connection
+
+        call_command('migrate', verbosity=0)
+        counts, _ = seed(args.scale)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        cookie = session_cookie()
+        urls = page_urls()
+        connection.close()
+
+        report = {
+            'started_at': datetime.now().isoformat(timespec='seconds'),
+            'counts': counts,
+            'requests': args.requests,
+            'concurrency': args.concurrency,
+            'cache': not args.no_cache,
+            'modes': {},
+        }
+        counts = ', '.join(f'{count} {name}' for name, count in counts.items())
+        print(f'{counts}; {args.requests} requests per page, {args.concurrency} concurrent')
+        for mode, async_views in MODES.items():
+            use_async_views(async_views)
+            run = run_wsgi if mode == 'wsgi' else run_asgi
+            results = {name: run(url, cookie, args.requests, args.concurrency) for name, url in urls}
+            report['modes'][mode] = results
+            print_results(mode, results)
+
+        # Write the request metrics before the temporary store is removed
+        from contracts import metrics
+        metrics.flush()
+
+    with open(args.output, 'w') as stream:
+        json.dump(report, stream, indent=2)
+    print(f'\nResults written to {args.output}')
+
+
+if __name__ == '__main__':
+    main()
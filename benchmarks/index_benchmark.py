@@ -0,0 +1,196 @@
+"""
+Benchmark of the compliance access path indexes on SQLite.
+
+Seeds a temporary SQLite database with a synthetic dataset, then runs the hot
+compliance queries before and after the index migration
+(0005_compliance_access_path_indexes) and prints their query plans and timings.
+
+Usage:
+    python benchmarks/index_benchmark.py [--tenants 10] [--contracts 2000] [--periods 24] [--repeat 20]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date
+from pathlib import Path
+
+from dateutil.relativedelta import relativedelta
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+
+import django  # noqa: E402
+from django.conf import settings  # noqa: E402
+
+BEFORE_MIGRATION = '0004_compliance_report_rollup'
+AFTER_MIGRATION = '0005_compliance_access_path_indexes'
+
+
+def seed(tenant_count, contract_count, period_count):
+    """
+    Seed the database with contracts, monthly reporting periods, a small SLA tree per
+    contract, measurements and generated compliance reports, using bulk inserts.
+    """
+    from contracts.models import (
+        Tenant, Contract, ReportingPeriod, ServiceLevelIndicator,
+        ServiceLevelAgreement, Measurement, ComplianceReport
+    )
+
+    random.seed(0)
+    tenants = Tenant.objects.bulk_create([Tenant(name=f'Tenant {i}') for i in range(tenant_count)])
+    slis = ServiceLevelIndicator.objects.bulk_create([
+        ServiceLevelIndicator(name=f'Priority {i} Time to Fix', unit='hours') for i in range(1, 4)
+    ])
+
+    contracts = Contract.objects.bulk_create([
+        Contract(
+            tenant=tenants[i % tenant_count],
+            name=f'Contract {i}',
+            effective_date=date(2020, 1, 1),
+            expiration_date=date(2020, 1, 1) + relativedelta(months=period_count, days=-1),
+            status=random.choice(['ACTIVE', 'ACTIVE', 'DRAFT', 'EXPIRED', 'TERMINATED']),
+        )
+        for i in range(contract_count)
+    ])
+    Contract.generate_reporting_periods_for(contracts)
+
+    roots = ServiceLevelAgreement.objects.bulk_create([
+        ServiceLevelAgreement(contract=contract, name='Mitigation') for contract in contracts
+    ])
+    ServiceLevelAgreement.objects.bulk_create([
+        ServiceLevelAgreement(
+            contract_id=root.contract_id, parent=root, name=f'{sli.name} Remediation',
+            sli=sli, threshold_type='MAX', threshold_value=10.0
+        )
+        for root in roots
+        for sli in slis
+    ], batch_size=1000)
+    ServiceLevelAgreement.rebuild_paths()
+
+    periods = list(ReportingPeriod.objects.all())
+    Measurement.objects.bulk_create([
+        Measurement(reporting_period=period, sli=sli, reported_value=value, calculated_value=value)
+        for period in periods
+        for sli in slis
+        for value in [random.uniform(0, 12)]
+    ], batch_size=1000)
+
+    for start in range(0, len(periods), 2000):
+        # The compliance trend table only exists after a later migration
+        ComplianceReport.generate_for_periods(periods[start:start + 2000], refresh_trends=False)
+
+
+def hot_queries():
+    """
+    Return (name, callable) pairs for the hot compliance queries.
+    """
+    from contracts.models import (
+        Tenant, Contract, ReportingPeriod, ServiceLevelAgreement, ComplianceReport, ComplianceReportItem
+    )
+
+    contract_id = Contract.objects.order_by('?').values_list('id', flat=True).first()
+    tenant_id = Tenant.objects.values_list('id', flat=True).first()
+    report_id = ComplianceReport.objects.order_by('?').values_list('id', flat=True).first()
+
+    return [
+        ('dashboard contract list', lambda: list(
+            Contract.objects.with_latest_compliance().select_related('tenant', 'template')
+        )),
+        ('active contract count', lambda: Contract.objects.filter(status='ACTIVE').count()),
+        ('active contracts of tenant', lambda: list(Contract.objects.filter(tenant_id=tenant_id, status='ACTIVE'))),
+        ('latest period with report', lambda: ReportingPeriod.objects.filter(
+            contract_id=contract_id, compliance_report__isnull=False
+        ).order_by('-end_date').first()),
+        ('compliant items of report', lambda: ComplianceReportItem.objects.filter(
+            report_id=report_id, is_compliant=True
+        ).count()),
+        ('root SLAs of contract', lambda: list(
+            ServiceLevelAgreement.objects.filter(contract_id=contract_id, parent__isnull=True)
+        )),
+        ('recent periods of contract', lambda: list(
+            ReportingPeriod.objects.filter(contract_id=contract_id).order_by('-start_date')[:12]
+        )),
+    ]
+
+
+def run_queries(repeat):
+    """
+    Run every hot query ``repeat`` times and return a dict mapping the query name
+    to its (SQL plans, mean time in milliseconds).
+    """
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    results = {}
+    for name, query in hot_queries():
+        with CaptureQueriesContext(connection) as context:
+            query()
+
+        plans = []
+        with connection.cursor() as cursor:
+            for captured in context.captured_queries:
+                cursor.execute('EXPLAIN QUERY PLAN ' + captured['sql'])
+                plans.append('\n'.join(f'    {row[-1]}' for row in cursor.fetchall()))
+
+        start = time.perf_counter()
+        for _ in range(repeat):
+            query()
+        elapsed = (time.perf_counter() - start) / repeat * 1000
+
+        results[name] = (plans, elapsed)
+    return results
+
+
+def benchmark(args):
+    """
+    Seed the database, run the hot queries before and after the index migration
+    and print their timings and query plans.
+    """
+    from django.core.management import call_command
+    from django.db import connection
+
+    call_command('migrate', 'contracts', BEFORE_MIGRATION, verbosity=0)
+
+    start = time.perf_counter()
+    seed(args.tenants, args.contracts, args.periods)
+    print(f'Seeded {args.contracts} contracts x {args.periods} periods in {time.perf_counter() - start:.1f}s')
+
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+    before = run_queries(args.repeat)
+
+    call_command('migrate', 'contracts', AFTER_MIGRATION, verbosity=0)
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+    after = run_queries(args.repeat)
+
+    for name, (plans_before, time_before) in before.items():
+        plans_after, time_after = after[name]
+        print(f'\n== {name}: {time_before:.2f} ms -> {time_after:.2f} ms')
+        print('  before:')
+        print('\n'.join(plans_before))
+        print('  after:')
+        print('\n'.join(plans_after))
+
+    connection.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tenants', type=int, default=10)
+    parser.add_argument('--contracts', type=int, default=2000)
+    parser.add_argument('--periods', type=int, default=24, help='Monthly reporting periods per contract')
+    parser.add_argument('--repeat', type=int, default=20, help='Runs per query when timing')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        settings.DATABASES['default']['NAME'] = Path(directory) / 'index_benchmark.sqlite3'
+        django.setup()
+        benchmark(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,207 @@
+"""
+Load benchmark of the views, report generation and period generation.
+
+For every scale factor, seeds a fresh temporary SQLite database with a synthetic
+dataset (see ``contracts/synthetic.py``) whose number of tenants is multiplied by
+the factor, times the generation steps and then requests each view, recording
+query counts and wall times. The results are printed and written to a JSON file
+so runs can be compared to spot regressions.
+
+Usage:
+    python benchmarks/load_benchmark.py [--scales 1,10,100] [--repeat 5] [--output load_benchmark.json]
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+
+import django  # noqa: E402
+from django.conf import settings  # noqa: E402
+
+# Size of the dataset at scale 1; the number of tenants is multiplied by the scale
+BASE_SCALE = {
+    'tenants': 2,
+    'contracts_per_tenant': 5,
+    'sla_depth': 3,
+    'sla_width': 2,
+    'years': 2,
+    'slis': 4,
+}
+
+
+def measure(function):
+    """
+    Call ``function`` and return its result, query count and wall time in milliseconds.
+    """
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    with CaptureQueriesContext(connection) as context:
+        start = time.perf_counter()
+        result = function()
+        elapsed = (time.perf_counter() - start) * 1000
+    return result, len(context.captured_queries), elapsed
+
+
+def seed(scale):
+    """
+    Seed the database at the given scale, timing each generation step. Returns the
+    object counts and the (queries, milliseconds) of each step.
+    """
+    from contracts import synthetic
+    from contracts.models import Contract
+
+    tenant_count = BASE_SCALE['tenants'] * scale
+    counts, steps = {}, {}
+
+    def step(name, function):
+        result, queries, elapsed = measure(function)
+        steps[name] = {'queries': queries, 'ms': round(elapsed, 1)}
+        return result
+
+    tenants = step('create_tenants', lambda: synthetic.create_tenants(tenant_count))
+    slis = step('create_slis', lambda: synthetic.create_slis(BASE_SCALE['slis']))
+    contracts = step('create_contracts', lambda: synthetic.create_contracts(
+        tenants, BASE_SCALE['contracts_per_tenant'], BASE_SCALE['years']
+    ))
+    counts['reporting_periods'] = len(step('generate_reporting_periods', lambda: Contract.generate_reporting_periods_for(contracts)))
+    counts['slas'] = step('create_sla_trees', lambda: synthetic.create_sla_trees(
+        contracts, BASE_SCALE['sla_depth'], BASE_SCALE['sla_width'], slis
+    ))
+    counts['measurements'] = step('create_measurements', lambda: synthetic.create_measurements(contracts, random.Random(0)))
+    counts['compliance_reports'] = step('generate_reports', lambda: synthetic.generate_reports(contracts))
+    counts['contracts'] = len(contracts)
+    counts['tenants'] = len(tenants)
+    return counts, steps
+
+
+def view_urls():
+    """
+    Return (name, URL) pairs of the views to benchmark, for a sample of the data.
+    """
+    from django.urls import reverse
+    from contracts.models import Contract, ReportingPeriod
+
+    contract = Contract.objects.order_by('pk').first()
+    period = ReportingPeriod.objects.filter(contract=contract).order_by('-start_date').first()
+    return [
+        ('dashboard', reverse('contracts:dashboard')),
+        ('tenant_detail', reverse('contracts:tenant_detail', args=[contract.tenant_id])),
+        ('contract_detail', reverse('contracts:contract_detail', args=[contract.pk])),
+        ('reporting_period_detail', reverse('contracts:reporting_period_detail', args=[period.pk])),
+        ('export_compliance', reverse('contracts:export_compliance') + f'?tenant={contract.tenant_id}'),
+        ('api_contracts', reverse('api:contract-list')),
+        ('api_compliance_report', reverse('api:compliancereport-detail', args=[period.compliance_report.pk])),
+        ('api_compliance_trend', reverse('api:compliance-trend') + '?by=tenant'),
+    ]
+
+
+def run_views(repeat):
+    """
+    Request every view once with an empty cache and ``repeat`` more times. Returns a
+    dict mapping the view name to its status, query counts and timings.
+    """
+    from django.contrib.auth.models import User
+    from django.core.cache import cache
+    from django.test import Client
+
+    client = Client()
+    client.force_login(User.objects.create_superuser('benchmark', 'benchmark@example.com', 'benchmark'))
+
+    def get(url):
+        response = client.get(url)
+        # Consume streaming responses so their queries are counted
+        b''.join(response) if response.streaming else response.content
+        return response
+
+    results = {}
+    for name, url in view_urls():
+        cache.clear()
+        response, cold_queries, cold_ms = measure(lambda: get(url))
+        timings, queries = [], []
+        for _ in range(repeat):
+            _, count, elapsed = measure(lambda: get(url))
+            timings.append(elapsed)
+            queries.append(count)
+        results[name] = {
+            'status': response.status_code,
+            'cold_queries': cold_queries,
+            'cold_ms': round(cold_ms, 1),
+            'queries': max(queries),
+            'median_ms': round(statistics.median(timings), 1),
+        }
+    return results
+
+
+def benchmark_scale(scale, directory, repeat):
+    """
+    Run the benchmark at one scale on a fresh database and return its results.
+    """
+    from django.core.management import call_command
+    from django.db import connection
+
+    connection.close()
+    connection.settings_dict['NAME'] = Path(directory) / f'load_benchmark_{scale}.sqlite3'
+    call_command('migrate', verbosity=0)
+
+    counts, steps = seed(scale)
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+    views = run_views(repeat)
+    connection.close()
+    return {'counts': counts, 'steps': steps, 'views': views}
+
+
+def print_results(scale, results):
+    counts = ', '.join(f'{count} {name}' for name, count in results['counts'].items())
+    print(f'\n== Scale {scale}x: {counts}')
+    for name, step in results['steps'].items():
+        print(f'  {name:<28} {step["queries"]:>6} queries {step["ms"]:>10.1f} ms')
+    for name, view in results['views'].items():
+        print(
+            f'  {name:<28} {view["queries"]:>6} queries {view["median_ms"]:>10.1f} ms'
+            f'  (cold: {view["cold_queries"]} queries, {view["cold_ms"]:.1f} ms, HTTP {view["status"]})'
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scales', default='1,10,100', help='Comma separated scale factors')
+    parser.add_argument('--repeat', type=int, default=5, help='Warm requests per view when timing')
+    parser.add_argument('--output', default='load_benchmark.json', help='JSON file the results are written to')
+    args = parser.parse_args()
+    scales = [int(scale) for scale in args.scales.split(',')]
+
+    from django.test.utils import setup_test_environment
+
+    django.setup()
+    setup_test_environment(debug=False)
+
+    report = {
+        'started_at': datetime.now().isoformat(timespec='seconds'),
+        'base_scale': BASE_SCALE,
+        'scales': {},
+    }
+    with tempfile.TemporaryDirectory() as directory:
+        settings.DATABASES['default']['NAME'] = Path(directory) / 'load_benchmark.sqlite3'
+        for scale in scales:
+            results = benchmark_scale(scale, directory, args.repeat)
+            report['scales'][str(scale)] = results
+            print_results(scale, results)
+
+    with open(args.output, 'w') as stream:
+        json.dump(report, stream, indent=2)
+    print(f'\nResults written to {args.output}')
+
+
+if __name__ == '__main__':
+    main()
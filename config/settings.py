@@ -37,10 +37,12 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'rest_framework',
     'contracts',
 ]
 
 MIDDLEWARE = [
+    'contracts.instrumentation.InstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -82,6 +84,16 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'contracts',
+    }
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
 
@@ -132,3 +144,29 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # Login redirect
 LOGIN_REDIRECT_URL = 'contracts:dashboard'
 LOGOUT_REDIRECT_URL = 'login'
+
+# Contracts
+# Number of days ahead of today that reporting periods are generated for
+# open-ended contracts (contracts without an expiration date).
+REPORTING_PERIOD_HORIZON_DAYS = 90
+
+# Request instrumentation (see contracts/instrumentation.py)
+# Requests slower than this many milliseconds are logged as warnings, and the SQL of
+# this fraction of them is included in the log line.
+INSTRUMENTATION_SLOW_REQUEST_MS = 500
+INSTRUMENTATION_SQL_SAMPLE_RATE = 0.0
+
+# Serve the dashboard and detail pages with async views (see contracts/async_views.py).
+# Enable when deploying with ASGI (config/asgi.py); under WSGI the sync views are faster.
+ASYNC_VIEWS = False
+
+# REST API
+REST_FRAMEWORK = {
+    'DEFAULT_AUTHENTICATION_CLASSES': [
+        'rest_framework.authentication.SessionAuthentication',
+        'rest_framework.authentication.BasicAuthentication',
+    ],
+    'DEFAULT_PERMISSION_CLASSES': [
+        'rest_framework.permissions.IsAuthenticated',
+    ],
+}
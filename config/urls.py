@@ -19,11 +19,14 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 from django.views.generic import RedirectView
+from contracts.metrics import metrics_view
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('accounts/', include('django.contrib.auth.urls')),
     path('contracts/', include('contracts.urls')),
+    path('api/', include('contracts.api')),
+    path('metrics', metrics_view, name='metrics'),
     path('', RedirectView.as_view(pattern_name='contracts:dashboard'), name='home'),
 ]
 
@@ -3,7 +3,7 @@ from django.utils.html import format_html
 from .models import (
     Tenant, Document, ContractTemplate, Party, Contract,
     ReportingPeriod, ServiceLevelIndicator, ServiceLevelAgreement,
-    Measurement, ComplianceReport, ComplianceReportItem
+    Measurement, ComplianceReport, ComplianceReportItem, ComplianceReportRollup, Job
 )
 
 class DocumentInline(admin.TabularInline):
@@ -74,9 +74,20 @@ class ContractAdmin(admin.ModelAdmin):
 
     def save_model(self, request, obj, form, change):
         super().save_model(request, obj, form, change)
-        # Generate reporting periods if needed
-        if obj.effective_date and obj.status == 'ACTIVE' and not obj.reporting_periods.exists():
-            obj.generate_reporting_periods()
+        # Queue the generation of any missing reporting periods; new contracts
+        # queue it themselves (see Contract.save)
+        if change and obj.effective_date and obj.status == 'ACTIVE':
+            Job.enqueue_periods(obj)
+
+    actions = ['generate_reporting_periods']
+
+    def generate_reporting_periods(self, request, queryset):
+        contracts = queryset.filter(status='ACTIVE', effective_date__isnull=False)
+        for contract in contracts:
+            Job.enqueue_periods(contract)
+
+        self.message_user(request, f"Queued reporting period generation for {len(contracts)} active contracts.")
+    generate_reporting_periods.short_description = "Generate reporting periods for selected contracts"
 
 @admin.register(ReportingPeriod)
 class ReportingPeriodAdmin(admin.ModelAdmin):
@@ -96,17 +107,9 @@ class ReportingPeriodAdmin(admin.ModelAdmin):
     actions = ['generate_compliance_reports']
 
     def generate_compliance_reports(self, request, queryset):
-        count = 0
-        for period in queryset:
-            try:
-                report = ComplianceReport.objects.get(reporting_period=period)
-            except ComplianceReport.DoesNotExist:
-                report = ComplianceReport.objects.create(reporting_period=period)
+        jobs = Job.enqueue_reports(queryset)
 
-            report.generate()
-            count += 1
-
-        self.message_user(request, f"Generated {count} compliance reports.")
+        self.message_user(request, f"Queued compliance report generation for {len(jobs)} reporting periods.")
     generate_compliance_reports.short_description = "Generate compliance reports for selected periods"
 
 @admin.register(ServiceLevelIndicator)
@@ -143,22 +146,28 @@ class ComplianceReportItemInline(admin.TabularInline):
     def has_add_permission(self, request, obj=None):
         return False
 
+class ComplianceReportRollupInline(admin.TabularInline):
+    model = ComplianceReportRollup
+    extra = 0
+    readonly_fields = ('sla', 'total_items', 'compliant_items', 'compliance_percentage', 'is_compliant')
+    can_delete = False
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
 @admin.register(ComplianceReport)
 class ComplianceReportAdmin(admin.ModelAdmin):
     list_display = ('reporting_period', 'generated_at', 'compliance_status')
     list_filter = ('reporting_period__contract__tenant',)
     search_fields = ('reporting_period__contract__name',)
-    readonly_fields = ('generated_at', 'updated_at')
-    inlines = [ComplianceReportItemInline]
+    readonly_fields = ('total_items', 'compliant_items', 'compliance_percentage', 'generated_at', 'updated_at')
+    inlines = [ComplianceReportRollupInline, ComplianceReportItemInline]
 
     def compliance_status(self, obj):
-        items = obj.items.all()
-        if not items:
+        if obj.compliance_percentage is None:
             return 'No data'
 
-        compliant_count = items.filter(is_compliant=True).count()
-        total_count = items.count()
-        percentage = (compliant_count / total_count) * 100 if total_count > 0 else 0
+        percentage = obj.compliance_percentage
 
         if percentage == 100:
             return format_html('<span style="color: green;">Fully Compliant (100%)</span>')
@@ -167,14 +176,14 @@ class ComplianceReportAdmin(admin.ModelAdmin):
         else:
             return format_html('<span style="color: red;">Non-Compliant ({:.1f}%)</span>', percentage)
     compliance_status.short_description = 'Compliance Status'
+    compliance_status.admin_order_field = 'compliance_percentage'
 
     actions = ['regenerate_reports']
 
     def regenerate_reports(self, request, queryset):
-        for report in queryset:
-            report.generate()
+        jobs = Job.enqueue_reports(ReportingPeriod.objects.filter(compliance_report__in=queryset))
 
-        self.message_user(request, f"Regenerated {queryset.count()} compliance reports.")
+        self.message_user(request, f"Queued regeneration of {len(jobs)} compliance reports.")
     regenerate_reports.short_description = "Regenerate selected compliance reports"
 
 @admin.register(Tenant)
@@ -182,3 +191,28 @@ class TenantAdmin(admin.ModelAdmin):
     list_display = ('name', 'created_at', 'updated_at')
     search_fields = ('name',)
     readonly_fields = ('created_at', 'updated_at')
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('kind', 'key', 'status', 'attempts', 'created_at', 'started_at', 'finished_at')
+    list_filter = ('status', 'kind')
+    search_fields = ('key',)
+    readonly_fields = (
+        'kind', 'key', 'contract', 'reporting_period', 'status', 'attempts', 'result', 'error',
+        'created_at', 'started_at', 'finished_at'
+    )
+
+    def has_add_permission(self, request):
+        return False
+
+    actions = ['retry_jobs']
+
+    def retry_jobs(self, request, queryset):
+        jobs = list(queryset.filter(status=Job.FAILED).select_related('contract', 'reporting_period'))
+        Job.enqueue_reports([job.reporting_period for job in jobs if job.kind == Job.GENERATE_REPORT])
+        for job in jobs:
+            if job.kind == Job.GENERATE_PERIODS:
+                Job.enqueue_periods(job.contract)
+
+        self.message_user(request, f"Queued {len(jobs)} failed jobs again.")
+    retry_jobs.short_description = "Retry selected failed jobs"
@@ -0,0 +1,334 @@
+"""
+REST API for integrations: read-only endpoints and measurement ingestion.
+
+Every read-only endpoint answers conditional requests: responses carry an
+``ETag`` and a ``Last-Modified`` header derived from the ``updated_at`` stamps of
+the listed objects, and a request with a matching ``If-None-Match`` or
+``If-Modified-Since`` header gets an empty 304 response after a single aggregate
+query.
+"""
+import datetime
+import hashlib
+from functools import partial
+
+from django.db.models import Count, Max, Prefetch
+from django.urls import include, path
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+from rest_framework import permissions, routers, viewsets
+from rest_framework.decorators import action
+from rest_framework.pagination import CursorPagination
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .ingestion import ROW_READERS, ingest_measurements
+from .models import (
+    Tenant, Contract, ReportingPeriod, ComplianceReport,
+    ComplianceReportItem, ComplianceReportRollup, ComplianceTrend, Measurement, percentage
+)
+from .serializers import (
+    TenantSerializer, ContractSerializer, ReportingPeriodSerializer,
+    ComplianceReportSerializer, ComplianceReportDetailSerializer, serialize_sla_statistics,
+    serialize_sla_tree
+)
+from .sla_tree import get_sla_tree, get_sla_tree_version
+from .sli_statistics import contract_sla_statistics
+
+# Default and maximum number of objects per page
+API_PAGE_SIZE = 50
+MAX_API_PAGE_SIZE = 500
+
+
+class IdCursorPagination(CursorPagination):
+    """
+    Cursor pagination in id order, which is unique and never changes.
+    """
+    ordering = 'id'
+    page_size = API_PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = MAX_API_PAGE_SIZE
+
+
+# Dimensions the compliance trend can be broken down by
+TREND_DIMENSIONS = ('tenant', 'sli')
+
+
+def _id_param(params, name):
+    value = params.get(name, '')
+    return int(value) if value.isdigit() else None
+
+
+def _parse_month(value):
+    """
+    Parse a YYYY-MM month into the date of its first day.
+    """
+    try:
+        return datetime.datetime.strptime(value, '%Y-%m').date()
+    except ValueError:
+        raise ValueError(f'Invalid month {value!r}, expected YYYY-MM')
+
+
+class ConditionalResponseMixin:
+    """
+    Answer conditional GET requests.
+
+    The validators are computed with one aggregate query over the objects a response
+    would contain: the number of objects, to detect deletions, the latest value of
+    each of ``modified_fields``, and the number of distinct related objects of each
+    of ``counted_fields``, to detect deletions of related objects shown in the
+    response.
+    """
+    modified_fields = ('updated_at',)
+    counted_fields = ()
+
+    def _validators(self, queryset, *extra, modified_fields=None, counted_fields=None):
+        """
+        Return the (ETag, last modified) validators of a queryset. Any ``extra``
+        parts are included in the ETag. The fields default to those of the view.
+        """
+        modified_fields = self.modified_fields if modified_fields is None else modified_fields
+        counted_fields = self.counted_fields if counted_fields is None else counted_fields
+        aggregates = {
+            **{f'modified_{i}': Max(field) for i, field in enumerate(modified_fields)},
+            **{f'count_{i}': Count(field, distinct=True) for i, field in enumerate(counted_fields)},
+        }
+        stamps = queryset.order_by().aggregate(count=Count('pk', distinct=True), **aggregates)
+
+        modified = [stamps[f'modified_{i}'] for i in range(len(modified_fields))]
+        counts = [stamps[f'count_{i}'] for i in range(len(counted_fields))]
+        last_modified = max((stamp for stamp in modified if stamp is not None), default=None)
+        return self._etag(stamps['count'], *counts, *modified, *extra), last_modified
+
+    def _etag(self, *parts):
+        """
+        Return an ETag for the given parts and the representation requested.
+        """
+        key = '|'.join([self.request.get_full_path(), self.request.accepted_renderer.format, *map(str, parts)])
+        return quote_etag(hashlib.md5(key.encode()).hexdigest())
+
+    def _conditional(self, etag, last_modified, render):
+        timestamp = int(last_modified.timestamp()) if last_modified else None
+        response = get_conditional_response(self.request, etag=etag, last_modified=timestamp)
+        if response is None:
+            response = render()
+            if response.status_code != 200:
+                return response
+
+        response['ETag'] = etag
+        if timestamp is not None:
+            response['Last-Modified'] = http_date(timestamp)
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+
+class ConditionalReadOnlyViewSet(ConditionalResponseMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    Read-only viewset answering conditional GET requests.
+    """
+    pagination_class = IdCursorPagination
+    lookup_value_regex = r'\d+'
+
+    def list(self, request, *args, **kwargs):
+        etag, last_modified = self._validators(self.filter_queryset(self.get_queryset()))
+        return self._conditional(etag, last_modified, partial(super().list, request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset()).filter(pk=kwargs[self.lookup_field])
+        etag, last_modified = self._validators(queryset)
+        return self._conditional(etag, last_modified, partial(super().retrieve, request, *args, **kwargs))
+
+
+class TenantViewSet(ConditionalReadOnlyViewSet):
+    queryset = Tenant.objects.all()
+    serializer_class = TenantSerializer
+
+
+class ContractViewSet(ConditionalReadOnlyViewSet):
+    """
+    Contracts, filterable by ``tenant`` and ``status``. The validators cover the
+    tenant and template names included in the response.
+    """
+    serializer_class = ContractSerializer
+    modified_fields = ('updated_at', 'tenant__updated_at', 'template__updated_at')
+    counted_fields = ('template',)
+
+    def get_queryset(self):
+        contracts = Contract.objects.select_related('tenant', 'template')
+        tenant = _id_param(self.request.query_params, 'tenant')
+        if tenant is not None:
+            contracts = contracts.filter(tenant_id=tenant)
+        status = self.request.query_params.get('status')
+        if status in dict(Contract.STATUS_CHOICES):
+            contracts = contracts.filter(status=status)
+        return contracts
+
+    @action(detail=True, url_path='sla-tree')
+    def sla_tree(self, request, pk=None):
+        """
+        The SLA tree of a contract as nested nodes. The ETag is the version stamp
+        of the cached tree, so unchanged trees are answered without any query.
+        """
+        contract_id = int(pk)
+        etag = self._etag(get_sla_tree_version(contract_id))
+
+        def render():
+            contract = self.get_object()
+            return Response(serialize_sla_tree(get_sla_tree(contract.id)))
+
+        return self._conditional(etag, None, render)
+
+    @action(detail=True)
+    def statistics(self, request, pk=None):
+        """
+        Statistics of the measurement history of every SLA of a contract. The ETag
+        covers the contract's measurements and the version of its SLA tree.
+        """
+        contract_id = int(pk)
+        measurements = Measurement.objects.filter(reporting_period__contract_id=contract_id)
+        etag, _ = self._validators(
+            measurements, get_sla_tree_version(contract_id), modified_fields=('updated_at',), counted_fields=()
+        )
+
+        def render():
+            contract = self.get_object()
+            return Response(serialize_sla_statistics(contract_sla_statistics(contract.id)))
+
+        return self._conditional(etag, None, render)
+
+
+class ReportingPeriodViewSet(ConditionalReadOnlyViewSet):
+    """
+    Reporting periods with their compliance summary, filterable by ``contract``.
+    """
+    serializer_class = ReportingPeriodSerializer
+    modified_fields = ('created_at', 'compliance_report__updated_at')
+    counted_fields = ('compliance_report',)
+
+    def get_queryset(self):
+        periods = ReportingPeriod.objects.select_related('compliance_report')
+        contract = _id_param(self.request.query_params, 'contract')
+        if contract is not None:
+            periods = periods.filter(contract_id=contract)
+        return periods
+
+
+class ComplianceReportViewSet(ConditionalReadOnlyViewSet):
+    """
+    Compliance reports, filterable by ``contract`` and ``reporting_period``.
+    A single report includes its items and parent SLA rollups.
+    """
+
+    def get_serializer_class(self):
+        if self.action == 'retrieve':
+            return ComplianceReportDetailSerializer
+        return ComplianceReportSerializer
+
+    def get_queryset(self):
+        reports = ComplianceReport.objects.select_related('reporting_period')
+        params = self.request.query_params
+        contract = _id_param(params, 'contract')
+        if contract is not None:
+            reports = reports.filter(reporting_period__contract_id=contract)
+        period = _id_param(params, 'reporting_period')
+        if period is not None:
+            reports = reports.filter(reporting_period_id=period)
+
+        if self.action == 'retrieve':
+            reports = reports.prefetch_related(
+                Prefetch('items', ComplianceReportItem.objects.select_related('sla', 'measurement__sli').order_by('sla__path')),
+                Prefetch('rollups', ComplianceReportRollup.objects.select_related('sla').order_by('sla__path')),
+            )
+        return reports
+
+
+class ComplianceTrendView(ConditionalResponseMixin, APIView):
+    """
+    Monthly compliance trend from the pre-aggregated ComplianceTrend rows.
+
+    Query parameters: ``start`` and ``end`` months (YYYY-MM), ``tenant`` and ``sli``
+    ids to filter by, and ``by``, a comma separated list of the dimensions
+    (``tenant``, ``sli``) to break the series down by.
+    """
+
+    def get(self, request):
+        params = request.query_params
+        trends = ComplianceTrend.objects.all()
+        try:
+            if params.get('start'):
+                trends = trends.filter(month__gte=_parse_month(params['start']))
+            if params.get('end'):
+                trends = trends.filter(month__lte=_parse_month(params['end']))
+        except ValueError as e:
+            return Response({'detail': str(e)}, status=400)
+        for name in ('tenant', 'sli'):
+            value = _id_param(params, name)
+            if value is not None:
+                trends = trends.filter(**{f'{name}_id': value})
+
+        group_by = [name for name in TREND_DIMENSIONS if name in params.get('by', '').split(',')]
+        etag, last_modified = self._validators(trends)
+
+        def render():
+            return Response([
+                {
+                    'month': row['month'].strftime('%Y-%m'),
+                    **{name: row[f'{name}_id'] for name in group_by},
+                    'total_items': row['total'],
+                    'compliant_items': row['compliant'],
+                    'compliance_percentage': percentage(row['compliant'], row['total']),
+                }
+                for row in trends.series(group_by)
+            ])
+
+        return self._conditional(etag, last_modified, render)
+
+
+# Request content types accepted by the measurement ingestion endpoint
+INGEST_CONTENT_TYPES = {
+    'text/csv': 'csv',
+    'application/jsonl': 'jsonl',
+    'application/x-jsonlines': 'jsonl',
+    'application/x-ndjson': 'ndjson',
+    'application/ndjson': 'ndjson',
+}
+
+
+class CanAddMeasurements(permissions.BasePermission):
+    def has_permission(self, request, view):
+        return request.user.has_perm('contracts.add_measurement')
+
+
+class MeasurementIngestView(APIView):
+    """
+    Bulk ingest measurements from a CSV or JSON Lines request body. The format is
+    taken from the ``input_format`` query parameter or the request content type;
+    ``format`` is DRF's renderer override.
+
+    Monitoring exporters authenticate with HTTP Basic credentials of a user with
+    the "Can add measurement" permission; session clients need a CSRF token.
+    """
+    permission_classes = [permissions.IsAuthenticated, CanAddMeasurements]
+
+    def post(self, request):
+        format = request.query_params.get('input_format') or INGEST_CONTENT_TYPES.get(request.content_type)
+        if format not in ROW_READERS:
+            return Response({'detail': f'Unsupported format, expected one of {", ".join(ROW_READERS)}'}, status=415)
+
+        # Stream the body line by line instead of parsing it into request.data
+        lines = (line.decode(request.encoding or 'utf-8') for line in request.stream or ())
+        return Response(ingest_measurements(lines, format).as_dict())
+
+
+router = routers.SimpleRouter()
+router.register('tenants', TenantViewSet, basename='tenant')
+router.register('contracts', ContractViewSet, basename='contract')
+router.register('reporting-periods', ReportingPeriodViewSet, basename='reportingperiod')
+router.register('compliance-reports', ComplianceReportViewSet, basename='compliancereport')
+
+app_name = 'api'
+
+urlpatterns = [
+    path('compliance-trend/', ComplianceTrendView.as_view(), name='compliance-trend'),
+    path('measurements/ingest/', MeasurementIngestView.as_view(), name='measurement-ingest'),
+    path('', include(router.urls)),
+]
@@ -0,0 +1,229 @@
+"""
+Async versions of the read-heavy pages: the dashboard, contract detail and
+reporting period detail views, served when ``ASYNC_VIEWS`` is enabled (see
+``urls.py``) in an ASGI deployment.
+
+They load their data with Django's async ORM and run independent queries with
+``asyncio.gather``. The data shown only in cached fragments (see ``fragments.py``)
+is prefetched concurrently when the fragment is missing from the cache, and is
+otherwise passed as lazy objects like in the sync views, so a fragment that
+expires before it is rendered still loads its data. Templates are rendered in a
+thread with ``sync_to_async``, as the template engine is synchronous.
+"""
+import asyncio
+from functools import partial, wraps
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.views import redirect_to_login
+from django.shortcuts import aget_object_or_404, render
+
+from .fragments import FRAGMENT_CACHE_TIMEOUT, afragment_cached, get_fragment_versions, lazy, lazy_context
+from .models import Tenant, Contract, ReportingPeriod, ComplianceReport, Job
+from .pagination import CONTRACT_LIST_CONTEXT_NAMES, contract_list_context
+from .sla_tree import build_sla_rows, get_sla_tree_version
+from .sli_statistics import contract_sla_statistics
+
+
+def login_required(view):
+    """
+    Async counterpart of ``django.contrib.auth.decorators.login_required``.
+    """
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        user = await request.auser()
+        if not user.is_authenticated:
+            return redirect_to_login(request.get_full_path())
+        return await view(request, *args, **kwargs)
+    return wrapper
+
+
+async def _list(queryset):
+    return [obj async for obj in queryset]
+
+
+async def _versions(contract_id, **objects):
+    """
+    Return the fragment versions of the given objects and the SLA tree version of a contract.
+    """
+    versions, sla_tree_version = await asyncio.gather(
+        sync_to_async(get_fragment_versions)(**objects),
+        sync_to_async(get_sla_tree_version)(contract_id),
+    )
+    return {**versions, 'sla_tree': sla_tree_version}
+
+
+async def _prefetch(cached, function, *args):
+    """
+    Return the data of a fragment from a sync loader: run in a thread now if the
+    fragment is missing from the cache, and otherwise as a lazy object, in case
+    the fragment expires before it is rendered.
+    """
+    if cached:
+        return lazy(partial(function, *args))
+    return await sync_to_async(function)(*args)
+
+
+async def _render(request, template_name, context):
+    return await sync_to_async(render)(request, template_name, context)
+
+
+@login_required
+async def dashboard(request):
+    """
+    Dashboard view showing contracts and summary statistics.
+    """
+    contracts = Contract.objects.with_latest_compliance().select_related('tenant', 'template')
+
+    def load_listing():
+        list_context = contract_list_context(request, contracts)
+        return {'contracts': list_context['page'], **list_context}
+
+    fragment_versions = await sync_to_async(get_fragment_versions)(contracts=None)
+    context = {
+        **lazy_context(load_listing, ('contracts', *CONTRACT_LIST_CONTEXT_NAMES)),
+        'tenants': Tenant.objects.order_by('name'),
+        'total_contracts': lazy(Contract.objects.count),
+        'total_active_contracts': lazy(Contract.objects.filter(status='ACTIVE').count),
+        'fragment_versions': fragment_versions,
+        'fragment_timeout': FRAGMENT_CACHE_TIMEOUT,
+    }
+
+    if not await afragment_cached('dashboard', fragment_versions['contracts'], request.get_full_path()):
+        listing, tenants, total_contracts, total_active_contracts = await asyncio.gather(
+            sync_to_async(load_listing)(),
+            _list(Tenant.objects.order_by('name')),
+            Contract.objects.acount(),
+            Contract.objects.filter(status='ACTIVE').acount(),
+        )
+        context.update({
+            **listing,
+            'tenants': tenants,
+            'total_contracts': total_contracts,
+            'total_active_contracts': total_active_contracts,
+        })
+
+    return await _render(request, 'contracts/dashboard.html', context)
+
+
+@login_required
+async def contract_detail(request, contract_id):
+    """
+    Contract detail view showing all reporting periods and their compliance status,
+    the SLA tree and SLI statistics.
+    """
+    contract = await aget_object_or_404(Contract.objects.select_related('tenant', 'template'), id=contract_id)
+
+    months = request.GET.get('months', '12')
+    try:
+        months = int(months)
+        if months <= 0:
+            months = 12
+    except ValueError:
+        months = 12
+
+    all_periods = ReportingPeriod.objects.filter(contract=contract).select_related('compliance_report').order_by('-start_date')
+    reporting_periods, all_periods_count, periods_job, fragment_versions = await asyncio.gather(
+        _list(all_periods[:months]),
+        all_periods.acount(),
+        Job.alatest(Job.periods_key(contract.id)),
+        _versions(contract.id, contract=contract.id),
+    )
+
+    vary_on = (contract.id, fragment_versions['contract'], fragment_versions['sla_tree'])
+    overview_cached, statistics_cached = await asyncio.gather(
+        afragment_cached('contract_overview', *vary_on),
+        afragment_cached('contract_statistics', *vary_on),
+    )
+    jobs, sla_rows, sla_statistics = await asyncio.gather(
+        sync_to_async(Job.latest_by_key)([Job.report_key(period.id) for period in reporting_periods]),
+        _prefetch(overview_cached, build_sla_rows, contract),
+        _prefetch(statistics_cached, contract_sla_statistics, contract.id),
+    )
+
+    for period in reporting_periods:
+        period.job = jobs.get(Job.report_key(period.id))
+        try:
+            period.compliance_percentage = period.compliance_report.compliance_percentage
+            period.has_report = True
+        except ComplianceReport.DoesNotExist:
+            period.compliance_percentage = None
+            period.has_report = False
+
+    context = {
+        'contract': contract,
+        'reporting_periods': reporting_periods,
+        'all_periods_count': all_periods_count,
+        'months': months,
+        'sla_rows': sla_rows,
+        'sla_statistics': sla_statistics,
+        'periods_job': periods_job,
+        'fragment_versions': fragment_versions,
+        'fragment_timeout': FRAGMENT_CACHE_TIMEOUT,
+    }
+
+    return await _render(request, 'contracts/contract_detail.html', context)
+
+
+def _load_report(period, report):
+    """
+    Load the report items and SLA tree rows of a reporting period's report.
+    """
+    if report is None:
+        return {'report_items': [], 'sla_rows': build_sla_rows(period.contract)}
+    report_items = list(report.items.select_related('sla', 'measurement', 'measurement__sli'))
+    return {
+        'report_items': report_items,
+        'sla_rows': build_sla_rows(period.contract, report_items, report.rollups.all()),
+    }
+
+
+@login_required
+async def reporting_period_detail(request, period_id):
+    """
+    Reporting period detail view showing the compliance report with SLA details.
+    """
+    period = await aget_object_or_404(
+        ReportingPeriod.objects.select_related('contract__tenant', 'compliance_report'), id=period_id
+    )
+    job, fragment_versions = await asyncio.gather(
+        Job.alatest(Job.report_key(period.id)),
+        _versions(period.contract_id, contract=period.contract_id, period=period.id),
+    )
+
+    # Check if a compliance report exists, if not, queue its generation
+    try:
+        report = period.compliance_report
+    except ComplianceReport.DoesNotExist:
+        report = None
+        if job is None or not job.is_active:
+            job = (await sync_to_async(Job.enqueue_reports)([period]))[0]
+
+    context = {
+        'period': period,
+        'contract': period.contract,
+        'report': report,
+        'job': job,
+        'compliance_percentage': report.compliance_percentage if report else None,
+        'compliant_items': report.compliant_items if report else 0,
+        'total_items': report.total_items if report else 0,
+        'fragment_versions': fragment_versions,
+        'fragment_timeout': FRAGMENT_CACHE_TIMEOUT,
+    }
+
+    cached = await afragment_cached(
+        'reporting_period_report', period.id,
+        fragment_versions['period'], fragment_versions['contract'], fragment_versions['sla_tree'],
+    )
+    if cached:
+        context.update(lazy_context(partial(_load_report, period, report), ('report_items', 'sla_rows')))
+    elif report is None:
+        context.update(await sync_to_async(_load_report)(period, report))
+    else:
+        report_items, rollups = await asyncio.gather(
+            _list(report.items.select_related('sla', 'measurement', 'measurement__sli')),
+            _list(report.rollups.all()),
+        )
+        context['report_items'] = report_items
+        context['sla_rows'] = await sync_to_async(build_sla_rows)(period.contract, report_items, rollups)
+
+    return await _render(request, 'contracts/reporting_period_detail.html', context)
@@ -0,0 +1,224 @@
+"""
+Streaming export of compliance report items as CSV or XLSX.
+
+Rows are read with a server-side iterator and written out one at a time, so memory
+use stays flat regardless of how many items are exported. XLSX workbooks are
+written as a streamed zip archive with inline strings, which needs no third-party
+spreadsheet library.
+"""
+import csv
+import datetime
+import re
+import zipfile
+from itertools import chain
+from xml.sax.saxutils import escape
+
+from django.utils.dateparse import parse_date
+
+from .models import ComplianceReportItem
+
+# Number of rows fetched from the database per round trip
+EXPORT_CHUNK_SIZE = 2000
+
+# Minimum number of bytes buffered before an XLSX chunk is sent
+XLSX_FLUSH_BYTES = 64 * 1024
+
+# (header, field lookup) pairs of the exported columns
+EXPORT_COLUMNS = [
+    ('Tenant', 'report__reporting_period__contract__tenant__name'),
+    ('Contract ID', 'report__reporting_period__contract_id'),
+    ('Contract', 'report__reporting_period__contract__name'),
+    ('Period Start', 'report__reporting_period__start_date'),
+    ('Period End', 'report__reporting_period__end_date'),
+    ('SLA', 'sla__name'),
+    ('SLI', 'measurement__sli__name'),
+    ('Unit', 'measurement__sli__unit'),
+    ('Threshold Type', 'sla__threshold_type'),
+    ('Threshold Value', 'sla__threshold_value'),
+    ('Reported Value', 'measurement__reported_value'),
+    ('Calculated Value', 'measurement__calculated_value'),
+    ('Disputed', 'measurement__is_disputed'),
+    ('Compliant', 'is_compliant'),
+]
+
+EXPORT_STATUSES = {
+    'compliant': True,
+    'non_compliant': False,
+}
+
+EXPORT_CONTENT_TYPES = {
+    'csv': 'text/csv',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+
+def export_rows(tenant=None, contract=None, start_date=None, end_date=None, status=None):
+    """
+    Return a queryset of exported row tuples, optionally limited to a tenant, a
+    contract, reporting periods overlapping a date range and a compliance status
+    ('compliant' or 'non_compliant').
+    """
+    items = ComplianceReportItem.objects.all()
+    if tenant is not None:
+        items = items.filter(report__reporting_period__contract__tenant_id=tenant)
+    if contract is not None:
+        items = items.filter(report__reporting_period__contract_id=contract)
+    if start_date is not None:
+        items = items.filter(report__reporting_period__end_date__gte=start_date)
+    if end_date is not None:
+        items = items.filter(report__reporting_period__start_date__lte=end_date)
+    if status is not None:
+        items = items.filter(is_compliant=EXPORT_STATUSES[status])
+
+    return items.order_by(
+        'report__reporting_period__contract_id', 'report__reporting_period__start_date', 'sla__path'
+    ).values_list(*(lookup for _, lookup in EXPORT_COLUMNS))
+
+
+def parse_export_filters(params):
+    """
+    Convert string filter parameters (``tenant``, ``contract``, ``start``, ``end``
+    and ``status``) into keyword arguments for export_rows(). Raises ValueError
+    for invalid values.
+    """
+    filters = {}
+    for name in ('tenant', 'contract'):
+        if params.get(name):
+            filters[name] = int(params[name])
+    for name, key in (('start', 'start_date'), ('end', 'end_date')):
+        if params.get(name):
+            filters[key] = parse_date(params[name])
+            if filters[key] is None:
+                raise ValueError(f'Invalid {name} date {params[name]!r}')
+    if params.get('status'):
+        if params['status'] not in EXPORT_STATUSES:
+            raise ValueError(f'Invalid status {params["status"]!r}, expected one of {", ".join(EXPORT_STATUSES)}')
+        filters['status'] = params['status']
+    return filters
+
+
+class _Echo:
+    """
+    File-like object that returns what is written to it, for use with csv.writer.
+    """
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(rows):
+    """
+    Yield the exported rows as CSV lines, starting with a header line.
+    """
+    writer = csv.writer(_Echo())
+    yield writer.writerow([header for header, _ in EXPORT_COLUMNS])
+    for row in rows.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        yield writer.writerow(row)
+
+
+class _ChunkBuffer:
+    """
+    Unseekable file-like object collecting the bytes written by zipfile.
+    """
+
+    def __init__(self):
+        self.chunks = []
+        self.size = 0
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.size += len(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def pop(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        self.size = 0
+        return data
+
+
+XLSX_PARTS = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Target="xl/workbook.xml" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"/>'
+        '</Relationships>'
+    ),
+    'xl/workbook.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Compliance" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'
+    ),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Target="worksheets/sheet1.xml" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet"/>'
+        '</Relationships>'
+    ),
+}
+
+XLSX_SHEET_START = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+)
+XLSX_SHEET_END = '</sheetData></worksheet>'
+
+# Control characters that are not allowed in XML
+_INVALID_XML_CHARS = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+
+def _xlsx_cell(value):
+    if value is None:
+        return '<c/>'
+    if isinstance(value, bool):
+        return f'<c t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, (int, float)):
+        return f'<c><v>{value!r}</v></c>'
+    if isinstance(value, datetime.date):
+        value = value.isoformat()
+    text = escape(_INVALID_XML_CHARS.sub('', str(value)))
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+def iter_xlsx(rows):
+    """
+    Yield the exported rows as chunks of an XLSX workbook, starting with a header row.
+    """
+    buffer = _ChunkBuffer()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name, content in XLSX_PARTS.items():
+            archive.writestr(name, content)
+
+        with archive.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as sheet:
+            sheet.write(XLSX_SHEET_START.encode())
+            headers = [header for header, _ in EXPORT_COLUMNS]
+            for row in chain([headers], rows.iterator(chunk_size=EXPORT_CHUNK_SIZE)):
+                sheet.write(f'<row>{"".join(_xlsx_cell(value) for value in row)}</row>'.encode())
+                if buffer.size >= XLSX_FLUSH_BYTES:
+                    yield buffer.pop()
+            sheet.write(XLSX_SHEET_END.encode())
+    yield buffer.pop()
+
+
+EXPORT_WRITERS = {
+    'csv': iter_csv,
+    'xlsx': iter_xlsx,
+}
@@ -0,0 +1,83 @@
+"""
+Versioned caching of rendered page fragments.
+
+Templates cache their expensive fragments with the ``{% cache %}`` tag, varying on
+version stamps of the objects they show: the contract listings (``contracts``), a
+contract (``contract``) or a reporting period and its report (``period``). Like the
+SLA tree version (see ``sla_tree.py``), a stamp is replaced when the object
+changes, from the receivers in ``signals.py``, which makes every fragment built
+from the old one unreachable. The tag is loaded from the ``fragment_cache``
+library, which counts fragment cache hits and misses.
+
+Views pass the data of cached fragments as lazy objects (see ``lazy_context``), so
+a cache hit renders the fragment without running its queries. Async views check
+whether a fragment is cached up front instead (see ``afragment_cached``), so they
+can load the data of missing fragments concurrently.
+"""
+import uuid
+from functools import cache as memoize
+
+from django.core.cache import InvalidCacheBackendError, cache, caches
+from django.core.cache.utils import make_template_fragment_key
+from django.utils.functional import SimpleLazyObject
+
+# How long a rendered fragment is kept, in seconds
+FRAGMENT_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def _version_key(scope, object_id):
+    return f'contracts:fragment_version:{scope}:{object_id}'
+
+
+def get_fragment_versions(**objects):
+    """
+    Return the version stamps of the given objects with a single cache lookup, e.g.
+    ``get_fragment_versions(contract=1, period=2)``. Pass ``contracts=None`` for the
+    stamp of the contract listings.
+    """
+    keys = {scope: _version_key(scope, object_id) for scope, object_id in objects.items()}
+    stamps = cache.get_many(keys.values())
+    missing = {key: uuid.uuid4().hex for key in keys.values() if key not in stamps}
+    if missing:
+        cache.set_many(missing, None)
+        stamps.update(missing)
+    return {scope: stamps[key] for scope, key in keys.items()}
+
+
+def invalidate_fragments(scope, object_ids=(None,)):
+    """
+    Invalidate the cached fragments of the given objects of a scope by replacing
+    their version stamps.
+    """
+    cache.set_many({_version_key(scope, object_id): uuid.uuid4().hex for object_id in object_ids}, None)
+
+
+def lazy(function):
+    """
+    Return a proxy of the result of a function without arguments, for use as a
+    template context value: the function only runs when the value is first used.
+    """
+    return SimpleLazyObject(function)
+
+
+def lazy_context(load, names):
+    """
+    Return lazy template context entries for the given names of the dict returned by
+    ``load``, which is only called when one of them is first used.
+    """
+    load = memoize(load)
+    return {name: lazy(lambda name=name: load()[name]) for name in names}
+
+
+async def afragment_cached(fragment_name, *vary_on):
+    """
+    Return whether the fragment of a ``{% cache timeout fragment_name *vary_on %}``
+    tag is cached, given the values of its vary-on arguments. Not counted as a
+    fragment cache lookup: the tag counts the lookup when the fragment is rendered.
+    """
+    # The cache used by the tag
+    try:
+        fragment_cache = caches['template_fragments']
+    except InvalidCacheBackendError:
+        fragment_cache = caches['default']
+    return await fragment_cache.ahas_key(make_template_fragment_key(fragment_name, vary_on))
@@ -0,0 +1,271 @@
+"""
+Bulk ingestion of measurements from CSV or JSON Lines (NDJSON) streams.
+
+Each row identifies a measurement by contract, SLI and a date within the reporting
+period, and carries the measured values:
+
+    contract_id, sli, date, reported_value[, calculated_value][, is_disputed]
+
+``sli`` is the name of the service level indicator and ``calculated_value``
+defaults to ``reported_value``. Rows are resolved to (reporting period, SLI) pairs
+using in-memory maps, upserted in batches, and the compliance reports of the
+affected periods are refreshed once at the end.
+"""
+import bisect
+import csv
+import datetime
+import json
+import time
+
+from django.db import transaction
+from django.dispatch import Signal
+from django.utils.dateparse import parse_date
+
+from .metrics import increment
+from .models import ComplianceReport, Measurement, ReportingPeriod, ServiceLevelIndicator
+
+# Sent after an ingestion with the ``period_ids`` of the upserted measurements,
+# which are written in bulk without post_save signals
+measurements_ingested = Signal()
+
+# Number of rows upserted per transaction
+INGEST_BATCH_SIZE = 5000
+
+# Maximum number of row errors kept in the ingestion result
+MAX_REPORTED_ERRORS = 100
+
+TRUE_VALUES = {'1', 'true', 'yes', 'y', 't'}
+
+
+class IngestionError(ValueError):
+    """
+    Raised when a row cannot be resolved to a measurement.
+    """
+
+
+class IngestionResult:
+    """
+    Summary of a bulk ingestion run.
+    """
+
+    def __init__(self):
+        self.rows = 0
+        self.upserted = 0
+        self.errors = []
+        self.error_count = 0
+        self.refreshed_reports = 0
+        self.elapsed = 0.0
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+    def add_error(self, line, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(f'line {line}: {message}')
+
+    def as_dict(self):
+        return {
+            'rows': self.rows,
+            'upserted': self.upserted,
+            'errors': self.error_count,
+            'error_details': self.errors,
+            'refreshed_reports': self.refreshed_reports,
+            'elapsed_seconds': round(self.elapsed, 3),
+            'rows_per_second': round(self.rows_per_second, 1),
+        }
+
+
+def iter_csv_rows(lines):
+    """
+    Yield (line number, row dict) pairs from an iterable of CSV text lines with a header row.
+    """
+    reader = csv.DictReader(lines)
+    for row in reader:
+        yield reader.line_num, row
+
+
+def iter_json_lines(lines):
+    """
+    Yield (line number, row dict) pairs from an iterable of JSON Lines / NDJSON text lines.
+    """
+    for line_number, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            row = e
+        yield line_number, row
+
+
+ROW_READERS = {
+    'csv': iter_csv_rows,
+    'jsonl': iter_json_lines,
+    'ndjson': iter_json_lines,
+}
+
+
+class MeasurementResolver:
+    """
+    Resolves rows to (reporting period id, SLI id) pairs using in-memory maps that
+    are loaded once per SLI and once per contract.
+    """
+
+    def __init__(self):
+        self.sli_ids = dict(ServiceLevelIndicator.objects.values_list('name', 'id'))
+        # contract id -> (sorted period start dates, [(start, end, period id), ...])
+        self.periods_by_contract = {}
+
+    def load_contracts(self, contract_ids):
+        """
+        Load the reporting periods of all contracts not loaded yet with a single query.
+        """
+        missing = set(contract_ids) - self.periods_by_contract.keys()
+        if not missing:
+            return
+
+        periods = {contract_id: [] for contract_id in missing}
+        for period_id, contract_id, start_date, end_date in ReportingPeriod.objects.filter(
+            contract_id__in=missing
+        ).order_by('start_date').values_list('id', 'contract_id', 'start_date', 'end_date'):
+            periods[contract_id].append((start_date, end_date, period_id))
+
+        for contract_id, contract_periods in periods.items():
+            self.periods_by_contract[contract_id] = ([start for start, _, _ in contract_periods], contract_periods)
+
+    def resolve(self, contract_id, sli_name, date):
+        sli_id = self.sli_ids.get(sli_name)
+        if sli_id is None:
+            raise IngestionError(f'unknown SLI {sli_name!r}')
+
+        starts, periods = self.periods_by_contract.get(contract_id, ([], []))
+        index = bisect.bisect_right(starts, date) - 1
+        if index < 0 or periods[index][1] < date:
+            raise IngestionError(f'no reporting period of contract {contract_id} contains {date}')
+
+        return periods[index][2], sli_id
+
+
+def _parse_row(row):
+    """
+    Validate and convert a raw row into (contract id, SLI name, date, reported, calculated, disputed).
+    """
+    if isinstance(row, Exception):
+        raise IngestionError(f'invalid JSON: {row}')
+    if not isinstance(row, dict):
+        raise IngestionError('row is not an object')
+
+    try:
+        contract_id = int(row['contract_id'])
+        sli_name = str(row['sli'])
+        date = row['date']
+        if not isinstance(date, datetime.date):
+            date = parse_date(str(date))
+        reported_value = float(row['reported_value'])
+        calculated_value = row.get('calculated_value')
+        calculated_value = reported_value if calculated_value in (None, '') else float(calculated_value)
+    except KeyError as e:
+        raise IngestionError(f'missing field {e.args[0]!r}')
+    except (TypeError, ValueError) as e:
+        raise IngestionError(str(e))
+
+    if date is None:
+        raise IngestionError(f'invalid date {row["date"]!r}')
+
+    is_disputed = row.get('is_disputed', False)
+    if not isinstance(is_disputed, bool):
+        is_disputed = str(is_disputed).strip().lower() in TRUE_VALUES
+
+    return contract_id, sli_name, date, reported_value, calculated_value, is_disputed
+
+
+def _upsert(resolver, batch, result, affected):
+    """
+    Resolve and upsert a batch of parsed rows inside one transaction.
+    """
+    resolver.load_contracts(row[1][0] for row in batch)
+
+    # Later rows for the same (period, SLI) win
+    measurements = {}
+    for line, (contract_id, sli_name, date, reported_value, calculated_value, is_disputed) in batch:
+        try:
+            period_id, sli_id = resolver.resolve(contract_id, sli_name, date)
+        except IngestionError as e:
+            result.add_error(line, e)
+            continue
+
+        measurements[(period_id, sli_id)] = Measurement(
+            reporting_period_id=period_id,
+            sli_id=sli_id,
+            reported_value=reported_value,
+            calculated_value=calculated_value,
+            is_disputed=is_disputed,
+        )
+
+    with transaction.atomic():
+        Measurement.objects.bulk_create(
+            measurements.values(),
+            update_conflicts=True,
+            unique_fields=['reporting_period', 'sli'],
+            update_fields=['reported_value', 'calculated_value', 'is_disputed', 'updated_at'],
+        )
+
+    result.upserted += len(measurements)
+    affected.update(measurements)
+
+
+def refresh_reports(affected):
+    """
+    Refresh the compliance report items of the affected (period, SLI) pairs.
+    Returns the number of refreshed reports.
+    """
+    period_ids = sorted({period_id for period_id, _ in affected})
+    sli_ids = {sli_id for _, sli_id in affected}
+
+    refreshed = 0
+    for start in range(0, len(period_ids), INGEST_BATCH_SIZE):
+        reports = list(ComplianceReport.objects.filter(reporting_period_id__in=period_ids[start:start + INGEST_BATCH_SIZE]))
+        ComplianceReport.generate_many(reports, sli_ids=sli_ids)
+        refreshed += len(reports)
+    return refreshed
+
+
+def ingest_measurements(lines, format='csv', batch_size=INGEST_BATCH_SIZE):
+    """
+    Ingest measurements from an iterable of text lines in the given format
+    ('csv', 'jsonl' or 'ndjson'). Returns an IngestionResult.
+    """
+    if format not in ROW_READERS:
+        raise ValueError(f'Unsupported format {format!r}, expected one of {", ".join(ROW_READERS)}')
+
+    start = time.perf_counter()
+    result = IngestionResult()
+    resolver = MeasurementResolver()
+    affected = set()
+
+    batch = []
+    for line, row in ROW_READERS[format](lines):
+        result.rows += 1
+        try:
+            batch.append((line, _parse_row(row)))
+        except IngestionError as e:
+            result.add_error(line, e)
+            continue
+
+        if len(batch) >= batch_size:
+            _upsert(resolver, batch, result, affected)
+            batch = []
+
+    if batch:
+        _upsert(resolver, batch, result, affected)
+
+    result.refreshed_reports = refresh_reports(affected)
+    if affected:
+        measurements_ingested.send(sender=Measurement, period_ids={period_id for period_id, _ in affected})
+    result.elapsed = time.perf_counter() - start
+    increment('contracts_measurements_ingested_total', result.upserted)
+    increment('contracts_ingestion_duration_seconds_total', result.elapsed)
+    return result
@@ -0,0 +1,250 @@
+"""
+Per-request instrumentation of SQL queries, template rendering and latency.
+
+``instrument()`` (``ainstrument()`` in async code) is a context manager collecting
+the metrics of the code it wraps: the number of SQL queries and the time spent in
+the database, queries repeated with different parameters (the signature of N+1
+loops), the time spent rendering templates and the total wall time. ``InstrumentationMiddleware`` wraps every
+request in it, adds the metrics to the response as a ``Server-Timing`` header
+and writes them as a JSON log line to the ``contracts.instrumentation`` logger.
+
+Slow requests are logged as warnings; a sample of them can also log their SQL.
+The behaviour is configured with these settings:
+
+- ``INSTRUMENTATION_SLOW_REQUEST_MS``: latency above which a request is slow (500).
+- ``INSTRUMENTATION_SQL_SAMPLE_RATE``: fraction of slow requests whose SQL is logged (0).
+- ``INSTRUMENTATION_DUPLICATE_THRESHOLD``: executions of one query signature reported
+  as a likely N+1 loop (3).
+- ``INSTRUMENTATION_SERVER_TIMING``: whether to add the ``Server-Timing`` header (True).
+"""
+import json
+import logging
+import random
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack, asynccontextmanager, contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.template.base import Template
+
+from .metrics import observe
+
+logger = logging.getLogger(__name__)
+
+SLOW_REQUEST_MS = 500
+SQL_SAMPLE_RATE = 0.0
+DUPLICATE_THRESHOLD = 3
+
+# Metrics of the instrumented block running in the current thread or task
+_current = ContextVar('contracts_instrumentation', default=None)
+
+# Placeholder lists of IN clauses, which vary with the number of values
+_IN_PLACEHOLDERS = re.compile(r'IN \((?:%s, )*%s\)')
+
+
+def query_signature(sql):
+    """
+    Return the signature of a parameterized SQL query, identical for executions of
+    the same query with different parameters.
+    """
+    return _IN_PLACEHOLDERS.sub('IN (...)', sql)
+
+
+class RequestMetrics:
+    """
+    Metrics collected by ``instrument()``.
+    """
+
+    def __init__(self):
+        self.queries = []
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.total_time = 0.0
+        self._start = time.perf_counter()
+        self._rendering = False
+
+    def record_query(self, sql, params, duration):
+        self.queries.append((sql, params, duration))
+        self.db_time += duration
+
+    def duplicates(self, threshold=DUPLICATE_THRESHOLD):
+        """
+        Return a dict mapping the signatures executed at least ``threshold`` times
+        to their number of executions, most repeated first.
+        """
+        counts = Counter(query_signature(sql) for sql, _, _ in self.queries)
+        return {signature: count for signature, count in counts.most_common() if count >= threshold}
+
+    def as_dict(self, duplicate_threshold=DUPLICATE_THRESHOLD):
+        return {
+            'queries': len(self.queries),
+            'db_ms': round(self.db_time * 1000, 2),
+            'template_ms': round(self.template_time * 1000, 2),
+            'total_ms': round(self.total_time * 1000, 2),
+            'duplicates': [
+                {'sql': signature, 'count': count}
+                for signature, count in self.duplicates(duplicate_threshold).items()
+            ],
+        }
+
+    def server_timing(self, duplicate_threshold=DUPLICATE_THRESHOLD):
+        """
+        Return the value of a ``Server-Timing`` header for the metrics.
+        """
+        metrics = [
+            f'db;dur={self.db_time * 1000:.2f};desc="{len(self.queries)} queries"',
+            f'tpl;dur={self.template_time * 1000:.2f};desc="templates"',
+            f'total;dur={self.total_time * 1000:.2f}',
+        ]
+        duplicates = sum(self.duplicates(duplicate_threshold).values())
+        if duplicates:
+            metrics.append(f'dup;desc="{duplicates} repeated queries"')
+        return ', '.join(metrics)
+
+
+_original_template_render = Template.render
+
+
+def _timed_template_render(self, context):
+    """
+    Time the outermost template render of an instrumented block; included
+    templates are rendered within it.
+    """
+    metrics = _current.get()
+    if metrics is None or metrics._rendering:
+        return _original_template_render(self, context)
+
+    metrics._rendering = True
+    start = time.perf_counter()
+    try:
+        return _original_template_render(self, context)
+    finally:
+        metrics.template_time += time.perf_counter() - start
+        metrics._rendering = False
+
+
+def _install_template_timer():
+    if Template.render is not _timed_template_render:
+        Template.render = _timed_template_render
+
+
+def _wrap_connections(stack, metrics):
+    """
+    Record the queries of every database connection of the current thread into
+    ``metrics`` until ``stack`` is closed.
+    """
+    def record(execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            metrics.record_query(sql, params, time.perf_counter() - start)
+
+    for connection in connections.all():
+        stack.enter_context(connection.execute_wrapper(record))
+
+
+@contextmanager
+def instrument():
+    """
+    Collect the metrics of the wrapped block into the yielded RequestMetrics.
+    Queries are recorded on every database connection used in the block.
+    """
+    _install_template_timer()
+    metrics = RequestMetrics()
+    token = _current.set(metrics)
+    try:
+        with ExitStack() as stack:
+            _wrap_connections(stack, metrics)
+            yield metrics
+    finally:
+        metrics.total_time = time.perf_counter() - metrics._start
+        _current.reset(token)
+
+
+@asynccontextmanager
+async def ainstrument():
+    """
+    Async version of ``instrument()``. Database connections are per thread, so the
+    queries are recorded on the connections of the thread that runs the block's
+    sync code and ORM queries (see ``asgiref.sync.sync_to_async``).
+    """
+    _install_template_timer()
+    metrics = RequestMetrics()
+    token = _current.set(metrics)
+    try:
+        stack = ExitStack()
+        await sync_to_async(_wrap_connections)(stack, metrics)
+        try:
+            yield metrics
+        finally:
+            await sync_to_async(stack.close)()
+    finally:
+        metrics.total_time = time.perf_counter() - metrics._start
+        _current.reset(token)
+
+
+class InstrumentationMiddleware:
+    """
+    Record the metrics of every request, add them to the response as a
+    ``Server-Timing`` header, log them and add the latency to the
+    ``contracts_request_duration_seconds`` histogram (see ``metrics.py``).
+    Streaming responses are measured up to the start of the stream. Supports both
+    sync and async requests, so async views are not run through a sync adapter.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with instrument() as metrics:
+            response = self.get_response(request)
+        return self.process_metrics(request, response, metrics)
+
+    async def __acall__(self, request):
+        async with ainstrument() as metrics:
+            response = await self.get_response(request)
+        return self.process_metrics(request, response, metrics)
+
+    def process_metrics(self, request, response, metrics):
+        match = request.resolver_match
+        view_name = match.view_name if match else None
+        observe('contracts_request_duration_seconds', metrics.total_time, view=view_name or '')
+
+        duplicate_threshold = getattr(settings, 'INSTRUMENTATION_DUPLICATE_THRESHOLD', DUPLICATE_THRESHOLD)
+        if getattr(settings, 'INSTRUMENTATION_SERVER_TIMING', True):
+            response['Server-Timing'] = metrics.server_timing(duplicate_threshold)
+        self.log(request, response, view_name, metrics, duplicate_threshold)
+        return response
+
+    def log(self, request, response, view_name, metrics, duplicate_threshold=DUPLICATE_THRESHOLD):
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'view': view_name,
+            'status': response.status_code,
+            **metrics.as_dict(duplicate_threshold),
+        }
+
+        if record['total_ms'] < getattr(settings, 'INSTRUMENTATION_SLOW_REQUEST_MS', SLOW_REQUEST_MS):
+            logger.info(json.dumps(record))
+            return
+
+        record['slow'] = True
+        if random.random() < getattr(settings, 'INSTRUMENTATION_SQL_SAMPLE_RATE', SQL_SAMPLE_RATE):
+            record['sql'] = [
+                {'sql': sql, 'params': [str(param) for param in params or ()], 'ms': round(duration * 1000, 2)}
+                for sql, params, duration in metrics.queries
+            ]
+        logger.warning(json.dumps(record))
@@ -0,0 +1,129 @@
+"""
+Execution of background jobs (see ``models.Job``).
+
+The ``process_jobs`` management command claims pending jobs from the database and
+runs them on a thread or process pool. Every pool worker uses its own database
+connection.
+"""
+import datetime
+import logging
+import threading
+import traceback
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import django
+from django.apps import apps
+from django.db import IntegrityError, connection, connections, transaction
+from django.utils import timezone
+
+from . import metrics
+from .models import ComplianceReport, Job
+
+logger = logging.getLogger(__name__)
+
+# Number of attempts before a failing job is given up
+JOB_MAX_ATTEMPTS = 3
+
+# Running jobs started longer ago than this are considered abandoned by their worker
+JOB_STALE_AFTER = datetime.timedelta(hours=1)
+
+# Finished jobs are deleted after this long, so the job table does not grow forever
+JOB_RETENTION = datetime.timedelta(days=7)
+
+
+def generate_report(job):
+    reports = ComplianceReport.generate_for_periods([job.reporting_period])
+    return f'Generated compliance report {reports[0].pk}'
+
+
+def generate_periods(job):
+    periods = job.contract.generate_reporting_periods()
+    return f'Created {len(periods)} reporting periods'
+
+
+JOB_HANDLERS = {
+    Job.GENERATE_REPORT: generate_report,
+    Job.GENERATE_PERIODS: generate_periods,
+}
+
+
+def _retry_or_fail(job, error):
+    """
+    Return a failed job to the queue if it has attempts left, otherwise mark it failed.
+    """
+    if job.attempts < JOB_MAX_ATTEMPTS:
+        try:
+            with transaction.atomic():
+                Job.objects.filter(pk=job.pk).update(status=Job.PENDING, error=error)
+            return Job.PENDING
+        except IntegrityError:
+            # The same work has been enqueued again in the meantime
+            pass
+    job.finish(Job.FAILED, error=error)
+    return Job.FAILED
+
+
+def execute_job(job_id):
+    """
+    Run a claimed job and record its outcome. Returns the resulting job status.
+    """
+    job = Job.objects.select_related('contract', 'reporting_period').get(pk=job_id)
+    try:
+        result = JOB_HANDLERS[job.kind](job)
+    except Exception:
+        logger.exception('Job %s failed', job_id)
+        return _retry_or_fail(job, traceback.format_exc())
+
+    job.finish(Job.SUCCEEDED, result=result)
+    return Job.SUCCEEDED
+
+
+def _execute_in_pool(job_id):
+    try:
+        return execute_job(job_id)
+    finally:
+        # Pool processes exit without running atexit handlers, so flush metrics now
+        metrics.flush()
+        # Pool threads are reused for other jobs, so release their connection;
+        # pool processes keep theirs for the jobs that follow
+        if threading.current_thread() is not threading.main_thread():
+            connection.close()
+
+
+def _init_process():
+    """
+    Initializer of pool processes: set up Django if the process was spawned, and
+    forget database connections inherited from a forked parent without closing
+    them, as they are still used by the parent.
+    """
+    if not apps.ready:
+        django.setup()
+    for conn in connections.all(initialized_only=True):
+        conn.connection = None
+
+
+def create_pool(kind, workers):
+    """
+    Create a 'thread' or 'process' pool executor with the given number of workers.
+    """
+    if kind == 'process':
+        return ProcessPoolExecutor(max_workers=workers, initializer=_init_process)
+    return ThreadPoolExecutor(max_workers=workers)
+
+
+def process_jobs(pool, workers):
+    """
+    Claim pending jobs in batches of ``workers`` and run them on the pool until the
+    queue is empty. Returns a dict counting the jobs per resulting status.
+    """
+    now = timezone.now()
+    Job.requeue_stale(now - JOB_STALE_AFTER)
+    Job.prune(now - JOB_RETENTION)
+
+    counts = {}
+    while True:
+        jobs = Job.claim(workers)
+        if not jobs:
+            return counts
+        for status in pool.map(_execute_in_pool, [job.pk for job in jobs]):
+            counts[status] = counts.get(status, 0) + 1
@@ -452,6 +452,10 @@ class Command(BaseCommand):
             self.stdout.write(self.style.SUCCESS(f'Associated {shinin_party.name} (Seller) and {buyer_parties[buyer_index].name} (Buyer) with {contract.name}'))
 
         # Generate random measurement data for the first contract from January 2023
+        # Saving a contract only queues the generation of its reporting periods
+        for contract in (contract_2023_jan, contract_2023_jan_2024, contract_2025_jan):
+            contract.generate_reporting_periods()
+
         self.generate_random_measurements_for_jan_2023_contract(contract_2023_jan)
 
         self.stdout.write(self.style.SUCCESS('Demo data added successfully!'))
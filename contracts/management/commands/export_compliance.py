@@ -0,0 +1,43 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from contracts.export import EXPORT_STATUSES, EXPORT_WRITERS, export_rows, parse_export_filters
+
+
+class Command(BaseCommand):
+    help = 'Exports compliance report items as CSV or XLSX'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', '-o', default='-', help="Output file, or '-' for standard output (default)")
+        parser.add_argument('--format', choices=sorted(EXPORT_WRITERS), help='Output format (defaults to the file extension, or csv)')
+        parser.add_argument('--tenant', help='Only export contracts of this tenant ID')
+        parser.add_argument('--contract', help='Only export this contract ID')
+        parser.add_argument('--start', help='Only export reporting periods ending on or after this date (YYYY-MM-DD)')
+        parser.add_argument('--end', help='Only export reporting periods starting on or before this date (YYYY-MM-DD)')
+        parser.add_argument('--status', choices=sorted(EXPORT_STATUSES), help='Only export compliant or non-compliant items')
+
+    def handle(self, *args, **options):
+        output = options['output']
+        format = options['format'] or ('xlsx' if output.lower().endswith('.xlsx') else 'csv')
+        if format == 'xlsx' and output == '-':
+            raise CommandError('XLSX exports need an --output file')
+
+        try:
+            filters = parse_export_filters(options)
+        except ValueError as e:
+            raise CommandError(e)
+        chunks = EXPORT_WRITERS[format](export_rows(**filters))
+
+        if output == '-':
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
+            return
+
+        if format == 'xlsx':
+            stream = open(output, 'wb')
+        else:
+            stream = open(output, 'w', newline='', encoding='utf-8')
+        with stream:
+            for chunk in chunks:
+                stream.write(chunk)
+        self.stdout.write(self.style.SUCCESS(f'Exported compliance report items to {output}.'))
@@ -0,0 +1,32 @@
+import datetime
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from contracts.models import Contract, reporting_period_horizon
+
+
+class Command(BaseCommand):
+    help = 'Extends the reporting periods of active open-ended contracts up to the rolling horizon'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            help='Look-ahead in days from today (defaults to settings.REPORTING_PERIOD_HORIZON_DAYS)',
+        )
+
+    def handle(self, *args, **options):
+        if options['days'] is not None:
+            horizon = timezone.now().date() + datetime.timedelta(days=options['days'])
+        else:
+            horizon = reporting_period_horizon()
+
+        contracts = Contract.objects.open_ended().only(
+            'id', 'effective_date', 'expiration_date', 'reporting_frequency'
+        )
+        periods = contracts.generate_reporting_periods(end_date=horizon)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {len(periods)} reporting periods up to {horizon} '
+            f'for {len({period.contract_id for period in periods})} contracts.'
+        ))
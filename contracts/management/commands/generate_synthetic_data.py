@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from contracts.synthetic import generate_synthetic_data
+
+
+class Command(BaseCommand):
+    help = 'Generates a synthetic dataset of the given size with bulk inserts, for load testing'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tenants', type=int, default=10, help='Number of tenants (default 10)')
+        parser.add_argument('--contracts', type=int, default=10, help='Contracts per tenant (default 10)')
+        parser.add_argument('--depth', type=int, default=3, help='Levels of each SLA tree (default 3)')
+        parser.add_argument('--width', type=int, default=3, help='Children of each non-leaf SLA (default 3)')
+        parser.add_argument('--years', type=int, default=2, help='Years of monthly reporting periods (default 2)')
+        parser.add_argument('--slis', type=int, default=5, help='Number of SLIs measured by the leaf SLAs (default 5)')
+        parser.add_argument('--seed', type=int, default=0, help='Seed of the measurement values (default 0)')
+        parser.add_argument('--no-reports', action='store_true', help='Do not generate compliance reports')
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        with transaction.atomic():
+            counts = generate_synthetic_data(
+                tenants=options['tenants'],
+                contracts_per_tenant=options['contracts'],
+                sla_depth=options['depth'],
+                sla_width=options['width'],
+                years=options['years'],
+                slis=options['slis'],
+                reports=not options['no_reports'],
+                seed=options['seed'],
+            )
+
+        summary = ', '.join(f'{count} {name.replace("_", " ")}' for name, count in counts.items())
+        self.stdout.write(self.style.SUCCESS(f'Created {summary} in {time.perf_counter() - start:.1f}s.'))
@@ -0,0 +1,52 @@
+import os
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from contracts.ingestion import INGEST_BATCH_SIZE, ROW_READERS, ingest_measurements
+
+
+class Command(BaseCommand):
+    help = 'Bulk ingests measurements from a CSV or JSON Lines (NDJSON) file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="File to ingest, or '-' to read from standard input")
+        parser.add_argument(
+            '--format',
+            choices=sorted(ROW_READERS),
+            help='Input format (defaults to the file extension, or csv for standard input)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=INGEST_BATCH_SIZE,
+            help=f'Number of rows upserted per transaction (default {INGEST_BATCH_SIZE})',
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        format = options['format']
+        if format is None:
+            extension = os.path.splitext(path)[1].lstrip('.').lower()
+            format = extension if extension in ROW_READERS else 'csv'
+
+        if path == '-':
+            result = ingest_measurements(sys.stdin, format, options['batch_size'])
+        else:
+            try:
+                stream = open(path, newline='', encoding='utf-8')
+            except OSError as e:
+                raise CommandError(f'Cannot open {path}: {e}')
+            with stream:
+                result = ingest_measurements(stream, format, options['batch_size'])
+
+        for error in result.errors:
+            self.stderr.write(error)
+        if result.error_count > len(result.errors):
+            self.stderr.write(f'... and {result.error_count - len(result.errors)} more errors')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Ingested {result.upserted} measurements from {result.rows} rows '
+            f'({result.error_count} errors) in {result.elapsed:.2f}s, '
+            f'{result.rows_per_second:.0f} rows/sec. '
+            f'Refreshed {result.refreshed_reports} compliance reports.'
+        ))
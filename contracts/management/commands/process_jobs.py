@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand
+from contracts.jobs import create_pool, process_jobs
+
+
+class Command(BaseCommand):
+    help = 'Runs a worker that executes queued background jobs (report and reporting period generation)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help='Number of jobs run in parallel (default 4)')
+        parser.add_argument(
+            '--pool',
+            choices=['thread', 'process'],
+            default='thread',
+            help='Run jobs on a thread pool (default) or a process pool',
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=5.0,
+            help='Seconds to wait before checking an empty queue again (default 5)',
+        )
+        parser.add_argument('--once', action='store_true', help='Exit as soon as the queue is empty')
+
+    def handle(self, *args, **options):
+        workers = options['workers']
+        with create_pool(options['pool'], workers) as pool:
+            try:
+                while True:
+                    counts = process_jobs(pool, workers)
+                    if counts:
+                        self.stdout.write(self.style.SUCCESS(
+                            'Processed jobs: ' + ', '.join(f'{count} {status.lower()}' for status, count in sorted(counts.items()))
+                        ))
+                    if options['once']:
+                        break
+                    time.sleep(options['poll_interval'])
+            except KeyboardInterrupt:
+                self.stdout.write('Stopping worker.')
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from contracts.models import ComplianceTrend
+
+
+class Command(BaseCommand):
+    help = 'Recomputes the pre-aggregated compliance trend rows from the compliance report items'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tenant', type=int, action='append', help='Only rebuild this tenant ID (repeatable)')
+
+    def handle(self, *args, **options):
+        trends = ComplianceTrend.rebuild(tenant_ids=options['tenant'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {len(trends)} compliance trend rows.'))
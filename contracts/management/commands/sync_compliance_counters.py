@@ -0,0 +1,58 @@
+from django.core.management.base import BaseCommand, CommandError
+from contracts.models import ComplianceReport
+
+
+class Command(BaseCommand):
+    help = 'Backfills or verifies the denormalized item counters stored on compliance reports'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify',
+            action='store_true',
+            help='Only report reports whose stored counters are out of date, without fixing them',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of reports processed per batch',
+        )
+
+    def handle(self, *args, **options):
+        verify = options['verify']
+        batch_size = options['batch_size']
+
+        report_ids = list(ComplianceReport.objects.order_by('pk').values_list('pk', flat=True))
+        checked = 0
+        stale = 0
+
+        for start in range(0, len(report_ids), batch_size):
+            reports = list(ComplianceReport.objects.filter(pk__in=report_ids[start:start + batch_size]))
+            counts = ComplianceReport.count_items(reports)
+
+            stale_reports = []
+            for report in reports:
+                stored = (report.total_items, report.compliant_items, report.compliance_percentage)
+                report.set_counters(*counts.get(report.pk, (0, 0)))
+                actual = (report.total_items, report.compliant_items, report.compliance_percentage)
+
+                if stored != actual:
+                    stale_reports.append(report)
+                    self.stdout.write(self.style.WARNING(
+                        f'Stale counters for report {report.pk}: stored {stored[1]}/{stored[0]}, '
+                        f'actual {actual[1]}/{actual[0]}'
+                    ))
+
+            if not verify:
+                ComplianceReport.update_counters(stale_reports)
+
+            checked += len(reports)
+            stale += len(stale_reports)
+
+        if verify and stale:
+            raise CommandError(f'{stale} of {checked} compliance reports have stale counters.')
+
+        if verify:
+            self.stdout.write(self.style.SUCCESS(f'All {checked} compliance reports have exact counters.'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Checked {checked} compliance reports, updated {stale}.'))
@@ -0,0 +1,217 @@
+"""
+Prometheus metrics of the compliance workloads, shared between worker processes.
+
+Observations are buffered in memory and periodically added to a SQLite file
+(``METRICS_STORE``) shared by every process of the deployment, so the ``/metrics``
+endpoint served by any process reports the totals of all of them. Only counters
+and histograms are supported, as their values can be summed across processes;
+rates such as periods created per second are computed by Prometheus with
+``rate()`` over the counters.
+
+Settings:
+
+- ``METRICS_STORE``: path of the shared SQLite file (in the temporary directory by default).
+- ``METRICS_FLUSH_INTERVAL``: seconds between two writes of a process's buffer (1).
+- ``METRICS_ALLOWED_IPS``: client addresses allowed to read ``/metrics`` (local only).
+"""
+import atexit
+import logging
+import math
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STORE = os.path.join(tempfile.gettempdir(), 'contracts_metrics.sqlite3')
+FLUSH_INTERVAL = 1.0
+ALLOWED_IPS = ('127.0.0.1', '::1')
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+ITEM_BUCKETS = (1, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+# Name, type, help text and histogram buckets of every metric
+METRICS = {
+    'contracts_request_duration_seconds': ('histogram', 'Latency of HTTP requests by view.', DURATION_BUCKETS),
+    'contracts_report_generation_duration_seconds': (
+        'histogram', 'Duration of compliance report generation batches.', DURATION_BUCKETS
+    ),
+    'contracts_report_items': ('histogram', 'Number of items of generated compliance reports.', ITEM_BUCKETS),
+    'contracts_reports_generated_total': ('counter', 'Compliance reports generated.', None),
+    'contracts_reporting_periods_created_total': ('counter', 'Reporting periods created.', None),
+    'contracts_measurements_ingested_total': ('counter', 'Measurement rows upserted by ingestion.', None),
+    'contracts_ingestion_duration_seconds_total': ('counter', 'Time spent ingesting measurements.', None),
+    'contracts_cache_requests_total': ('counter', 'Cache lookups by cache and result (hit or miss).', None),
+}
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class MetricsBuffer:
+    """
+    Thread-safe in-memory buffer of the increments of one process, keyed by
+    (metric, sample suffix, labels).
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.values = defaultdict(float)
+        self.last_flush = time.monotonic()
+
+    def add(self, increments):
+        with self.lock:
+            for key, amount in increments:
+                self.values[key] += amount
+            due = time.monotonic() - self.last_flush >= getattr(settings, 'METRICS_FLUSH_INTERVAL', FLUSH_INTERVAL)
+        if due:
+            self.flush()
+
+    def flush(self):
+        """
+        Add the buffered increments to the shared store. On failure they are kept
+        for the next flush.
+        """
+        with self.lock:
+            values, self.values = self.values, defaultdict(float)
+            self.last_flush = time.monotonic()
+        if not values:
+            return
+        try:
+            with _connect() as store:
+                store.executemany(
+                    'INSERT INTO metric (name, sample, labels, value) VALUES (?, ?, ?, ?) '
+                    'ON CONFLICT (name, sample, labels) DO UPDATE SET value = value + excluded.value',
+                    [(name, sample, labels, value) for (name, sample, labels), value in values.items()],
+                )
+        except sqlite3.Error:
+            logger.warning('Could not write metrics to %s', _store_path(), exc_info=True)
+            with self.lock:
+                for key, amount in values.items():
+                    self.values[key] += amount
+
+    def clear(self):
+        with self.lock:
+            self.values.clear()
+
+
+_buffer = MetricsBuffer()
+atexit.register(_buffer.flush)
+# A forked child must not flush the increments its parent will flush
+os.register_at_fork(after_in_child=_buffer.clear)
+
+
+def _store_path():
+    return str(getattr(settings, 'METRICS_STORE', DEFAULT_STORE))
+
+
+@contextmanager
+def _connect():
+    """
+    Open the shared store, creating its table if needed, and commit on success.
+    """
+    store = sqlite3.connect(_store_path(), timeout=5)
+    try:
+        with store:
+            store.execute('PRAGMA journal_mode=WAL')
+            store.execute(
+                'CREATE TABLE IF NOT EXISTS metric ('
+                'name TEXT NOT NULL, sample TEXT NOT NULL, labels TEXT NOT NULL, value REAL NOT NULL, '
+                'PRIMARY KEY (name, sample, labels))'
+            )
+            yield store
+    finally:
+        store.close()
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(labels):
+    return ','.join(f'{name}="{_escape(value)}"' for name, value in sorted(labels.items()))
+
+
+def _format_bound(bound):
+    return '+Inf' if bound == math.inf else repr(float(bound))
+
+
+def _format_value(value):
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+def increment(name, amount=1, **labels):
+    """
+    Increment a counter.
+    """
+    _buffer.add([((name, '', _format_labels(labels)), amount)])
+
+
+def observe(name, value, **labels):
+    """
+    Record an observation of a histogram.
+    """
+    buckets = METRICS[name][2]
+    # Buckets are cumulative; the ones below the value get a zero increment so
+    # that every bucket is exposed
+    increments = [
+        ((name, '_bucket', _format_labels({**labels, 'le': _format_bound(bound)})), int(value <= bound))
+        for bound in (*buckets, math.inf)
+    ]
+    label_string = _format_labels(labels)
+    increments.append(((name, '_sum', label_string), value))
+    increments.append(((name, '_count', label_string), 1))
+    _buffer.add(increments)
+
+
+def flush():
+    """
+    Write the buffered observations of this process to the shared store.
+    """
+    _buffer.flush()
+
+
+def _sort_key(row):
+    _, sample, labels, _ = row
+    # Histogram buckets in increasing order, then their sum and count
+    label_parts = labels.split(',')
+    bound = next((part[4:-1] for part in label_parts if part.startswith('le=')), None)
+    other_labels = ','.join(part for part in label_parts if not part.startswith('le='))
+    return (other_labels, sample != '_bucket', float(bound) if bound else 0.0, sample)
+
+
+def render():
+    """
+    Return the metrics of all processes in the Prometheus text exposition format.
+    """
+    flush()
+    with _connect() as store:
+        rows = store.execute('SELECT name, sample, labels, value FROM metric').fetchall()
+
+    rows_by_name = defaultdict(list)
+    for row in rows:
+        rows_by_name[row[0]].append(row)
+
+    lines = []
+    for name, (kind, help_text, _) in METRICS.items():
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        for _, sample, labels, value in sorted(rows_by_name[name], key=_sort_key):
+            label_string = f'{{{labels}}}' if labels else ''
+            lines.append(f'{name}{sample}{label_string} {_format_value(value)}')
+    return '\n'.join(lines) + '\n'
+
+
+def metrics_view(request):
+    """
+    Serve the metrics to Prometheus, from local addresses only.
+    """
+    if request.META.get('REMOTE_ADDR') not in getattr(settings, 'METRICS_ALLOWED_IPS', ALLOWED_IPS):
+        return HttpResponseForbidden()
+    return HttpResponse(render(), content_type=CONTENT_TYPE)
@@ -0,0 +1,47 @@
+# Generated by Django 5.0.3 on 2026-10-17 18:58
+
+from django.db import migrations, models
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_counters(apps, schema_editor):
+    ComplianceReport = apps.get_model('contracts', 'ComplianceReport')
+    ComplianceReportItem = apps.get_model('contracts', 'ComplianceReportItem')
+
+    items = ComplianceReportItem.objects.filter(report=OuterRef('pk')).values('report')
+    ComplianceReport.objects.update(
+        total_items=Coalesce(Subquery(items.annotate(count=Count('pk')).values('count')), 0),
+        compliant_items=Coalesce(
+            Subquery(items.annotate(count=Count('pk', filter=Q(is_compliant=True))).values('count')), 0
+        ),
+    )
+    ComplianceReport.objects.filter(total_items__gt=0).update(
+        compliance_percentage=F('compliant_items') * 100.0 / F('total_items')
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contracts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='compliancereport',
+            name='compliance_percentage',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='compliancereport',
+            name='compliant_items',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='compliancereport',
+            name='total_items',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.0.3 on 2026-10-17 19:02
+
+from collections import defaultdict
+
+from django.db import migrations, models
+
+
+def backfill_paths(apps, schema_editor):
+    ServiceLevelAgreement = apps.get_model('contracts', 'ServiceLevelAgreement')
+
+    slas = {sla.id: sla for sla in ServiceLevelAgreement.objects.only('id', 'parent_id')}
+    children = defaultdict(list)
+    for sla in slas.values():
+        children[sla.parent_id].append(sla.id)
+
+    stack = [(sla_id, '', 0) for sla_id in children[None]]
+    while stack:
+        sla_id, parent_path, depth = stack.pop()
+        sla = slas[sla_id]
+        sla.path = f'{parent_path}{sla_id:010d}/'
+        sla.depth = depth
+        stack.extend((child_id, sla.path, depth + 1) for child_id in children[sla_id])
+
+    ServiceLevelAgreement.objects.bulk_update(slas.values(), ['path', 'depth'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contracts', '0002_compliance_report_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='servicelevelagreement',
+            name='depth',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='servicelevelagreement',
+            name='path',
+            field=models.CharField(blank=True, editable=False, max_length=1000),
+        ),
+        migrations.AddIndex(
+            model_name='servicelevelagreement',
+            index=models.Index(fields=['path'], name='contracts_s_path_cb382b_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='servicelevelagreement',
+            index=models.Index(fields=['contract', 'path'], name='contracts_s_contrac_ed788e_idx'),
+        ),
+        migrations.RunPython(backfill_paths, migrations.RunPython.noop),
+    ]
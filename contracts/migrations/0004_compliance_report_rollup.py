@@ -0,0 +1,29 @@
+# Generated by Django 5.0.3 on 2026-10-17 19:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contracts', '0003_sla_materialized_path'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ComplianceReportRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_items', models.PositiveIntegerField()),
+                ('compliant_items', models.PositiveIntegerField()),
+                ('compliance_percentage', models.FloatField()),
+                ('is_compliant', models.BooleanField(help_text='Whether all items below the SLA are compliant')),
+                ('report', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rollups', to='contracts.compliancereport')),
+                ('sla', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rollups', to='contracts.servicelevelagreement')),
+            ],
+            options={
+                'unique_together': {('report', 'sla')},
+            },
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.0.3 on 2026-10-17 19:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contracts', '0004_compliance_report_rollup'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='compliancereportitem',
+            index=models.Index(fields=['report', 'is_compliant'], name='contracts_c_report__a14cb9_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='contract',
+            index=models.Index(fields=['status'], name='contracts_c_status_aa7a80_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='contract',
+            index=models.Index(fields=['tenant', 'status'], name='contracts_c_tenant__8ef07c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reportingperiod',
+            index=models.Index(fields=['contract', '-end_date'], name='contracts_r_contrac_e5a381_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reportingperiod',
+            index=models.Index(fields=['contract', 'start_date'], name='contracts_r_contrac_7542ec_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='servicelevelagreement',
+            index=models.Index(condition=models.Q(('parent__isnull', True)), fields=['contract'], name='contracts_sla_root_idx'),
+        ),
+    ]
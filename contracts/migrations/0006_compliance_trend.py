@@ -0,0 +1,58 @@
+# Generated by Django 5.0.3 on 2026-10-17 19:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, F, Q
+from django.db.models.functions import TruncMonth
+
+
+def backfill_trends(apps, schema_editor):
+    ComplianceReportItem = apps.get_model('contracts', 'ComplianceReportItem')
+    ComplianceTrend = apps.get_model('contracts', 'ComplianceTrend')
+
+    rows = ComplianceReportItem.objects.values(
+        trend_tenant=F('report__reporting_period__contract__tenant_id'),
+        trend_month=TruncMonth('report__reporting_period__start_date'),
+        trend_sli=F('measurement__sli_id'),
+    ).annotate(
+        total=Count('pk'),
+        compliant=Count('pk', filter=Q(is_compliant=True)),
+    ).order_by()
+
+    ComplianceTrend.objects.bulk_create([
+        ComplianceTrend(
+            tenant_id=row['trend_tenant'],
+            month=row['trend_month'],
+            sli_id=row['trend_sli'],
+            total_items=row['total'],
+            compliant_items=row['compliant'],
+        )
+        for row in rows
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contracts', '0005_compliance_access_path_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ComplianceTrend',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(help_text='First day of the month')),
+                ('total_items', models.PositiveIntegerField()),
+                ('compliant_items', models.PositiveIntegerField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('sli', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='compliance_trends', to='contracts.servicelevelindicator')),
+                ('tenant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='compliance_trends', to='contracts.tenant')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['month', 'sli'], name='contracts_c_month_8fbfd7_idx')],
+                'unique_together': {('tenant', 'month', 'sli')},
+            },
+        ),
+        migrations.RunPython(backfill_trends, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.3 on 2026-10-17 20:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contracts', '0007_job_queue'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='servicelevelagreement',
+            name='path',
+            field=models.TextField(blank=True, editable=False),
+        ),
+    ]
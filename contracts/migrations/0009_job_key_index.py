@@ -0,0 +1,17 @@
+# Generated by Django 5.0.3 on 2026-10-17 20:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contracts', '0008_sla_path_text'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='job',
+            index=models.Index(fields=['key', '-id'], name='contracts_j_key_f6281a_idx'),
+        ),
+    ]
@@ -1,8 +1,55 @@
-from django.db import models
+from collections import defaultdict
+from functools import partial
+
+from django.conf import settings
+from django.db import IntegrityError, models, transaction
+from django.core.exceptions import ValidationError
+from django.db.models import Count, Exists, F, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Concat, Substr, TruncMonth
+from django.dispatch import Signal
 from django.utils import timezone
 import datetime
+import time
 from dateutil.relativedelta import relativedelta
 
+from .metrics import increment, observe
+
+# Number of rows written per INSERT when bulk creating periods and report items
+GENERATE_BATCH_SIZE = 1000
+
+# Number of digits of each SLA id in the materialized path of the SLA tree
+SLA_PATH_SEGMENT_WIDTH = 10
+
+# Length of a reporting period for each reporting frequency
+REPORTING_PERIOD_LENGTHS = {
+    'MONTHLY': relativedelta(months=1),
+    'QUARTERLY': relativedelta(months=3),
+    'YEARLY': relativedelta(years=1),
+}
+
+# Sent by ComplianceReport.generate_many() with the ``period_ids`` and ``contract_ids``
+# of the regenerated reports, which are written in bulk without post_save signals
+compliance_reports_generated = Signal()
+
+# Sent by ServiceLevelAgreement.save() once the SLA's materialized path is up to date,
+# unlike post_save, which is sent before the path of a new or moved SLA is written
+sla_saved = Signal()
+
+def percentage(part, total):
+    """
+    Return ``part`` as a percentage of ``total``, or None if ``total`` is zero.
+    """
+    if total > 0:
+        return (part / total) * 100
+    return None
+
+def reporting_period_horizon():
+    """
+    Return the date up to which reporting periods of open-ended contracts are generated.
+    """
+    horizon_days = getattr(settings, 'REPORTING_PERIOD_HORIZON_DAYS', 90)
+    return timezone.now().date() + datetime.timedelta(days=horizon_days)
+
 class Tenant(models.Model):
     """
     Represents a tenant in the multitenant application.
@@ -56,6 +103,46 @@ class Party(models.Model):
     def __str__(self):
         return f"{self.name} ({self.get_type_display()})"
 
+class ContractQuerySet(models.QuerySet):
+    """
+    QuerySet for contracts with helpers for annotating compliance statistics.
+    """
+
+    def with_latest_compliance(self):
+        """
+        Annotate each contract with the compliance statistics of its latest
+        reporting period that has a compliance report.
+
+        Adds ``latest_period_id``, ``latest_report_date``, ``compliant_items``,
+        ``total_items`` and ``compliance_percentage`` using correlated subqueries
+        on the report's stored counters, so the number of queries does not
+        depend on the number of contracts.
+        """
+        latest_reports = ComplianceReport.objects.filter(
+            reporting_period__contract=OuterRef('pk')
+        ).order_by('-reporting_period__end_date')
+
+        return self.annotate(
+            latest_period_id=Subquery(latest_reports.values('reporting_period_id')[:1]),
+            latest_report_date=Subquery(latest_reports.values('generated_at')[:1]),
+            total_items=Coalesce(Subquery(latest_reports.values('total_items')[:1]), 0),
+            compliant_items=Coalesce(Subquery(latest_reports.values('compliant_items')[:1]), 0),
+            compliance_percentage=Subquery(latest_reports.values('compliance_percentage')[:1]),
+        )
+
+    def generate_reporting_periods(self, end_date=None):
+        """
+        Generate the missing reporting periods for all contracts in the queryset.
+        """
+        return Contract.generate_reporting_periods_for(self, end_date)
+
+    def open_ended(self):
+        """
+        Active contracts with an effective date but no expiration date, whose
+        reporting periods are extended on a rolling horizon.
+        """
+        return self.filter(status='ACTIVE', effective_date__isnull=False, expiration_date__isnull=True)
+
 class Contract(models.Model):
     """
     Represents a contract that belongs to a tenant.
@@ -86,6 +173,14 @@ class Contract(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = ContractQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status']),
+            models.Index(fields=['tenant', 'status']),
+        ]
+
     def __str__(self):
         return f"{self.tenant.name} - {self.name}"
 
@@ -93,50 +188,68 @@ class Contract(models.Model):
         is_new = self.pk is None
         super().save(*args, **kwargs)
 
-        # Generate reporting periods if this is a new contract with an effective date
+        # Queue the generation of the reporting periods of a new active contract,
+        # once it is committed and visible to the workers
         if is_new and self.effective_date and self.status == 'ACTIVE':
-            self.generate_reporting_periods()
+            transaction.on_commit(partial(Job.enqueue_periods, self))
 
     def generate_reporting_periods(self):
         """
         Generate reporting periods based on the contract's reporting frequency,
         effective date, and expiration date.
         """
+        return Contract.generate_reporting_periods_for([self])
+
+    def reporting_period_boundaries(self, end_date=None):
+        """
+        Compute the (start_date, end_date) boundaries of the contract's reporting periods
+        up to the expiration date. Open-ended contracts are only materialized for periods
+        starting on or before ``end_date``, which defaults to the rolling reporting period
+        horizon; those periods are never truncated so they can be extended later.
+        """
         if not self.effective_date:
-            return
+            return []
 
-        start_date = self.effective_date
-        end_date = self.expiration_date or (timezone.now().date() + datetime.timedelta(days=365))
+        last_start = self.expiration_date or end_date or reporting_period_horizon()
+        period_length = REPORTING_PERIOD_LENGTHS.get(self.reporting_frequency, REPORTING_PERIOD_LENGTHS['MONTHLY'])
 
-        current_start = start_date
+        boundaries = []
+        current_start = self.effective_date
+        while current_start <= last_start:
+            current_end = current_start + period_length + relativedelta(days=-1)
+            if self.expiration_date and current_end > self.expiration_date:
+                current_end = self.expiration_date
 
-        while current_start <= end_date:
-            if self.reporting_frequency == 'MONTHLY':
-                current_end = current_start + relativedelta(months=1, days=-1)
-            elif self.reporting_frequency == 'QUARTERLY':
-                current_end = current_start + relativedelta(months=3, days=-1)
-            elif self.reporting_frequency == 'YEARLY':
-                current_end = current_start + relativedelta(years=1, days=-1)
-            else:
-                current_end = current_start + relativedelta(months=1, days=-1)
+            boundaries.append((current_start, current_end))
+            current_start = current_start + period_length
 
-            if current_end > end_date:
-                current_end = end_date
+        return boundaries
 
-            ReportingPeriod.objects.create(
-                contract=self,
-                start_date=current_start,
-                end_date=current_end
-            )
+    @staticmethod
+    def generate_reporting_periods_for(contracts, end_date=None):
+        """
+        Generate the missing reporting periods for many contracts with a single bulk insert.
+        Periods whose start date already exists for a contract are left untouched, so
+        generation is idempotent. Returns the list of created reporting periods.
+        """
+        contracts = [contract for contract in contracts if contract.effective_date]
+        if not contracts:
+            return []
+
+        existing = set(
+            ReportingPeriod.objects.filter(contract__in=contracts).values_list('contract_id', 'start_date')
+        )
+
+        periods = [
+            ReportingPeriod(contract=contract, start_date=start_date, end_date=period_end_date)
+            for contract in contracts
+            for start_date, period_end_date in contract.reporting_period_boundaries(end_date)
+            if (contract.pk, start_date) not in existing
+        ]
 
-            if self.reporting_frequency == 'MONTHLY':
-                current_start = current_start + relativedelta(months=1)
-            elif self.reporting_frequency == 'QUARTERLY':
-                current_start = current_start + relativedelta(months=3)
-            elif self.reporting_frequency == 'YEARLY':
-                current_start = current_start + relativedelta(years=1)
-            else:
-                current_start = current_start + relativedelta(months=1)
+        created = ReportingPeriod.objects.bulk_create(periods, batch_size=GENERATE_BATCH_SIZE)
+        increment('contracts_reporting_periods_created_total', len(created))
+        return created
 
 class ReportingPeriod(models.Model):
     """
@@ -149,6 +262,10 @@ class ReportingPeriod(models.Model):
 
     class Meta:
         ordering = ['start_date']
+        indexes = [
+            models.Index(fields=['contract', '-end_date']),
+            models.Index(fields=['contract', 'start_date']),
+        ]
 
     def __str__(self):
         return f"{self.contract.name} - {self.start_date} to {self.end_date}"
@@ -165,10 +282,66 @@ class ServiceLevelIndicator(models.Model):
     def __str__(self):
         return self.name
 
+def sla_path_segment(sla_id):
+    """
+    Return the materialized path segment of an SLA. Segments are zero-padded so that
+    ordering by path yields a depth-first (pre-order) traversal of the tree.
+    """
+    return f'{sla_id:0{SLA_PATH_SEGMENT_WIDTH}d}/'
+
+def compute_sla_paths(parents):
+    """
+    Compute the materialized path and depth of every SLA from a dict mapping
+    SLA id to parent id. Returns a dict mapping SLA id to a (path, depth) tuple.
+    SLAs whose parent is not in ``parents`` are treated as roots.
+    """
+    children = defaultdict(list)
+    for sla_id, parent_id in parents.items():
+        children[parent_id if parent_id in parents else None].append(sla_id)
+
+    paths = {}
+    stack = [(sla_id, '', 0) for sla_id in children[None]]
+    while stack:
+        sla_id, parent_path, depth = stack.pop()
+        path = parent_path + sla_path_segment(sla_id)
+        paths[sla_id] = (path, depth)
+        stack.extend((child_id, path, depth + 1) for child_id in children[sla_id])
+
+    return paths
+
+class ServiceLevelAgreementQuerySet(models.QuerySet):
+    """
+    QuerySet for SLAs with helpers for querying the tree through the materialized path.
+    """
+
+    def subtree(self, sla, include_self=True):
+        """
+        SLAs in the subtree rooted at ``sla``, selected with an indexed range on the path.
+        """
+        # '0' is the character following the '/' path separator
+        queryset = self.filter(path__gte=sla.path, path__lt=sla.path[:-1] + '0')
+        if not include_self:
+            queryset = queryset.exclude(pk=sla.pk)
+        return queryset
+
+    def leaves(self):
+        """
+        SLAs without children.
+        """
+        return self.filter(~Exists(ServiceLevelAgreement.objects.filter(parent=OuterRef('pk'))))
+
+    def tree_order(self):
+        """
+        Order SLAs depth-first, so every SLA directly follows its parent or preceding sibling's subtree.
+        """
+        return self.order_by('path')
+
 class ServiceLevelAgreement(models.Model):
     """
     Represents a Service Level Agreement (SLA) that belongs to a contract.
     An SLA is a tree structure of SLIs with threshold values.
+    The position in the tree is also stored as a materialized path and depth,
+    which are maintained automatically when an SLA is saved.
     """
     THRESHOLD_TYPES = [
         ('MIN', 'Minimum'),
@@ -182,14 +355,98 @@ class ServiceLevelAgreement(models.Model):
     sli = models.ForeignKey(ServiceLevelIndicator, on_delete=models.CASCADE, null=True, blank=True, related_name='slas')
     threshold_type = models.CharField(max_length=3, choices=THRESHOLD_TYPES, null=True, blank=True)
     threshold_value = models.FloatField(null=True, blank=True)
+    # Unbounded, as every level adds SLA_PATH_SEGMENT_WIDTH + 1 characters
+    path = models.TextField(blank=True, editable=False)
+    depth = models.PositiveIntegerField(default=0, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = ServiceLevelAgreementQuerySet.as_manager()
+
     def __str__(self):
         return f"{self.contract.name} - {self.name}"
 
+    def clean(self):
+        if self.pk and self.parent_id:
+            parent_path = ServiceLevelAgreement.objects.filter(pk=self.parent_id).values_list('path', flat=True).first()
+            if parent_path and f'/{sla_path_segment(self.pk)}' in f'/{parent_path}':
+                raise ValidationError({'parent': 'An SLA cannot be moved below itself or one of its descendants.'})
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self.update_path()
+        sla_saved.send(sender=ServiceLevelAgreement, instance=self)
+
+    def update_path(self):
+        """
+        Recompute the materialized path and depth of this SLA from its parent and,
+        if the SLA was moved, rewrite the paths of its whole subtree in one query.
+        """
+        stored_paths = dict(
+            ServiceLevelAgreement.objects.filter(pk__in=[self.pk, self.parent_id]).values_list('pk', 'path')
+        )
+        old_path = stored_paths.get(self.pk, '')
+        if self.parent_id:
+            parent_path = stored_paths.get(self.parent_id, '')
+            new_path = parent_path + sla_path_segment(self.pk)
+        else:
+            new_path = sla_path_segment(self.pk)
+        new_depth = new_path.count('/') - 1
+
+        if old_path == new_path:
+            self.path, self.depth = new_path, new_depth
+            return
+
+        if old_path:
+            # Moved: rewrite the paths and depths of the SLA and all its descendants
+            ServiceLevelAgreement.objects.subtree(ServiceLevelAgreement(pk=self.pk, path=old_path)).update(
+                path=Concat(Value(new_path), Substr('path', len(old_path) + 1)),
+                depth=F('depth') + (new_depth - (old_path.count('/') - 1)),
+            )
+        else:
+            ServiceLevelAgreement.objects.filter(pk=self.pk).update(path=new_path, depth=new_depth)
+
+        self.path, self.depth = new_path, new_depth
+
+    @staticmethod
+    def rebuild_paths(contract_ids=None):
+        """
+        Recompute the materialized paths of all SLAs, or of the SLAs of the given
+        contracts, e.g. after they were created with ``bulk_create``.
+        """
+        slas = ServiceLevelAgreement.objects.all()
+        if contract_ids is not None:
+            slas = slas.filter(contract_id__in=contract_ids)
+
+        slas = list(slas.only('id', 'parent_id', 'path', 'depth'))
+        paths = compute_sla_paths({sla.id: sla.parent_id for sla in slas})
+
+        changed = []
+        for sla in slas:
+            if (sla.path, sla.depth) != paths[sla.id]:
+                sla.path, sla.depth = paths[sla.id]
+                changed.append(sla)
+
+        ServiceLevelAgreement.objects.bulk_update(changed, ['path', 'depth'], batch_size=GENERATE_BATCH_SIZE)
+        return len(changed)
+
+    def is_met_by(self, value):
+        """
+        Return whether a measured value satisfies this SLA's threshold.
+        """
+        if self.threshold_type == 'MIN':
+            return value >= self.threshold_value
+        elif self.threshold_type == 'MAX':
+            return value <= self.threshold_value
+        return False
+
     class Meta:
         verbose_name = "Service Level Agreement"
         verbose_name_plural = "Service Level Agreements"
+        indexes = [
+            models.Index(fields=['path']),
+            models.Index(fields=['contract', 'path']),
+            models.Index(fields=['contract'], condition=Q(parent__isnull=True), name='contracts_sla_root_idx'),
+        ]
 
 class Measurement(models.Model):
     """
@@ -206,6 +463,13 @@ class Measurement(models.Model):
     def __str__(self):
         return f"{self.reporting_period} - {self.sli.name}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the loaded (period, SLI) pair so reports can be refreshed if it changes
+        instance._loaded_key = (instance.__dict__.get('reporting_period_id'), instance.__dict__.get('sli_id'))
+        return instance
+
     class Meta:
         unique_together = ['reporting_period', 'sli']
 
@@ -214,46 +478,213 @@ class ComplianceReport(models.Model):
     Represents a compliance report for a reporting period.
     """
     reporting_period = models.OneToOneField(ReportingPeriod, on_delete=models.CASCADE, related_name='compliance_report')
+    total_items = models.PositiveIntegerField(default=0, editable=False)
+    compliant_items = models.PositiveIntegerField(default=0, editable=False)
+    compliance_percentage = models.FloatField(null=True, blank=True, editable=False)
     generated_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"Compliance Report for {self.reporting_period}"
 
+    def set_counters(self, total_items, compliant_items):
+        """
+        Set the denormalized item counters and the derived compliance percentage.
+        """
+        self.total_items = total_items
+        self.compliant_items = compliant_items
+        self.compliance_percentage = percentage(compliant_items, total_items)
+
+    @classmethod
+    def count_items(cls, reports):
+        """
+        Count the total and compliant items of the given reports with one aggregate query.
+        Returns a dict mapping report id to a (total, compliant) tuple.
+        """
+        rows = ComplianceReportItem.objects.filter(report__in=reports).values('report').annotate(
+            total=Count('pk'),
+            compliant=Count('pk', filter=Q(is_compliant=True)),
+        )
+        return {row['report']: (row['total'], row['compliant']) for row in rows}
+
+    @classmethod
+    def update_counters(cls, reports):
+        """
+        Recompute and store the denormalized counters of the given reports from their items.
+        """
+        reports = list(reports)
+        counts = cls.count_items(reports)
+        now = timezone.now()
+        for report in reports:
+            report.set_counters(*counts.get(report.pk, (0, 0)))
+            report.updated_at = now
+
+        cls.objects.bulk_update(
+            reports,
+            ['total_items', 'compliant_items', 'compliance_percentage', 'updated_at'],
+            batch_size=GENERATE_BATCH_SIZE
+        )
+
     def generate(self):
         """
         Generate compliance report items for all SLAs in the contract.
         """
-        # Delete existing report items
-        self.items.all().delete()
+        ComplianceReport.generate_many([self])
+
+    @classmethod
+    def generate_for_periods(cls, periods, refresh_trends=True):
+        """
+        Create any missing compliance reports for the given reporting periods
+        and (re)generate all of them in one batch.
+        Returns the list of generated reports.
+        """
+        period_ids = [period.pk for period in periods]
+        existing_period_ids = set(
+            cls.objects.filter(reporting_period_id__in=period_ids).values_list('reporting_period_id', flat=True)
+        )
+        cls.objects.bulk_create([
+            cls(reporting_period_id=period_id)
+            for period_id in period_ids
+            if period_id not in existing_period_ids
+        ])
+
+        reports = list(cls.objects.filter(reporting_period_id__in=period_ids))
+        cls.generate_many(reports, refresh_trends=refresh_trends)
+        return reports
+
+    @classmethod
+    def generate_many(cls, reports, sla_ids=None, sli_ids=None, refresh_trends=True):
+        """
+        Regenerate the items of many compliance reports with a fixed number of queries.
 
-        # Get all SLAs for the contract
-        slas = self.reporting_period.contract.slas.all()
+        Measurements are fetched once for all periods and keyed by (period, SLI),
+        thresholds are evaluated in memory and all items are written with a single
+        bulk insert inside one transaction.
 
-        # Create report items for each SLA with an SLI
+        If ``sla_ids`` or ``sli_ids`` are given, only the items for those SLAs or
+        SLIs are recomputed and the rest of each report is left untouched.
+
+        Bulk rebuilds can pass ``refresh_trends=False`` and rebuild the compliance
+        trend once at the end instead (see ``ComplianceTrend.rebuild``).
+        """
+        reports = list(reports)
+        if not reports:
+            return
+
+        start = time.perf_counter()
+        period_ids = [report.reporting_period_id for report in reports]
+        contract_ids_by_period = {}
+        trend_buckets = set()
+        for period_id, contract_id, tenant_id, start_date in ReportingPeriod.objects.filter(
+            pk__in=period_ids
+        ).values_list('pk', 'contract_id', 'contract__tenant_id', 'start_date'):
+            contract_ids_by_period[period_id] = contract_id
+            trend_buckets.add((tenant_id, start_date.replace(day=1)))
+
+        # Get all SLAs with an SLI for the contracts involved, grouped by contract
+        slas = ServiceLevelAgreement.objects.filter(
+            contract_id__in=set(contract_ids_by_period.values()),
+            sli__isnull=False
+        )
+        measurements = Measurement.objects.filter(reporting_period_id__in=period_ids)
+        stale_items = ComplianceReportItem.objects.filter(report__in=reports)
+        if sla_ids is not None:
+            slas = slas.filter(pk__in=sla_ids)
+            stale_items = stale_items.filter(sla_id__in=sla_ids)
+        if sli_ids is not None:
+            slas = slas.filter(sli_id__in=sli_ids)
+            measurements = measurements.filter(sli_id__in=sli_ids)
+            stale_items = stale_items.filter(sla__sli_id__in=sli_ids)
+
+        slas_by_contract = defaultdict(list)
         for sla in slas:
-            if sla.sli:
-                try:
-                    measurement = Measurement.objects.get(
-                        reporting_period=self.reporting_period,
-                        sli=sla.sli
-                    )
-
-                    is_compliant = False
-                    if sla.threshold_type == 'MIN':
-                        is_compliant = measurement.calculated_value >= sla.threshold_value
-                    elif sla.threshold_type == 'MAX':
-                        is_compliant = measurement.calculated_value <= sla.threshold_value
-
-                    ComplianceReportItem.objects.create(
-                        report=self,
-                        sla=sla,
-                        measurement=measurement,
-                        is_compliant=is_compliant
-                    )
-                except Measurement.DoesNotExist:
+            slas_by_contract[sla.contract_id].append(sla)
+
+        # Get all measurements for the periods involved, keyed by (period, SLI)
+        measurements = {
+            (measurement.reporting_period_id, measurement.sli_id): measurement
+            for measurement in measurements
+        }
+
+        items = []
+        for report in reports:
+            period_id = report.reporting_period_id
+            for sla in slas_by_contract[contract_ids_by_period[period_id]]:
+                measurement = measurements.get((period_id, sla.sli_id))
+                if measurement is None:
                     # No measurement for this SLI in this period
-                    pass
+                    continue
+
+                items.append(ComplianceReportItem(
+                    report=report,
+                    sla=sla,
+                    measurement=measurement,
+                    is_compliant=sla.is_met_by(measurement.calculated_value)
+                ))
+
+        with transaction.atomic():
+            stale_items.delete()
+            ComplianceReportItem.objects.bulk_create(items, batch_size=GENERATE_BATCH_SIZE)
+            cls.update_counters(reports)
+            cls.update_rollups(reports, contract_ids_by_period)
+            if refresh_trends:
+                ComplianceTrend.refresh(trend_buckets)
+
+        compliance_reports_generated.send(
+            sender=cls, period_ids=period_ids, contract_ids=set(contract_ids_by_period.values())
+        )
+        observe('contracts_report_generation_duration_seconds', time.perf_counter() - start)
+        increment('contracts_reports_generated_total', len(reports))
+        for report in reports:
+            observe('contracts_report_items', report.total_items)
+
+    @classmethod
+    def update_rollups(cls, reports, contract_ids_by_period):
+        """
+        Recompute the rollups of all parent SLAs of the given reports.
+
+        The SLAs of each contract are visited in reverse tree order, so every SLA is
+        visited after all of its descendants and the leaf counts are accumulated
+        bottom-up in a single pass.
+        """
+        slas_by_contract = defaultdict(list)
+        parent_ids = set()
+        for sla_id, parent_id, contract_id in ServiceLevelAgreement.objects.filter(
+            contract_id__in=set(contract_ids_by_period.values())
+        ).order_by('-path').values_list('id', 'parent_id', 'contract_id'):
+            slas_by_contract[contract_id].append((sla_id, parent_id))
+            if parent_id:
+                parent_ids.add(parent_id)
+
+        # Per (report, SLA): number of items and compliant items in the SLA's subtree
+        counts = defaultdict(lambda: [0, 0])
+        for report_id, sla_id, is_compliant in ComplianceReportItem.objects.filter(
+            report__in=reports
+        ).values_list('report_id', 'sla_id', 'is_compliant'):
+            counts[(report_id, sla_id)][0] += 1
+            counts[(report_id, sla_id)][1] += is_compliant
+
+        rollups = []
+        for report in reports:
+            for sla_id, parent_id in slas_by_contract[contract_ids_by_period[report.reporting_period_id]]:
+                total, compliant = counts.get((report.pk, sla_id), (0, 0))
+                if parent_id:
+                    parent_counts = counts[(report.pk, parent_id)]
+                    parent_counts[0] += total
+                    parent_counts[1] += compliant
+
+                if sla_id in parent_ids and total > 0:
+                    rollups.append(ComplianceReportRollup(
+                        report=report,
+                        sla_id=sla_id,
+                        total_items=total,
+                        compliant_items=compliant,
+                        compliance_percentage=percentage(compliant, total),
+                        is_compliant=compliant == total
+                    ))
+
+        ComplianceReportRollup.objects.filter(report__in=reports).delete()
+        ComplianceReportRollup.objects.bulk_create(rollups, batch_size=GENERATE_BATCH_SIZE)
 
 class ComplianceReportItem(models.Model):
     """
@@ -264,5 +695,299 @@ class ComplianceReportItem(models.Model):
     measurement = models.ForeignKey(Measurement, on_delete=models.CASCADE)
     is_compliant = models.BooleanField()
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['report', 'is_compliant']),
+        ]
+
     def __str__(self):
         return f"{self.sla.name} - {'Compliant' if self.is_compliant else 'Non-compliant'}"
+
+class ComplianceReportRollup(models.Model):
+    """
+    Represents the compliance of a parent SLA in a compliance report, rolled up
+    from the report items of all SLAs below it.
+    """
+    report = models.ForeignKey(ComplianceReport, on_delete=models.CASCADE, related_name='rollups')
+    sla = models.ForeignKey(ServiceLevelAgreement, on_delete=models.CASCADE, related_name='rollups')
+    total_items = models.PositiveIntegerField()
+    compliant_items = models.PositiveIntegerField()
+    compliance_percentage = models.FloatField()
+    is_compliant = models.BooleanField(help_text='Whether all items below the SLA are compliant')
+
+    def __str__(self):
+        return f"{self.sla.name} - {self.compliant_items}/{self.total_items} compliant"
+
+    class Meta:
+        unique_together = ['report', 'sla']
+
+class ComplianceTrendQuerySet(models.QuerySet):
+    def series(self, group_by=()):
+        """
+        Sum the counts per month and the given dimensions ('tenant' and/or 'sli').
+        Returns dicts with the month, the dimension ids, total_items and compliant_items.
+        """
+        dimensions = [f'{dimension}_id' for dimension in group_by]
+        return self.values('month', *dimensions).annotate(
+            total=Sum('total_items'),
+            compliant=Sum('compliant_items'),
+        ).order_by('month', *dimensions)
+
+class ComplianceTrend(models.Model):
+    """
+    Pre-aggregated compliance report item counts per tenant, month and SLI, used
+    for trend queries over long ranges. Reporting periods are counted in the month
+    they start in. The rows are refreshed whenever reports are generated.
+    """
+    tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE, related_name='compliance_trends')
+    month = models.DateField(help_text='First day of the month')
+    sli = models.ForeignKey(ServiceLevelIndicator, on_delete=models.CASCADE, related_name='compliance_trends')
+    total_items = models.PositiveIntegerField()
+    compliant_items = models.PositiveIntegerField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = ComplianceTrendQuerySet.as_manager()
+
+    class Meta:
+        unique_together = ['tenant', 'month', 'sli']
+        indexes = [
+            models.Index(fields=['month', 'sli']),
+        ]
+
+    def __str__(self):
+        return f"{self.tenant} - {self.month:%Y-%m} - {self.sli}: {self.compliant_items}/{self.total_items} compliant"
+
+    @property
+    def compliance_percentage(self):
+        return percentage(self.compliant_items, self.total_items)
+
+    @classmethod
+    def aggregate(cls, items):
+        """
+        Count the given compliance report items per tenant, month and SLI with a
+        single grouped query. Returns unsaved ComplianceTrend objects.
+        """
+        rows = items.values(
+            trend_tenant=F('report__reporting_period__contract__tenant_id'),
+            trend_month=TruncMonth('report__reporting_period__start_date'),
+            trend_sli=F('measurement__sli_id'),
+        ).annotate(
+            total=Count('pk'),
+            compliant=Count('pk', filter=Q(is_compliant=True)),
+        ).order_by()
+
+        return [
+            cls(
+                tenant_id=row['trend_tenant'],
+                month=row['trend_month'],
+                sli_id=row['trend_sli'],
+                total_items=row['total'],
+                compliant_items=row['compliant'],
+            )
+            for row in rows
+        ]
+
+    @classmethod
+    def refresh(cls, buckets):
+        """
+        Recompute the trend rows of the given (tenant id, month) buckets.
+
+        All months from the earliest to the latest bucket are recomputed for the
+        tenants involved, which keeps it to one grouped query however many
+        buckets there are.
+        """
+        if not buckets:
+            return
+
+        tenant_ids = {tenant_id for tenant_id, _ in buckets}
+        first_month = min(month for _, month in buckets)
+        end_month = max(month for _, month in buckets) + relativedelta(months=1)
+
+        items = ComplianceReportItem.objects.filter(
+            report__reporting_period__contract__tenant_id__in=tenant_ids,
+            report__reporting_period__start_date__gte=first_month,
+            report__reporting_period__start_date__lt=end_month,
+        )
+        trends = cls.aggregate(items)
+        with transaction.atomic(savepoint=False):
+            cls.objects.filter(tenant_id__in=tenant_ids, month__gte=first_month, month__lt=end_month).delete()
+            cls.objects.bulk_create(trends, batch_size=GENERATE_BATCH_SIZE)
+
+    @classmethod
+    def rebuild(cls, tenant_ids=None):
+        """
+        Recompute all trend rows, optionally only for the given tenants.
+        """
+        items = ComplianceReportItem.objects.all()
+        trends = cls.objects.all()
+        if tenant_ids is not None:
+            items = items.filter(report__reporting_period__contract__tenant_id__in=tenant_ids)
+            trends = trends.filter(tenant_id__in=tenant_ids)
+
+        new_trends = cls.aggregate(items)
+        with transaction.atomic():
+            trends.delete()
+            cls.objects.bulk_create(new_trends, batch_size=GENERATE_BATCH_SIZE)
+        return new_trends
+
+class Job(models.Model):
+    """
+    A unit of background work, executed by the ``process_jobs`` worker command.
+
+    At most one pending job exists per deduplication key, e.g. per reporting period
+    for report generation, so enqueueing the same work twice is a no-op until a
+    worker picks it up.
+    """
+    GENERATE_REPORT = 'generate_report'
+    GENERATE_PERIODS = 'generate_periods'
+    KINDS = [
+        (GENERATE_REPORT, 'Generate compliance report'),
+        (GENERATE_PERIODS, 'Generate reporting periods'),
+    ]
+
+    PENDING = 'PENDING'
+    RUNNING = 'RUNNING'
+    SUCCEEDED = 'SUCCEEDED'
+    FAILED = 'FAILED'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (SUCCEEDED, 'Succeeded'),
+        (FAILED, 'Failed'),
+    ]
+
+    kind = models.CharField(max_length=30, choices=KINDS)
+    key = models.CharField(max_length=100, help_text='Deduplication key of the work')
+    contract = models.ForeignKey(Contract, on_delete=models.CASCADE, null=True, blank=True, related_name='jobs')
+    reporting_period = models.ForeignKey(ReportingPeriod, on_delete=models.CASCADE, null=True, blank=True, related_name='jobs')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    result = models.CharField(max_length=255, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['key'], condition=Q(status='PENDING'), name='contracts_job_pending_key'),
+        ]
+        indexes = [
+            models.Index(fields=['status', 'id']),
+            # Latest job per key, shown on the contract and reporting period pages
+            models.Index(fields=['key', '-id']),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} ({self.key}) - {self.get_status_display()}"
+
+    @property
+    def is_active(self):
+        return self.status in (self.PENDING, self.RUNNING)
+
+    @staticmethod
+    def report_key(period_id):
+        return f'{Job.GENERATE_REPORT}:{period_id}'
+
+    @staticmethod
+    def periods_key(contract_id):
+        return f'{Job.GENERATE_PERIODS}:{contract_id}'
+
+    @classmethod
+    def enqueue_reports(cls, periods):
+        """
+        Enqueue compliance report generation for the given reporting periods, skipping
+        periods that already have a pending job. Returns the pending jobs.
+        """
+        periods = list(periods)
+        keys = [cls.report_key(period.pk) for period in periods]
+        cls.objects.bulk_create([
+            cls(kind=cls.GENERATE_REPORT, key=key, reporting_period=period)
+            for key, period in zip(keys, periods)
+        ], batch_size=GENERATE_BATCH_SIZE, ignore_conflicts=True)
+        return list(cls.objects.filter(key__in=keys, status=cls.PENDING))
+
+    @classmethod
+    def enqueue_periods(cls, contract):
+        """
+        Enqueue reporting period generation for a contract, unless it is already pending.
+        Returns the pending job.
+        """
+        key = cls.periods_key(contract.pk)
+        try:
+            with transaction.atomic():
+                return cls.objects.create(kind=cls.GENERATE_PERIODS, key=key, contract=contract)
+        except IntegrityError:
+            return cls.objects.get(key=key, status=cls.PENDING)
+
+    @classmethod
+    def latest(cls, key):
+        """
+        Return the most recent job for the given key, or None.
+        """
+        return cls.objects.filter(key=key).order_by('-id').first()
+
+    @classmethod
+    async def alatest(cls, key):
+        """
+        Async version of ``latest``.
+        """
+        return await cls.objects.filter(key=key).order_by('-id').afirst()
+
+    @classmethod
+    def latest_by_key(cls, keys):
+        """
+        Return a dict mapping each of the given keys to its most recent job.
+        """
+        jobs = {}
+        for job in cls.objects.filter(key__in=keys).order_by('key', '-id'):
+            jobs.setdefault(job.key, job)
+        return jobs
+
+    @classmethod
+    def claim(cls, limit):
+        """
+        Mark up to ``limit`` of the oldest pending jobs as running and return them.
+
+        Each job is claimed with a conditional UPDATE, so concurrent workers never
+        claim the same job, on any database backend.
+        """
+        claimed = []
+        for job_id in cls.objects.filter(status=cls.PENDING).order_by('id').values_list('id', flat=True)[:limit]:
+            if cls.objects.filter(pk=job_id, status=cls.PENDING).update(
+                status=cls.RUNNING, started_at=timezone.now(), attempts=F('attempts') + 1
+            ):
+                claimed.append(job_id)
+        return list(cls.objects.filter(pk__in=claimed).order_by('id'))
+
+    @classmethod
+    def requeue_stale(cls, older_than):
+        """
+        Return running jobs started before ``older_than`` to the queue, e.g. after a
+        worker crashed. Jobs whose work is pending again are failed instead.
+        """
+        requeued = 0
+        for job in cls.objects.filter(status=cls.RUNNING, started_at__lt=older_than):
+            try:
+                with transaction.atomic():
+                    requeued += cls.objects.filter(pk=job.pk, status=cls.RUNNING).update(status=cls.PENDING)
+            except IntegrityError:
+                job.finish(cls.FAILED, error='Worker stopped; the work was enqueued again.')
+        return requeued
+
+    @classmethod
+    def prune(cls, finished_before):
+        """
+        Delete succeeded and failed jobs finished before ``finished_before``.
+        Returns the number of deleted jobs.
+        """
+        return cls.objects.filter(
+            status__in=[cls.SUCCEEDED, cls.FAILED], finished_at__lt=finished_before
+        ).delete()[0]
+
+    def finish(self, status, result='', error=''):
+        self.status = status
+        self.result = result[:255]
+        self.error = error
+        self.finished_at = timezone.now()
+        self.save(update_fields=['status', 'result', 'error', 'finished_at'])
@@ -0,0 +1,212 @@
+"""
+Filtering, sorting and keyset (seek) pagination of contract listings.
+
+Pages are selected with a ``WHERE (sort_field, id) > (value, id)`` condition on the
+last row of the previous page instead of an OFFSET, so every page costs the same
+regardless of how deep it is. The position is carried in an opaque ``cursor``
+query parameter.
+"""
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+from .models import Contract
+
+# Default and maximum number of contracts per page
+CONTRACTS_PAGE_SIZE = 50
+MAX_CONTRACTS_PAGE_SIZE = 200
+
+# Sort keys accepted in the ``sort`` query parameter, mapped to model fields.
+# Prefix a key with '-' to sort descending. Ties are broken by id.
+CONTRACT_SORT_FIELDS = {
+    'name': 'name',
+    'status': 'status',
+    'updated': 'updated_at',
+}
+
+# Compliance bands accepted in the ``compliance`` query parameter, matching the
+# colouring of the compliance column.
+COMPLIANCE_BANDS = {
+    'compliant': Q(compliance_percentage=100),
+    'warning': Q(compliance_percentage__gte=80, compliance_percentage__lt=100),
+    'non_compliant': Q(compliance_percentage__lt=80),
+    'no_data': Q(compliance_percentage__isnull=True),
+}
+
+SORT_CHOICES = [
+    ('name', 'Name (A-Z)'),
+    ('-name', 'Name (Z-A)'),
+    ('status', 'Status'),
+    ('-updated', 'Recently updated'),
+    ('updated', 'Least recently updated'),
+]
+
+COMPLIANCE_BAND_CHOICES = [
+    ('compliant', 'Fully compliant (100%)'),
+    ('warning', 'Mostly compliant (80-99%)'),
+    ('non_compliant', 'Non-compliant (<80%)'),
+    ('no_data', 'No data'),
+]
+
+
+class KeysetPage:
+    """
+    A page of a keyset paginated contract listing.
+    """
+
+    def __init__(self, object_list, request, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_url = _url_with(request, cursor=next_cursor) if next_cursor else None
+        self.previous_url = _url_with(request, cursor=previous_cursor) if previous_cursor else None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    @property
+    def has_other_pages(self):
+        return bool(self.next_url or self.previous_url)
+
+
+def _url_with(request, **params):
+    """
+    Return the query string of the request with the given parameters replaced.
+    """
+    query = request.GET.copy()
+    for key, value in params.items():
+        query.pop(key, None)
+        if value is not None:
+            query[key] = value
+    return f'?{query.urlencode()}'
+
+
+def _encode_cursor(contract, sort, field, direction):
+    """
+    Encode the position of a contract in the listing sorted by ``sort`` (a sort key
+    with its direction) on ``field``.
+    """
+    value = Contract._meta.get_field(field).value_to_string(contract)
+    data = json.dumps([sort, value, contract.pk, direction]).encode()
+    return base64.urlsafe_b64encode(data).decode()
+
+
+def _decode_cursor(cursor, sort, field):
+    """
+    Decode a cursor into (value, id, direction), or return None if it is invalid or
+    was built for another sort order, e.g. from an edited URL.
+    """
+    try:
+        cursor_sort, value, pk, direction = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if cursor_sort != sort:
+            return None
+        value = Contract._meta.get_field(field).to_python(value)
+    except (ValueError, TypeError, ValidationError):
+        return None
+    if direction not in ('next', 'previous') or not isinstance(pk, int):
+        return None
+    return value, pk, direction
+
+
+def filter_contracts(queryset, params):
+    """
+    Apply the status, tenant and compliance band filters from the query parameters.
+    The queryset must be annotated with ``compliance_percentage``.
+    """
+    status = params.get('status')
+    if status in dict(Contract.STATUS_CHOICES):
+        queryset = queryset.filter(status=status)
+
+    tenant = params.get('tenant')
+    if tenant and tenant.isdigit():
+        queryset = queryset.filter(tenant_id=int(tenant))
+
+    band = params.get('compliance')
+    if band in COMPLIANCE_BANDS:
+        queryset = queryset.filter(COMPLIANCE_BANDS[band])
+
+    return queryset
+
+
+def sort_links(request, sort):
+    """
+    Return a dict mapping each sort key to the URL that sorts by it, toggling the
+    direction for the current sort key.
+    """
+    return {
+        key: _url_with(request, sort=f'-{key}' if sort == key else key, cursor=None)
+        for key in CONTRACT_SORT_FIELDS
+    }
+
+
+def paginate_contracts(request, queryset):
+    """
+    Filter, sort and keyset paginate a contract queryset according to the request's
+    query parameters. Returns a (page, sort) tuple.
+    """
+    params = request.GET
+    queryset = filter_contracts(queryset, params)
+
+    sort = params.get('sort', 'name')
+    if sort.lstrip('-') not in CONTRACT_SORT_FIELDS:
+        sort = 'name'
+    descending = sort.startswith('-')
+    field = CONTRACT_SORT_FIELDS[sort.lstrip('-')]
+
+    try:
+        page_size = min(max(int(params.get('page_size', CONTRACTS_PAGE_SIZE)), 1), MAX_CONTRACTS_PAGE_SIZE)
+    except ValueError:
+        page_size = CONTRACTS_PAGE_SIZE
+
+    cursor = _decode_cursor(params['cursor'], sort, field) if params.get('cursor') else None
+    backwards = cursor is not None and cursor[2] == 'previous'
+
+    # Walking backwards is walking forwards in the opposite order
+    reverse = descending != backwards
+    if cursor is not None:
+        value, pk, _ = cursor
+        lookup = 'lt' if reverse else 'gt'
+        queryset = queryset.filter(
+            Q(**{f'{field}__{lookup}': value}) | Q(**{field: value, f'pk__{lookup}': pk})
+        )
+    ordering = [f'-{field}', '-pk'] if reverse else [field, 'pk']
+
+    contracts = list(queryset.order_by(*ordering)[:page_size + 1])
+    has_more = len(contracts) > page_size
+    contracts = contracts[:page_size]
+    if backwards:
+        contracts.reverse()
+
+    next_cursor = previous_cursor = None
+    if contracts:
+        if has_more or backwards:
+            next_cursor = _encode_cursor(contracts[-1], sort, field, 'next')
+        if (has_more and backwards) or (cursor is not None and not backwards):
+            previous_cursor = _encode_cursor(contracts[0], sort, field, 'previous')
+
+    return KeysetPage(contracts, request, next_cursor, previous_cursor), sort
+
+
+# Names of the template context entries returned by contract_list_context()
+CONTRACT_LIST_CONTEXT_NAMES = (
+    'page', 'sort', 'sort_links', 'sort_choices', 'filters', 'status_choices', 'compliance_band_choices',
+)
+
+
+def contract_list_context(request, queryset):
+    """
+    Return the template context for a filtered, sorted and paginated contract listing.
+    """
+    page, sort = paginate_contracts(request, queryset)
+    return {
+        'page': page,
+        'sort': sort,
+        'sort_links': sort_links(request, sort),
+        'sort_choices': SORT_CHOICES,
+        'filters': request.GET,
+        'status_choices': Contract.STATUS_CHOICES,
+        'compliance_band_choices': COMPLIANCE_BAND_CHOICES,
+    }
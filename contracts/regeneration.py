@@ -0,0 +1,146 @@
+"""
+Bulk regeneration of compliance reports, sharded by contract or tenant.
+
+Each shard is regenerated by ``regenerate_shard`` in batches of set-based writes
+and can run in its own worker process with its own database connection (see the
+``regenerate_compliance`` management command). Completed shards are recorded in
+a checkpoint file so an interrupted run can be resumed.
+"""
+import json
+import os
+import threading
+import time
+from concurrent.futures import as_completed
+
+from django.db import connection
+from django.utils import timezone
+
+from . import metrics
+from .models import GENERATE_BATCH_SIZE, ComplianceReport, ReportingPeriod
+
+# Reporting period lookup of the shard key for each way of sharding
+SHARD_LOOKUPS = {
+    'contract': 'contract_id',
+    'tenant': 'contract__tenant_id',
+}
+
+
+def shard_periods(create_missing=False, tenant_ids=None, contract_ids=None):
+    """
+    Return the reporting periods to regenerate: those with a report, or with
+    ``create_missing`` all periods that have started. Optionally limited to the
+    given tenants and contracts.
+    """
+    periods = ReportingPeriod.objects.all()
+    if create_missing:
+        periods = periods.filter(start_date__lte=timezone.now().date())
+    else:
+        periods = periods.filter(compliance_report__isnull=False)
+    if tenant_ids is not None:
+        periods = periods.filter(contract__tenant_id__in=tenant_ids)
+    if contract_ids is not None:
+        periods = periods.filter(contract_id__in=contract_ids)
+    return periods
+
+
+def list_shards(shard_by, **filters):
+    """
+    Return the sorted ids of the shards that have reporting periods to regenerate.
+    Takes the filters of shard_periods().
+    """
+    return sorted(
+        shard_periods(**filters).order_by().values_list(SHARD_LOOKUPS[shard_by], flat=True).distinct()
+    )
+
+
+def regenerate_shard(shard_by, shard_id, batch_size=GENERATE_BATCH_SIZE, **filters):
+    """
+    Regenerate the compliance reports of one shard, in batches of ``batch_size``
+    reporting periods. Takes the filters of shard_periods().
+
+    The compliance trend is not refreshed; rebuild it once all shards are done.
+    Returns a dict with the shard id, the number of reports and items, and the
+    elapsed time.
+    """
+    start = time.perf_counter()
+    period_ids = list(
+        shard_periods(**filters).filter(**{SHARD_LOOKUPS[shard_by]: shard_id}).order_by('pk').values_list('pk', flat=True)
+    )
+
+    reports = items = 0
+    for offset in range(0, len(period_ids), batch_size):
+        periods = ReportingPeriod.objects.filter(pk__in=period_ids[offset:offset + batch_size])
+        generated = ComplianceReport.generate_for_periods(periods, refresh_trends=False)
+        reports += len(generated)
+        items += sum(report.total_items for report in generated)
+
+    return {
+        'shard': shard_id,
+        'reports': reports,
+        'items': items,
+        'elapsed': time.perf_counter() - start,
+    }
+
+
+def _regenerate_in_pool(*args, **kwargs):
+    try:
+        return regenerate_shard(*args, **kwargs)
+    finally:
+        # Pool processes exit without running atexit handlers, so flush metrics now
+        metrics.flush()
+        # Release the connection of pool threads, as in jobs._execute_in_pool
+        if threading.current_thread() is not threading.main_thread():
+            connection.close()
+
+
+def regenerate_shards(pool, shard_by, shards, batch_size=GENERATE_BATCH_SIZE, **filters):
+    """
+    Regenerate the given shards on a pool (see ``jobs.create_pool``), yielding the
+    result of each shard as soon as it completes. Shards not started yet are
+    cancelled if the caller stops iterating.
+    """
+    futures = [pool.submit(_regenerate_in_pool, shard_by, shard, batch_size, **filters) for shard in shards]
+    try:
+        for future in as_completed(futures):
+            yield future.result()
+    finally:
+        for future in futures:
+            future.cancel()
+
+
+class Checkpoint:
+    """
+    JSON file recording the completed shards of a regeneration run.
+    """
+
+    def __init__(self, path, shard_by):
+        self.path = path
+        self.shard_by = shard_by
+        self.done = set()
+
+    def load(self):
+        """
+        Load the completed shards. Raises ValueError if the checkpoint belongs to a
+        run sharded differently.
+        """
+        if not os.path.exists(self.path):
+            return
+        with open(self.path) as stream:
+            data = json.load(stream)
+        if data.get('shard_by') != self.shard_by:
+            raise ValueError(f'Checkpoint {self.path} was written for shards by {data.get("shard_by")}')
+        self.done = set(data['done'])
+
+    def mark_done(self, shard_id):
+        """
+        Record a completed shard, replacing the file atomically.
+        """
+        self.done.add(shard_id)
+        temporary = f'{self.path}.tmp'
+        with open(temporary, 'w') as stream:
+            json.dump({'shard_by': self.shard_by, 'done': sorted(self.done)}, stream)
+        os.replace(temporary, self.path)
+
+    def remove(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
@@ -0,0 +1,160 @@
+"""
+Read-only serializers of the REST API.
+"""
+from rest_framework import serializers
+
+from .models import (
+    Tenant, Contract, ReportingPeriod, ComplianceReport,
+    ComplianceReportItem, ComplianceReportRollup
+)
+from .sla_tree import iter_sla_tree
+
+
+class SparseFieldsMixin:
+    """
+    Limit the serialized fields to those listed in the comma separated ``fields``
+    query parameter, if present.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        requested = request.query_params.get('fields') if request is not None else None
+        if requested:
+            allowed = {name.strip() for name in requested.split(',')}
+            for name in set(self.fields) - allowed:
+                self.fields.pop(name)
+
+
+class TenantSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    class Meta:
+        model = Tenant
+        fields = ['id', 'name', 'created_at', 'updated_at']
+
+
+class ContractSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    tenant_name = serializers.CharField(source='tenant.name', read_only=True)
+    template_name = serializers.CharField(source='template.name', read_only=True, default=None)
+
+    class Meta:
+        model = Contract
+        fields = [
+            'id', 'name', 'tenant', 'tenant_name', 'template', 'template_name', 'status',
+            'reporting_frequency', 'signature_date', 'effective_date', 'expiration_date',
+            'created_at', 'updated_at',
+        ]
+
+
+class ReportingPeriodSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    compliance = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ReportingPeriod
+        fields = ['id', 'contract', 'start_date', 'end_date', 'compliance']
+
+    def get_compliance(self, period):
+        """
+        Summary of the period's compliance report, or None if it has not been generated.
+        """
+        try:
+            report = period.compliance_report
+        except ComplianceReport.DoesNotExist:
+            return None
+        return {
+            'report': report.id,
+            'total_items': report.total_items,
+            'compliant_items': report.compliant_items,
+            'compliance_percentage': report.compliance_percentage,
+        }
+
+
+class ComplianceReportItemSerializer(serializers.ModelSerializer):
+    sla_name = serializers.CharField(source='sla.name')
+    sli = serializers.IntegerField(source='measurement.sli_id')
+    sli_name = serializers.CharField(source='measurement.sli.name')
+    threshold_type = serializers.CharField(source='sla.threshold_type')
+    threshold_value = serializers.FloatField(source='sla.threshold_value')
+    reported_value = serializers.FloatField(source='measurement.reported_value')
+    calculated_value = serializers.FloatField(source='measurement.calculated_value')
+    is_disputed = serializers.BooleanField(source='measurement.is_disputed')
+
+    class Meta:
+        model = ComplianceReportItem
+        fields = [
+            'sla', 'sla_name', 'sli', 'sli_name', 'threshold_type', 'threshold_value',
+            'reported_value', 'calculated_value', 'is_disputed', 'is_compliant',
+        ]
+
+
+class ComplianceReportRollupSerializer(serializers.ModelSerializer):
+    sla_name = serializers.CharField(source='sla.name')
+
+    class Meta:
+        model = ComplianceReportRollup
+        fields = ['sla', 'sla_name', 'total_items', 'compliant_items', 'compliance_percentage', 'is_compliant']
+
+
+class ComplianceReportSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    contract = serializers.IntegerField(source='reporting_period.contract_id')
+    start_date = serializers.DateField(source='reporting_period.start_date')
+    end_date = serializers.DateField(source='reporting_period.end_date')
+
+    class Meta:
+        model = ComplianceReport
+        fields = [
+            'id', 'reporting_period', 'contract', 'start_date', 'end_date', 'total_items',
+            'compliant_items', 'compliance_percentage', 'generated_at', 'updated_at',
+        ]
+
+
+class ComplianceReportDetailSerializer(ComplianceReportSerializer):
+    items = ComplianceReportItemSerializer(many=True)
+    rollups = ComplianceReportRollupSerializer(many=True)
+
+    class Meta(ComplianceReportSerializer.Meta):
+        fields = ComplianceReportSerializer.Meta.fields + ['items', 'rollups']
+
+
+def serialize_sla_tree(nodes):
+    """
+    Serialize the nodes of an SLA tree (see ``sla_tree.get_sla_tree``) into nested
+    dicts, in a single pre-order pass without recursion.
+    """
+    roots = []
+    # Serialized ancestors of the current node, one per depth
+    ancestors = []
+    for node, depth in iter_sla_tree(nodes):
+        sla = node['sla']
+        data = {
+            'id': sla.id,
+            'name': sla.name,
+            'description': sla.description,
+            'sli': sla.sli_id,
+            'sli_name': sla.sli.name if sla.sli else None,
+            'threshold_type': sla.threshold_type,
+            'threshold_value': sla.threshold_value,
+            'depth': sla.depth,
+            'children': [],
+        }
+        del ancestors[depth:]
+        (ancestors[-1]['children'] if ancestors else roots).append(data)
+        ancestors.append(data)
+    return roots
+
+
+def serialize_sla_statistics(results):
+    """
+    Serialize the results of ``sli_statistics.contract_sla_statistics`` into dicts.
+    """
+    return [
+        {
+            'sla': result['sla'].id,
+            'sla_name': result['sla'].name,
+            'sli': result['sla'].sli_id,
+            'sli_name': result['sla'].sli.name,
+            'threshold_type': result['sla'].threshold_type,
+            'threshold_value': result['sla'].threshold_value,
+            **{key: value for key, value in result.items() if key != 'sla'},
+        }
+        for result in results
+    ]
@@ -0,0 +1,242 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models import QuerySet
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from .fragments import invalidate_fragments
+from .ingestion import measurements_ingested
+from .models import (
+    ComplianceReport, ComplianceTrend, Contract, ContractTemplate, Measurement, Party,
+    ReportingPeriod, ServiceLevelAgreement, ServiceLevelIndicator, Tenant,
+    compliance_reports_generated, sla_saved
+)
+from .sla_tree import invalidate_sla_tree
+
+
+def _deleted_in_cascade(instance, origin):
+    """
+    Return whether a post_delete is for a row deleted in cascade of a row of another
+    model, e.g. the measurements of a deleted reporting period. ``origin`` is the
+    instance or queryset whose deletion was requested (None for other signals).
+    """
+    if origin is None:
+        return False
+    model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    return model is not type(instance)
+
+
+def _refresh_measurement_items(reporting_period_id, sli_id):
+    """
+    Recompute the report items for a single (reporting period, SLI) pair.
+    """
+    reports = ComplianceReport.objects.filter(reporting_period_id=reporting_period_id)
+    ComplianceReport.generate_many(reports, sli_ids=[sli_id])
+
+
+@receiver(post_save, sender=Measurement)
+def measurement_saved(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+
+    key = (instance.reporting_period_id, instance.sli_id)
+    loaded_key = getattr(instance, '_loaded_key', key)
+    if loaded_key != key:
+        _refresh_measurement_items(*loaded_key)
+    _refresh_measurement_items(*key)
+    instance._loaded_key = key
+
+
+@receiver(post_delete, sender=Measurement)
+def measurement_deleted(sender, instance, origin=None, **kwargs):
+    # The reports of a deleted period or contract are deleted too, and those of a
+    # deleted SLI are refreshed once by sli_deleted()
+    if _deleted_in_cascade(instance, origin):
+        return
+    _refresh_measurement_items(instance.reporting_period_id, instance.sli_id)
+
+
+@receiver(sla_saved, sender=ServiceLevelAgreement)
+@receiver(post_delete, sender=ServiceLevelAgreement)
+def sla_changed(sender, instance, **kwargs):
+    """
+    Recompute the report items for an SLA across all reports of its contract,
+    e.g. after its threshold was edited. Rollups are computed in tree order, so
+    this runs once the paths of a new or moved SLA are written (see ``sla_saved``).
+
+    SLAs deleted in cascade are skipped: the reports of a deleted contract are
+    deleted too, and the refresh of a deleted SLA or SLI covers its descendants.
+    """
+    if _deleted_in_cascade(instance, kwargs.get('origin')):
+        return
+    reports = ComplianceReport.objects.filter(reporting_period__contract_id=instance.contract_id)
+    ComplianceReport.generate_many(reports, sla_ids=[instance.pk])
+
+
+@receiver(sla_saved, sender=ServiceLevelAgreement)
+@receiver(post_delete, sender=ServiceLevelAgreement)
+def sla_tree_changed(sender, instance, **kwargs):
+    invalidate_sla_tree(instance.contract_id)
+
+
+@receiver(post_save, sender=ServiceLevelIndicator)
+def sli_changed(sender, instance, **kwargs):
+    """
+    Invalidate the SLA trees of all contracts that use the SLI.
+    """
+    contract_ids = ServiceLevelAgreement.objects.filter(sli=instance).values_list('contract_id', flat=True).distinct()
+    for contract_id in contract_ids:
+        invalidate_sla_tree(contract_id)
+
+
+@receiver(pre_delete, sender=ServiceLevelIndicator)
+def sli_deleting(sender, instance, **kwargs):
+    """
+    Remember the contracts whose SLAs or measurements use the SLI, before they are
+    deleted in cascade.
+    """
+    instance._contract_ids = set(
+        ServiceLevelAgreement.objects.filter(sli=instance).values_list('contract_id', flat=True)
+    ) | set(
+        Measurement.objects.filter(sli=instance).values_list('reporting_period__contract_id', flat=True)
+    )
+
+
+@receiver(post_delete, sender=ServiceLevelIndicator)
+def sli_deleted(sender, instance, **kwargs):
+    """
+    Refresh the reports of the contracts that used a deleted SLI once, instead of
+    once per measurement and SLA deleted in cascade.
+    """
+    contract_ids = list(getattr(instance, '_contract_ids', ()))
+    reports = ComplianceReport.objects.filter(reporting_period__contract_id__in=contract_ids)
+    ComplianceReport.generate_many(reports, sli_ids=[instance.pk])
+    for contract_id in contract_ids:
+        invalidate_sla_tree(contract_id)
+    invalidate_fragments('contract', contract_ids)
+
+
+def _refresh_trends_on_commit(periods):
+    """
+    Refresh the compliance trend of the tenants and months of the given reporting
+    periods once the deletion is committed, when the report items are gone.
+    """
+    buckets = {
+        (tenant_id, start_date.replace(day=1))
+        for tenant_id, start_date in periods.values_list('contract__tenant_id', 'start_date')
+    }
+    transaction.on_commit(partial(ComplianceTrend.refresh, buckets))
+
+
+@receiver(pre_delete, sender=Contract)
+@receiver(pre_delete, sender=ReportingPeriod)
+def reports_owner_deleted(sender, instance, origin=None, **kwargs):
+    """
+    Refresh the compliance trend of the reports deleted with a contract or a
+    reporting period once, instead of once per report.
+    """
+    if _deleted_in_cascade(instance, origin):
+        # Deleted with its tenant, whose trend is deleted too, or with its contract
+        return
+    periods = ReportingPeriod.objects.filter(compliance_report__isnull=False)
+    if sender is Contract:
+        periods = periods.filter(contract=instance)
+    else:
+        periods = periods.filter(pk=instance.pk)
+    _refresh_trends_on_commit(periods)
+
+
+@receiver(pre_delete, sender=ComplianceReport)
+def compliance_report_deleted(sender, instance, origin=None, **kwargs):
+    """
+    Refresh the compliance trend of a deleted report's tenant and month once the
+    deletion is committed, when the report items are gone. Reports deleted with
+    their contract or period are covered by reports_owner_deleted().
+    """
+    if _deleted_in_cascade(instance, origin):
+        return
+    tenant_id, start_date = ReportingPeriod.objects.filter(
+        pk=instance.reporting_period_id
+    ).values_list('contract__tenant_id', 'start_date').get()
+    transaction.on_commit(partial(ComplianceTrend.refresh, {(tenant_id, start_date.replace(day=1))}))
+
+
+def _invalidate_contract_fragments(contract_ids):
+    invalidate_fragments('contract', contract_ids)
+    invalidate_fragments('contracts')
+
+
+@receiver(post_save, sender=Contract)
+@receiver(post_delete, sender=Contract)
+def contract_changed(sender, instance, **kwargs):
+    _invalidate_contract_fragments([instance.pk])
+
+
+@receiver(post_save, sender=Tenant)
+@receiver(post_save, sender=ContractTemplate)
+def contract_owner_changed(sender, instance, **kwargs):
+    """
+    Invalidate the fragments of the contracts showing a renamed tenant or template.
+    """
+    _invalidate_contract_fragments(list(instance.contracts.values_list('pk', flat=True)))
+
+
+@receiver(post_save, sender=Party)
+def party_changed(sender, instance, **kwargs):
+    invalidate_fragments('contract', list(instance.contracts.values_list('pk', flat=True)))
+
+
+@receiver(m2m_changed, sender=Contract.parties.through)
+def contract_parties_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith('post_'):
+        return
+    if reverse:
+        contract_ids = pk_set if pk_set is not None else instance.contracts.values_list('pk', flat=True)
+    else:
+        contract_ids = [instance.pk]
+    invalidate_fragments('contract', list(contract_ids))
+
+
+@receiver(post_save, sender=ReportingPeriod)
+def reporting_period_changed(sender, instance, **kwargs):
+    invalidate_fragments('period', [instance.pk])
+
+
+@receiver(post_delete, sender=ReportingPeriod)
+def reporting_period_deleted(sender, instance, **kwargs):
+    # The SLI statistics of the contract include the period's measurements
+    invalidate_fragments('period', [instance.pk])
+    invalidate_fragments('contract', [instance.contract_id])
+
+
+@receiver(post_save, sender=ComplianceReport)
+@receiver(post_delete, sender=ComplianceReport)
+def compliance_report_changed(sender, instance, **kwargs):
+    invalidate_fragments('period', [instance.reporting_period_id])
+    invalidate_fragments('contracts')
+
+
+@receiver(compliance_reports_generated)
+def compliance_reports_regenerated(sender, period_ids, contract_ids, **kwargs):
+    invalidate_fragments('period', period_ids)
+    _invalidate_contract_fragments(contract_ids)
+
+
+@receiver(post_save, sender=Measurement)
+@receiver(post_delete, sender=Measurement)
+def measurement_changed(sender, instance, raw=False, origin=None, **kwargs):
+    """
+    Invalidate the SLI statistics of the measurement's contract. Measurements
+    deleted in cascade are covered by the receivers of their period or SLI.
+    """
+    if raw or _deleted_in_cascade(instance, origin):
+        return
+    contract_ids = ReportingPeriod.objects.filter(pk=instance.reporting_period_id).values_list('contract_id', flat=True)
+    invalidate_fragments('contract', list(contract_ids))
+
+
+@receiver(measurements_ingested)
+def measurements_ingested_changed(sender, period_ids, **kwargs):
+    contract_ids = ReportingPeriod.objects.filter(pk__in=period_ids).values_list('contract_id', flat=True).distinct()
+    invalidate_fragments('contract', list(contract_ids))
@@ -0,0 +1,122 @@
+"""
+Building and caching of the SLA tree of a contract.
+
+The SLA hierarchy changes rarely, so the tree structure of each contract is stored
+in Django's cache framework under a key that includes a per-contract version stamp.
+It is kept as a flat pre-ordered list of SLAs and their depths, which pages render
+in a single loop and which is nested only for the API (``get_sla_tree``).
+Saving or deleting an SLA or SLI replaces the version stamp (see ``signals.py``),
+which makes the cached tree unreachable.
+"""
+import uuid
+
+from django.core.cache import cache
+
+from .metrics import increment
+from .models import ServiceLevelAgreement
+
+# How long a cached SLA tree is kept, in seconds
+SLA_TREE_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def _version_key(contract_id):
+    return f'contracts:sla_tree_version:{contract_id}'
+
+
+def get_sla_tree_version(contract_id):
+    """
+    Return the version stamp of a contract's SLA tree, which changes whenever the tree does.
+    """
+    version = cache.get(_version_key(contract_id))
+    if version is None:
+        version = uuid.uuid4().hex
+        cache.set(_version_key(contract_id), version, None)
+    return version
+
+
+def invalidate_sla_tree(contract_id):
+    """
+    Invalidate the cached SLA tree of a contract by replacing its version stamp.
+    """
+    cache.set(_version_key(contract_id), uuid.uuid4().hex, None)
+
+
+def _load_sla_rows(contract_id):
+    """
+    Load all SLAs of a contract with their SLI in a single query, in tree order.
+    Returns a pre-ordered list of (SLA, depth) pairs, every SLA followed by its
+    subtree; depths are derived from the parents in the same linear pass.
+    """
+    depths = {}
+    rows = []
+    slas = ServiceLevelAgreement.objects.filter(contract_id=contract_id).select_related('sli').tree_order()
+    for sla in slas:
+        depth = depths[sla.parent_id] + 1 if sla.parent_id in depths else 0
+        depths[sla.id] = depth
+        rows.append((sla, depth))
+    return rows
+
+
+def get_sla_rows(contract_id):
+    """
+    Return the pre-ordered (SLA, depth) pairs of a contract's SLA tree, from the
+    cache if possible. The flat list is cached rather than nested nodes so that
+    pickling it does not recurse, whatever the depth of the tree.
+    """
+    key = f'contracts:sla_rows:{contract_id}:{get_sla_tree_version(contract_id)}'
+    rows = cache.get(key)
+    increment('contracts_cache_requests_total', cache='sla_tree', result='miss' if rows is None else 'hit')
+    if rows is None:
+        rows = _load_sla_rows(contract_id)
+        cache.set(key, rows, SLA_TREE_CACHE_TIMEOUT)
+    return rows
+
+
+def get_sla_tree(contract_id):
+    """
+    Return the SLA tree structure of a contract as a list of root nodes, each a
+    dict with the SLA and its child nodes, assembled from the cached rows.
+    """
+    roots = []
+    # Nodes of the ancestors of the current SLA, one per depth
+    ancestors = []
+    for sla, depth in get_sla_rows(contract_id):
+        node = {'sla': sla, 'children': []}
+        del ancestors[depth:]
+        (ancestors[-1]['children'] if ancestors else roots).append(node)
+        ancestors.append(node)
+    return roots
+
+
+def iter_sla_tree(nodes):
+    """
+    Yield the (node, depth) pairs of SLA tree nodes in pre-order, using an explicit
+    stack so trees of any depth are supported.
+    """
+    stack = [(node, 0) for node in reversed(nodes)]
+    while stack:
+        node, depth = stack.pop()
+        yield node, depth
+        stack.extend((child, depth + 1) for child in reversed(node['children']))
+
+
+def build_sla_rows(contract, report_items=(), rollups=()):
+    """
+    Return the rows of a contract's SLA tree in pre-order, each with the SLA, its
+    depth, its report item and, for parent SLAs, its compliance rollup, so that
+    templates render the tree in a single loop.
+
+    The SLA structure comes from the cache; report items and rollups are indexed
+    by SLA and attached in a single linear pass.
+    """
+    report_items_by_sla = {item.sla_id: item for item in report_items}
+    rollups_by_sla = {rollup.sla_id: rollup for rollup in rollups}
+    return [
+        {
+            'sla': sla,
+            'depth': depth,
+            'report_item': report_items_by_sla.get(sla.id),
+            'rollup': rollups_by_sla.get(sla.id),
+        }
+        for sla, depth in get_sla_rows(contract.id)
+    ]
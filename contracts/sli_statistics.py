@@ -0,0 +1,117 @@
+"""
+Statistics over the measurement history of SLIs.
+
+The calculated values of a contract's measurements are loaded with a single query
+as one column per SLI, in reporting period order, and all metrics are computed on
+whole columns: distribution (mean, spread, percentiles) and, against an SLA's
+threshold, breaches, breach streaks and the drift of the margin to the threshold.
+"""
+import numpy as np
+
+from .models import Measurement, ServiceLevelAgreement
+
+# Percentiles reported for every SLI
+PERCENTILES = (50, 90, 95, 99)
+
+
+def load_history(measurements):
+    """
+    Load the calculated values of the given measurements with a single query,
+    grouped by SLI in reporting period order. Returns a dict mapping SLI ids to
+    arrays of values.
+    """
+    rows = measurements.order_by('sli_id', 'reporting_period__start_date').values_list('sli_id', 'calculated_value')
+    data = np.fromiter(rows.iterator(), dtype=[('sli', 'i8'), ('value', 'f8')])
+    if not len(data):
+        return {}
+    boundaries = np.flatnonzero(np.diff(data['sli'])) + 1
+    starts = np.concatenate(([0], boundaries))
+    return {
+        int(data['sli'][start]): values
+        for start, values in zip(starts, np.split(data['value'], boundaries))
+    }
+
+
+def describe(values):
+    """
+    Distribution statistics of a non-empty series of values.
+    """
+    percentiles = np.percentile(values, PERCENTILES)
+    result = {
+        'count': len(values),
+        'mean': float(values.mean()),
+        'std': float(values.std()),
+        'min': float(values.min()),
+        'max': float(values.max()),
+    }
+    for q, value in zip(PERCENTILES, percentiles):
+        result[f'p{q}'] = float(value)
+    return result
+
+
+def _slope(values):
+    """
+    Least squares slope of the values per step, or None for fewer than two values.
+    """
+    n = len(values)
+    if n < 2:
+        return None
+    x = np.arange(n) - (n - 1) / 2
+    return float((x * (values - values.mean())).sum() / (x * x).sum())
+
+
+def threshold_statistics(values, threshold_type, threshold_value):
+    """
+    Breach and drift statistics of a non-empty series of values against a threshold.
+
+    The margin is the distance to the threshold, positive while the threshold is met
+    and negative while it is breached; its drift is the least squares slope of the
+    margin per reporting period, so a negative drift means it is eroding.
+    """
+    margins = values - threshold_value if threshold_type == 'MIN' else threshold_value - values
+    breaches = margins < 0
+
+    # Runs of breaches start where the padded series steps up and end where it steps down
+    edges = np.diff(np.concatenate(([0], breaches.astype(np.int8), [0])))
+    run_starts, run_ends = np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+    run_lengths = run_ends - run_starts
+    breach_count = int(breaches.sum())
+    longest_streak = int(run_lengths.max()) if len(run_lengths) else 0
+    current_streak = int(run_lengths[-1]) if len(run_lengths) and run_ends[-1] == len(values) else 0
+
+    return {
+        'breaches': breach_count,
+        'breach_rate': breach_count * 100.0 / len(values),
+        'current_breach_streak': current_streak,
+        'longest_breach_streak': longest_streak,
+        'mean_margin': float(margins.mean()),
+        'latest_margin': float(margins[-1]),
+        'margin_drift': _slope(margins),
+    }
+
+
+def contract_sla_statistics(contract_id):
+    """
+    Statistics of the measurement history of every SLA of a contract that has an
+    SLI, in tree order, with the threshold statistics under ``threshold`` (None for
+    SLAs without a threshold). SLAs without measurements are left out. Uses two queries.
+    """
+    slas = list(
+        ServiceLevelAgreement.objects.filter(contract_id=contract_id, sli__isnull=False).select_related('sli').tree_order()
+    )
+    history = load_history(Measurement.objects.filter(
+        reporting_period__contract_id=contract_id,
+        sli_id__in={sla.sli_id for sla in slas},
+    ))
+
+    results = []
+    for sla in slas:
+        values = history.get(sla.sli_id)
+        if values is None:
+            continue
+
+        threshold = None
+        if sla.threshold_type and sla.threshold_value is not None:
+            threshold = threshold_statistics(values, sla.threshold_type, sla.threshold_value)
+        results.append({'sla': sla, **describe(values), 'threshold': threshold})
+    return results
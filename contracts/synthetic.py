@@ -0,0 +1,162 @@
+"""
+Generation of synthetic data at scale, for load testing and benchmarks.
+
+The dataset is parameterized by the number of tenants, contracts per tenant,
+SLA tree depth and width, years of monthly reporting periods and SLIs. Every
+step writes through ``bulk_create`` in batches, so a dataset of thousands of
+contracts is created with a few dozen queries per table.
+"""
+import random
+from datetime import date
+
+from dateutil.relativedelta import relativedelta
+
+from .models import (
+    GENERATE_BATCH_SIZE, ComplianceReport, ComplianceTrend, Contract, Measurement, ReportingPeriod,
+    ServiceLevelAgreement, ServiceLevelIndicator, Tenant
+)
+
+# Threshold of the generated SLAs; measurements are drawn uniformly from
+# [0, SYNTHETIC_VALUE_MAX), so about five in six of them are compliant
+SYNTHETIC_THRESHOLD = 10.0
+SYNTHETIC_VALUE_MAX = 12.0
+
+
+def create_tenants(count, prefix='Synthetic'):
+    existing = Tenant.objects.count()
+    return Tenant.objects.bulk_create(
+        [Tenant(name=f'{prefix} Tenant {existing + i + 1}') for i in range(count)],
+        batch_size=GENERATE_BATCH_SIZE,
+    )
+
+
+def create_slis(count, prefix='Synthetic'):
+    return ServiceLevelIndicator.objects.bulk_create(
+        [ServiceLevelIndicator(name=f'{prefix} Indicator {i + 1}', unit='hours') for i in range(count)],
+        batch_size=GENERATE_BATCH_SIZE,
+    )
+
+
+def create_contracts(tenants, per_tenant, years, start_date=None):
+    """
+    Create active monthly contracts running for ``years`` years from ``start_date``,
+    by default ending at the start of the current year, without reporting periods.
+    """
+    start_date = start_date or date(date.today().year - years, 1, 1)
+    expiration_date = start_date + relativedelta(years=years, days=-1)
+    return Contract.objects.bulk_create(
+        [
+            Contract(
+                tenant=tenant,
+                name=f'{tenant.name} Contract {i + 1}',
+                signature_date=start_date,
+                effective_date=start_date,
+                expiration_date=expiration_date,
+                status='ACTIVE',
+            )
+            for tenant in tenants
+            for i in range(per_tenant)
+        ],
+        batch_size=GENERATE_BATCH_SIZE,
+    )
+
+
+def create_sla_trees(contracts, depth, width, slis):
+    """
+    Create an SLA tree of the given depth for every contract, where every SLA above
+    the last level has ``width`` children. Leaf SLAs measure the SLIs in turn.
+    The tree is created one level at a time for all contracts. Returns the number
+    of SLAs created.
+    """
+    level = ServiceLevelAgreement.objects.bulk_create(
+        [ServiceLevelAgreement(contract=contract, name='Service Levels') for contract in contracts],
+        batch_size=GENERATE_BATCH_SIZE,
+    )
+    created = len(level)
+
+    for depth_index in range(1, depth):
+        is_leaf = depth_index == depth - 1
+        children = []
+        for parent in level:
+            for i in range(width):
+                child = ServiceLevelAgreement(
+                    contract_id=parent.contract_id, parent=parent, name=f'{parent.name} / {i + 1}'
+                )
+                if is_leaf:
+                    child.sli = slis[len(children) % len(slis)]
+                    child.threshold_type = 'MAX'
+                    child.threshold_value = SYNTHETIC_THRESHOLD
+                children.append(child)
+        level = ServiceLevelAgreement.objects.bulk_create(children, batch_size=GENERATE_BATCH_SIZE)
+        created += len(level)
+
+    ServiceLevelAgreement.rebuild_paths([contract.pk for contract in contracts])
+    return created
+
+
+def create_measurements(contracts, rng):
+    """
+    Create one measurement per reporting period for every SLI measured by the SLAs
+    of the given contracts. Returns the number of measurements created.
+    """
+    slis_by_contract = {}
+    for contract_id, sli_id in ServiceLevelAgreement.objects.filter(
+        contract__in=contracts, sli__isnull=False
+    ).values_list('contract_id', 'sli_id').distinct():
+        slis_by_contract.setdefault(contract_id, []).append(sli_id)
+
+    def measurements():
+        periods = ReportingPeriod.objects.filter(contract__in=contracts).order_by('pk')
+        for period_id, contract_id in periods.values_list('pk', 'contract_id'):
+            for sli_id in slis_by_contract.get(contract_id, []):
+                value = rng.uniform(0, SYNTHETIC_VALUE_MAX)
+                yield Measurement(
+                    reporting_period_id=period_id, sli_id=sli_id,
+                    reported_value=value, calculated_value=value
+                )
+
+    created = 0
+    batch = []
+    for measurement in measurements():
+        batch.append(measurement)
+        if len(batch) == GENERATE_BATCH_SIZE:
+            created += len(Measurement.objects.bulk_create(batch))
+            batch = []
+    created += len(Measurement.objects.bulk_create(batch))
+    return created
+
+
+def generate_reports(contracts, batch_size=GENERATE_BATCH_SIZE):
+    """
+    Generate the compliance reports of every reporting period of the contracts, then
+    rebuild the compliance trend of their tenants once. Returns the number of reports.
+    """
+    reports = 0
+    periods = list(ReportingPeriod.objects.filter(contract__in=contracts).order_by('pk'))
+    for offset in range(0, len(periods), batch_size):
+        reports += len(ComplianceReport.generate_for_periods(periods[offset:offset + batch_size], refresh_trends=False))
+    ComplianceTrend.rebuild(tenant_ids={contract.tenant_id for contract in contracts})
+    return reports
+
+
+def generate_synthetic_data(tenants=10, contracts_per_tenant=10, sla_depth=3, sla_width=3, years=2,
+                            slis=5, reports=True, seed=0):
+    """
+    Generate a synthetic dataset and return a dict counting the objects created.
+    The same parameters and ``seed`` always produce the same measurement values.
+    """
+    rng = random.Random(seed)
+    counts = {}
+
+    tenant_objects = create_tenants(tenants)
+    sli_objects = create_slis(slis)
+    contracts = create_contracts(tenant_objects, contracts_per_tenant, years)
+    counts['tenants'] = len(tenant_objects)
+    counts['slis'] = len(sli_objects)
+    counts['contracts'] = len(contracts)
+    counts['reporting_periods'] = len(Contract.generate_reporting_periods_for(contracts))
+    counts['slas'] = create_sla_trees(contracts, sla_depth, sla_width, sli_objects)
+    counts['measurements'] = create_measurements(contracts, rng)
+    if reports:
+        counts['compliance_reports'] = generate_reports(contracts)
+    return counts
@@ -0,0 +1,45 @@
+"""
+Django's ``{% cache %}`` tag, counting fragment cache hits and misses in the
+``contracts_cache_requests_total`` metric (see ``metrics.py``).
+
+Usage is the same as the built-in tag, after ``{% load fragment_cache %}``.
+"""
+from django.template import Library, NodeList
+from django.templatetags.cache import CacheNode, do_cache
+
+from ..metrics import increment
+
+register = Library()
+
+
+class _MissRecordingNodeList(NodeList):
+    """
+    The contents of a cached fragment, which are only rendered on a cache miss.
+    """
+
+    def __init__(self, nodelist, cache_node):
+        super().__init__(nodelist)
+        self.cache_node = cache_node
+
+    def render(self, context):
+        context.render_context[self.cache_node] = 'miss'
+        return super().render(context)
+
+
+class CountingCacheNode(CacheNode):
+    def __init__(self, node):
+        super().__init__(
+            _MissRecordingNodeList(node.nodelist, self), node.expire_time_var, node.fragment_name,
+            node.vary_on, node.cache_name,
+        )
+
+    def render(self, context):
+        context.render_context[self] = 'hit'
+        value = super().render(context)
+        increment('contracts_cache_requests_total', cache='fragment', result=context.render_context[self])
+        return value
+
+
+@register.tag('cache')
+def do_counting_cache(parser, token):
+    return CountingCacheNode(do_cache(parser, token))
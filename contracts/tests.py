@@ -1,3 +1,1431 @@
-from django.test import TestCase
+import asyncio
+import base64
+import importlib
+from datetime import date
+from io import BytesIO, StringIO
+import csv
+import json
+import os
+import tempfile
+import zipfile
+from unittest.mock import AsyncMock, Mock, patch
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import Permission, User
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.http import QueryDict
+from django.test import Client, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import clear_url_caches, resolve, reverse
+from django.utils import timezone
+
+from .models import (
+    Tenant, ContractTemplate, Party, Contract, ReportingPeriod,
+    ServiceLevelIndicator, ServiceLevelAgreement, Measurement, ComplianceReport, ComplianceReportItem,
+    ComplianceTrend, Job, SLA_PATH_SEGMENT_WIDTH
+)
+from config import urls as config_urls
+
+from . import jobs, metrics, sli_statistics, urls as contracts_urls
+from .regeneration import Checkpoint, list_shards, regenerate_shard
+from .jobs import execute_job
+from .ingestion import ingest_measurements
+from .instrumentation import instrument
+from .sla_tree import build_sla_rows, get_sla_tree
+from .synthetic import generate_synthetic_data
+
+
+class ContractListQueryCountTests(TestCase):
+    """
+    Regression tests ensuring the contract list views issue a fixed number of
+    queries regardless of how many contracts are shown.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        cls.tenant = Tenant.objects.create(name='Demo')
+        cls.template = ContractTemplate.objects.create(
+            tenant=cls.tenant, name='Standard Terms', publication_date=date(2023, 1, 1)
+        )
+        cls.party = Party.objects.create(name='Shinin', type='SELLER')
+        cls.sli = ServiceLevelIndicator.objects.create(name='Priority 1 Time to Fix', unit='hours')
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def _add_contracts(self, count):
+        for i in range(count):
+            contract = Contract.objects.create(
+                tenant=self.tenant,
+                template=self.template,
+                name=f'Contract {Contract.objects.count()}',
+                effective_date=date(2023, 1, 1),
+                expiration_date=date(2023, 3, 31),
+                status='ACTIVE',
+            )
+            contract.generate_reporting_periods()
+            contract.parties.add(self.party)
+            ServiceLevelAgreement.objects.create(
+                contract=contract, name='Priority 1 Remediation', sli=self.sli,
+                threshold_type='MAX', threshold_value=1.0
+            )
+            for period in contract.reporting_periods.all():
+                Measurement.objects.create(
+                    reporting_period=period, sli=self.sli,
+                    reported_value=(i % 2) * 2, calculated_value=(i % 2) * 2
+                )
+                ComplianceReport.objects.create(reporting_period=period).generate()
+
+    def _count_queries(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries)
+
+    def _assert_constant_queries(self, url):
+        self._add_contracts(2)
+        baseline = self._count_queries(url)
+        self._add_contracts(10)
+        self.assertEqual(self._count_queries(url), baseline)
+
+    def test_dashboard_query_count(self):
+        self._assert_constant_queries(reverse('contracts:dashboard'))
+
+    def test_tenant_detail_query_count(self):
+        self._assert_constant_queries(reverse('contracts:tenant_detail', args=[self.tenant.id]))
+
+    def test_template_detail_query_count(self):
+        self._assert_constant_queries(reverse('contracts:template_detail', args=[self.template.id]))
+
+    def test_party_detail_query_count(self):
+        self._assert_constant_queries(reverse('contracts:party_detail', args=[self.party.id]))
+
+    def test_dashboard_keyset_pagination(self):
+        self._add_contracts(7)
+        url = reverse('contracts:dashboard')
+
+        names = []
+        response = self.client.get(url, {'page_size': 3, 'sort': '-name'})
+        while True:
+            names.extend(contract.name for contract in response.context['contracts'])
+            if not response.context['page'].next_url:
+                break
+            response = self.client.get(url + response.context['page'].next_url)
+        self.assertEqual(names, sorted(Contract.objects.values_list('name', flat=True), reverse=True))
+
+        previous = self.client.get(url + response.context['page'].previous_url)
+        self.assertEqual([contract.name for contract in previous.context['contracts']], names[3:6])
+
+    def test_dashboard_ignores_invalid_cursor(self):
+        self._add_contracts(4)
+        url = reverse('contracts:dashboard')
+
+        def names(**params):
+            response = self.client.get(url, {'page_size': 2, **params})
+            self.assertEqual(response.status_code, 200)
+            return [contract.name for contract in response.context['contracts']], response
+
+        cursors = {
+            sort: QueryDict(names(sort=sort)[1].context['page'].next_url[1:])['cursor']
+            for sort in ('name', 'updated')
+        }
+
+        # A cursor of another sort order or direction, e.g. from an edited URL, starts over
+        for sort, cursor in (
+            ('updated', cursors['name']), ('name', cursors['updated']), ('status', cursors['updated']),
+            ('-name', cursors['name']), ('name', 'garbage'),
+        ):
+            self.assertEqual(names(sort=sort, cursor=cursor)[0], names(sort=sort)[0])
+
+    def test_dashboard_filters(self):
+        self._add_contracts(4)
+        Contract.objects.filter(name='Contract 0').update(status='EXPIRED')
+        url = reverse('contracts:dashboard')
+
+        response = self.client.get(url, {'status': 'EXPIRED'})
+        self.assertEqual([contract.name for contract in response.context['contracts']], ['Contract 0'])
+
+        response = self.client.get(url, {'compliance': 'non_compliant'})
+        self.assertEqual([contract.name for contract in response.context['contracts']], ['Contract 1', 'Contract 3'])
+
+    def test_with_latest_compliance_uses_latest_report(self):
+        self._add_contracts(2)
+        contracts = Contract.objects.with_latest_compliance().order_by('id')
+
+        for contract in contracts:
+            latest_period = contract.reporting_periods.order_by('-end_date').first()
+            self.assertEqual(contract.latest_period_id, latest_period.id)
+            self.assertEqual(contract.latest_report_date, latest_period.compliance_report.generated_at)
+            self.assertEqual(contract.total_items, 1)
+
+        self.assertEqual([c.compliance_percentage for c in contracts], [100.0, 0.0])
+
+
+class ComplianceDataMixin:
+    """
+    Creates a contract with three leaf SLAs, one of which has no measurements.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        tenant = Tenant.objects.create(name='Demo')
+        cls.sli_fix = ServiceLevelIndicator.objects.create(name='Time to Fix', unit='hours')
+        cls.sli_uptime = ServiceLevelIndicator.objects.create(name='Uptime', unit='%')
+        cls.sli_unmeasured = ServiceLevelIndicator.objects.create(name='Unmeasured')
+        cls.contract = Contract.objects.create(
+            tenant=tenant,
+            name='Contract',
+            effective_date=date(2023, 1, 1),
+            expiration_date=date(2023, 12, 31),
+            status='ACTIVE',
+        )
+        cls.contract.generate_reporting_periods()
+        root = ServiceLevelAgreement.objects.create(contract=cls.contract, name='Mitigation')
+        ServiceLevelAgreement.objects.create(
+            contract=cls.contract, parent=root, name='Fix', sli=cls.sli_fix,
+            threshold_type='MAX', threshold_value=4.0
+        )
+        ServiceLevelAgreement.objects.create(
+            contract=cls.contract, parent=root, name='Uptime', sli=cls.sli_uptime,
+            threshold_type='MIN', threshold_value=99.9
+        )
+        ServiceLevelAgreement.objects.create(
+            contract=cls.contract, parent=root, name='Unmeasured', sli=cls.sli_unmeasured,
+            threshold_type='MIN', threshold_value=1.0
+        )
+        for period in cls.contract.reporting_periods.all():
+            Measurement.objects.create(
+                reporting_period=period, sli=cls.sli_fix, reported_value=2.0, calculated_value=2.0
+            )
+            Measurement.objects.create(
+                reporting_period=period, sli=cls.sli_uptime, reported_value=99.0, calculated_value=99.0
+            )
+
+
+class ComplianceReportGenerationTests(ComplianceDataMixin, TestCase):
+    """
+    Tests for the set-based compliance report generation.
+    """
+
+    def test_generate_evaluates_thresholds(self):
+        period = self.contract.reporting_periods.first()
+        report = ComplianceReport.objects.create(reporting_period=period)
+        report.generate()
+        report.generate()
+
+        items = {item.sla.name: item.is_compliant for item in report.items.select_related('sla')}
+        self.assertEqual(items, {'Fix': True, 'Uptime': False})
+
+        report.refresh_from_db()
+        self.assertEqual((report.total_items, report.compliant_items), (2, 1))
+        self.assertEqual(report.compliance_percentage, 50.0)
+
+    def test_generate_rolls_up_parent_slas(self):
+        fix = ServiceLevelAgreement.objects.get(name='Fix')
+        ServiceLevelAgreement.objects.create(
+            contract=self.contract, parent=fix, name='Fix detail', sli=self.sli_uptime,
+            threshold_type='MAX', threshold_value=100.0
+        )
+        period = self.contract.reporting_periods.first()
+        report = ComplianceReport.objects.create(reporting_period=period)
+        report.generate()
+
+        rollups = {
+            rollup.sla.name: (rollup.compliant_items, rollup.total_items, rollup.is_compliant)
+            for rollup in report.rollups.select_related('sla')
+        }
+        self.assertEqual(rollups, {'Mitigation': (2, 3, False), 'Fix': (2, 2, True)})
+
+    def test_generate_for_periods_uses_fixed_number_of_queries(self):
+        periods = list(self.contract.reporting_periods.all())
+        ComplianceReport.objects.create(reporting_period=periods[0])
+
+        with self.assertNumQueries(19):
+            reports = ComplianceReport.generate_for_periods(periods)
+
+        self.assertEqual(len(reports), len(periods))
+        self.assertEqual(ComplianceReport.objects.count(), len(periods))
+        self.assertEqual(
+            sorted(ComplianceReport.objects.values_list('items__is_compliant', flat=True)),
+            [False] * len(periods) + [True] * len(periods)
+        )
+
+
+class IncrementalComplianceTests(ComplianceDataMixin, TestCase):
+    """
+    Tests for refreshing report items when measurements or SLAs change.
+    """
+
+    def setUp(self):
+        self.period = self.contract.reporting_periods.first()
+        self.report = ComplianceReport.objects.create(reporting_period=self.period)
+        self.report.generate()
+
+    def _items(self):
+        return {item.sla.name: item.is_compliant for item in self.report.items.select_related('sla')}
+
+    def test_measurement_save_refreshes_items(self):
+        measurement = Measurement.objects.get(reporting_period=self.period, sli=self.sli_uptime)
+        measurement.calculated_value = 99.95
+        measurement.save()
+        self.assertEqual(self._items(), {'Fix': True, 'Uptime': True})
+
+        Measurement.objects.create(
+            reporting_period=self.period, sli=self.sli_unmeasured, reported_value=0.0, calculated_value=0.0
+        )
+        self.assertEqual(self._items(), {'Fix': True, 'Uptime': True, 'Unmeasured': False})
+
+    def test_measurement_delete_refreshes_items(self):
+        Measurement.objects.get(reporting_period=self.period, sli=self.sli_fix).delete()
+        self.assertEqual(self._items(), {'Uptime': False})
+
+    def test_sli_delete_refreshes_reports(self):
+        self.sli_uptime.delete()
+        self.assertEqual(self._items(), {'Fix': True})
+        self.report.refresh_from_db()
+        self.assertEqual((self.report.total_items, self.report.compliant_items), (1, 1))
+
+    def test_sla_threshold_edit_refreshes_items(self):
+        sla = ServiceLevelAgreement.objects.get(contract=self.contract, name='Fix')
+        sla.threshold_value = 1.0
+        sla.save()
+        self.assertEqual(self._items(), {'Fix': False, 'Uptime': False})
+
+    def _rollups(self):
+        return {
+            rollup.sla.name: (rollup.compliant_items, rollup.total_items)
+            for rollup in self.report.rollups.select_related('sla')
+        }
+
+    def test_sla_create_refreshes_rollups(self):
+        root = ServiceLevelAgreement.objects.get(contract=self.contract, name='Mitigation')
+        ServiceLevelAgreement.objects.create(
+            contract=self.contract, parent=root, name='Fix again', sli=self.sli_fix,
+            threshold_type='MAX', threshold_value=4.0
+        )
+        self.assertEqual(self._rollups(), {'Mitigation': (2, 3)})
+
+    def test_sla_move_refreshes_rollups(self):
+        root = ServiceLevelAgreement.objects.get(contract=self.contract, name='Mitigation')
+        group = ServiceLevelAgreement.objects.create(contract=self.contract, parent=root, name='Group')
+        sla = ServiceLevelAgreement.objects.get(contract=self.contract, name='Fix')
+        sla.parent = group
+        sla.save()
+        self.assertEqual(self._rollups(), {'Mitigation': (1, 2), 'Group': (1, 1)})
+        self.assertEqual(
+            [node['sla'].name for node in get_sla_tree(self.contract.id)[0]['children']],
+            ['Uptime', 'Unmeasured', 'Group']
+        )
+
+    def test_measurement_change_updates_counters(self):
+        measurement = Measurement.objects.get(reporting_period=self.period, sli=self.sli_uptime)
+        measurement.calculated_value = 99.95
+        measurement.save()
+
+        self.report.refresh_from_db()
+        self.assertEqual((self.report.total_items, self.report.compliant_items), (2, 2))
+        self.assertEqual(self.report.compliance_percentage, 100.0)
+
+    def test_sync_compliance_counters_command(self):
+        ComplianceReport.objects.filter(pk=self.report.pk).update(total_items=0, compliant_items=0)
+
+        with self.assertRaises(CommandError):
+            call_command('sync_compliance_counters', '--verify', stdout=StringIO())
+
+        call_command('sync_compliance_counters', stdout=StringIO())
+        call_command('sync_compliance_counters', '--verify', stdout=StringIO())
+        self.report.refresh_from_db()
+        self.assertEqual((self.report.total_items, self.report.compliant_items), (2, 1))
+
+
+class MeasurementIngestionTests(ComplianceDataMixin, TestCase):
+    """
+    Tests for bulk measurement ingestion from CSV and JSON Lines.
+    """
+
+    def setUp(self):
+        self.period = self.contract.reporting_periods.first()
+        self.report = ComplianceReport.objects.create(reporting_period=self.period)
+        self.report.generate()
+
+    def _items(self):
+        return {item.sla.name: item.is_compliant for item in self.report.items.select_related('sla')}
+
+    def test_csv_upserts_and_refreshes_reports(self):
+        lines = [
+            'contract_id,sli,date,reported_value,calculated_value\n',
+            f'{self.contract.id},Uptime,2023-01-15,99.95,\n',
+            f'{self.contract.id},Unmeasured,2023-01-31,0,5\n',
+            f'{self.contract.id},Unknown,2023-01-15,1,\n',
+            f'{self.contract.id},Uptime,2024-06-01,1,\n',
+        ]
+        result = ingest_measurements(lines, 'csv')
+
+        self.assertEqual((result.rows, result.upserted, result.error_count), (4, 2, 2))
+        self.assertEqual(result.refreshed_reports, 1)
+        self.assertEqual(Measurement.objects.filter(reporting_period=self.period).count(), 3)
+        self.assertEqual(self._items(), {'Fix': True, 'Uptime': True, 'Unmeasured': True})
+        self.report.refresh_from_db()
+        self.assertEqual((self.report.total_items, self.report.compliant_items), (3, 3))
+
+    def test_json_lines_command(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.ndjson', delete=False) as stream:
+            stream.write(json.dumps({
+                'contract_id': self.contract.id, 'sli': 'Time to Fix', 'date': '2023-01-02',
+                'reported_value': 8, 'is_disputed': True,
+            }) + '\n\n{not json}\n')
+        self.addCleanup(os.remove, stream.name)
+
+        out, err = StringIO(), StringIO()
+        call_command('ingest_measurements', stream.name, stdout=out, stderr=err)
+
+        self.assertIn('Ingested 1 measurements from 2 rows', out.getvalue())
+        self.assertIn('line 3: invalid JSON', err.getvalue())
+        measurement = Measurement.objects.get(reporting_period=self.period, sli=self.sli_fix)
+        self.assertEqual((measurement.calculated_value, measurement.is_disputed), (8.0, True))
+        self.assertEqual(self._items(), {'Fix': False, 'Uptime': False})
+
+    def test_ingest_endpoint(self):
+        url = reverse('api:measurement-ingest')
+        body = f'contract_id,sli,date,reported_value\n{self.contract.id},Uptime,2023-01-01,100\n'
+        client = Client(enforce_csrf_checks=True)
+        credentials = {'HTTP_AUTHORIZATION': 'Basic ' + base64.b64encode(b'ingest:password').decode()}
+
+        user = User.objects.create_user('ingest', password='password')
+        response = client.post(url, body, content_type='text/csv', **credentials)
+        self.assertEqual(response.status_code, 403)
+
+        user.user_permissions.add(Permission.objects.get(codename='add_measurement'))
+        response = client.post(url, body, content_type='application/xml', **credentials)
+        self.assertEqual(response.status_code, 415)
+
+        # Exporters authenticate with HTTP Basic credentials, without a CSRF token
+        response = client.post(url, body, content_type='text/csv', **credentials)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['upserted'], 1)
+        self.assertEqual(self._items(), {'Fix': True, 'Uptime': True})
+
+        # The format can also be given as a query parameter
+        body = json.dumps({'contract_id': self.contract.id, 'sli': 'Uptime', 'date': '2023-01-01', 'reported_value': 99})
+        response = client.post(f'{url}?input_format=jsonl', body, content_type='text/plain', **credentials)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['upserted'], 1)
+        self.assertEqual(self._items(), {'Fix': True, 'Uptime': False})
+
+        # Session clients still need a CSRF token
+        client.force_login(user)
+        response = client.post(url, body, content_type='text/csv')
+        self.assertEqual(response.status_code, 403)
+
+
+class ComplianceExportTests(ComplianceDataMixin, TestCase):
+    """
+    Tests for the streaming compliance report export.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        ComplianceReport.generate_for_periods(cls.contract.reporting_periods.all())
+
+    def setUp(self):
+        self.client.force_login(User.objects.create_user('auditor', password='password'))
+
+    def _csv_rows(self, **params):
+        response = self.client.get(reverse('contracts:export_compliance'), params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return list(csv.reader(line.decode() for line in response.streaming_content))
+
+    def test_csv_export_filters(self):
+        rows = self._csv_rows(contract=self.contract.id, start='2023-03-15', end='2023-04-01')
+        self.assertEqual(rows[0][:3], ['Tenant', 'Contract ID', 'Contract'])
+        self.assertEqual(
+            [(row[3], row[5], row[-1]) for row in rows[1:]],
+            [('2023-03-01', 'Fix', 'True'), ('2023-03-01', 'Uptime', 'False'),
+             ('2023-04-01', 'Fix', 'True'), ('2023-04-01', 'Uptime', 'False')]
+        )
+
+        rows = self._csv_rows(status='non_compliant')
+        self.assertEqual({row[5] for row in rows[1:]}, {'Uptime'})
+        self.assertEqual(len(rows) - 1, self.contract.reporting_periods.count())
+
+        response = self.client.get(reverse('contracts:export_compliance'), {'start': 'yesterday'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_xlsx_export_is_a_valid_workbook(self):
+        response = self.client.get(reverse('contracts:export_compliance'), {'format': 'xlsx', 'status': 'compliant'})
+        self.assertEqual(response.status_code, 200)
+
+        with zipfile.ZipFile(BytesIO(b''.join(response.streaming_content))) as archive:
+            self.assertIn('xl/workbook.xml', archive.namelist())
+            sheet = archive.read('xl/worksheets/sheet1.xml').decode()
+        self.assertEqual(sheet.count('<row>'), self.contract.reporting_periods.count() + 1)
+        self.assertIn('<t xml:space="preserve">Time to Fix</t>', sheet)
+
+    def test_export_command(self):
+        out = StringIO()
+        call_command('export_compliance', '--tenant', str(self.contract.tenant_id), '--status', 'compliant', stdout=out)
+        rows = list(csv.reader(StringIO(out.getvalue())))
+        self.assertEqual(len(rows), self.contract.reporting_periods.count() + 1)
+
+        with self.assertRaises(CommandError):
+            call_command('export_compliance', '--format', 'xlsx', stdout=StringIO())
+
+
+class ReadOnlyApiTests(ComplianceDataMixin, TestCase):
+    """
+    Tests for the read-only REST API.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.reports = ComplianceReport.generate_for_periods(cls.contract.reporting_periods.all())
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(User.objects.create_user('integration', password='password'))
+
+    def test_requires_authentication(self):
+        self.client.logout()
+        response = self.client.get(reverse('api:contract-list'))
+        self.assertEqual(response.status_code, 403)
+
+    def test_cursor_pagination_and_sparse_fields(self):
+        url = reverse('api:reportingperiod-list')
+        response = self.client.get(url, {'contract': self.contract.id, 'page_size': 5, 'fields': 'id,compliance'})
+        data = response.json()
+        self.assertEqual(len(data['results']), 5)
+        self.assertEqual(set(data['results'][0]), {'id', 'compliance'})
+        self.assertEqual(data['results'][0]['compliance']['compliance_percentage'], 50.0)
+        self.assertIsNone(data['previous'])
+
+        ids = [period['id'] for period in data['results']]
+        while data['next']:
+            data = self.client.get(data['next']).json()
+            ids.extend(period['id'] for period in data['results'])
+        self.assertEqual(ids, list(self.contract.reporting_periods.order_by('id').values_list('id', flat=True)))
+
+    def test_report_detail_query_count(self):
+        url = reverse('api:compliancereport-detail', args=[self.reports[0].id])
+        # Session, user, conditional aggregate, report, items and rollups
+        with self.assertNumQueries(6):
+            response = self.client.get(url)
+        data = response.json()
+        self.assertEqual(
+            [(item['sla_name'], item['is_compliant']) for item in data['items']],
+            [('Fix', True), ('Uptime', False)]
+        )
+        self.assertEqual(data['rollups'][0]['sla_name'], 'Mitigation')
+
+    def test_conditional_requests_return_not_modified(self):
+        url = reverse('api:compliancereport-detail', args=[self.reports[0].id])
+        response = self.client.get(url)
+        etag = response['ETag']
+        self.assertTrue(response.has_header('Last-Modified'))
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+
+        measurement = Measurement.objects.get(reporting_period=self.reports[0].reporting_period, sli=self.sli_uptime)
+        measurement.calculated_value = 99.95
+        measurement.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['compliance_percentage'], 100.0)
+
+    def test_list_etag_changes_on_delete(self):
+        url = reverse('api:compliancereport-list')
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        self.reports[-1].delete()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_contract_etag_covers_tenant_and_template(self):
+        tenant = self.contract.tenant
+        template = ContractTemplate.objects.create(tenant=tenant, name='Terms', publication_date=date(2023, 1, 1))
+        self.contract.template = template
+        self.contract.save()
+        url = reverse('api:contract-detail', args=[self.contract.id])
+
+        def assert_modified(change):
+            etag = self.client.get(url)['ETag']
+            change()
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200)
+            return response.json()
+
+        tenant.name = 'Renamed'
+        self.assertEqual(assert_modified(tenant.save)['tenant_name'], 'Renamed')
+        template.name = 'Renamed'
+        self.assertEqual(assert_modified(template.save)['template_name'], 'Renamed')
+        self.assertIsNone(assert_modified(template.delete)['template_name'])
+
+    def test_period_etag_changes_on_report_delete(self):
+        url = reverse('api:reportingperiod-list')
+        etag = self.client.get(url, {'contract': self.contract.id})['ETag']
+
+        # Not the latest report, so the latest stamp is unchanged
+        self.reports[0].delete()
+        response = self.client.get(url, {'contract': self.contract.id}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(response.json()['results'][0]['compliance'])
+
+    def test_sla_tree(self):
+        url = reverse('api:contract-sla-tree', args=[self.contract.id])
+        response = self.client.get(url)
+        tree = response.json()
+        self.assertEqual([node['name'] for node in tree], ['Mitigation'])
+        self.assertEqual([node['sli_name'] for node in tree[0]['children']], ['Time to Fix', 'Uptime', 'Unmeasured'])
+
+        etag = response['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        ServiceLevelAgreement.objects.filter(name='Unmeasured').get().delete()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        response = self.client.get(reverse('api:contract-sla-tree', args=[0]))
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(response.has_header('ETag'))
+
+
+class ComplianceTrendTests(ComplianceDataMixin, TestCase):
+    """
+    Tests for the pre-aggregated compliance trend and its API.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.reports = ComplianceReport.generate_for_periods(cls.contract.reporting_periods.all())
+
+    def _trend(self):
+        return {
+            (trend.month, trend.sli.name): (trend.compliant_items, trend.total_items)
+            for trend in ComplianceTrend.objects.select_related('sli')
+        }
+
+    def test_generation_fills_trend(self):
+        trend = self._trend()
+        self.assertEqual(len(trend), 24)
+        self.assertEqual(trend[(date(2023, 3, 1), 'Time to Fix')], (1, 1))
+        self.assertEqual(trend[(date(2023, 3, 1), 'Uptime')], (0, 1))
+
+    def test_trend_is_refreshed_incrementally(self):
+        measurement = Measurement.objects.get(reporting_period__start_date=date(2023, 3, 1), sli=self.sli_uptime)
+        measurement.calculated_value = 99.95
+        measurement.save()
+        self.assertEqual(self._trend()[(date(2023, 3, 1), 'Uptime')], (1, 1))
+        self.assertEqual(self._trend()[(date(2023, 4, 1), 'Uptime')], (0, 1))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            ComplianceReport.objects.get(reporting_period__start_date=date(2023, 3, 1)).delete()
+        self.assertNotIn((date(2023, 3, 1), 'Uptime'), self._trend())
+        self.assertEqual(len(self._trend()), 22)
+
+    def test_contract_delete_refreshes_once(self):
+        # A fixed number of queries, not a report refresh per cascaded measurement and SLA
+        with self.captureOnCommitCallbacks(execute=True), CaptureQueriesContext(connection) as context:
+            self.contract.delete()
+        self.assertLess(len(context.captured_queries), 40)
+        self.assertEqual(self._trend(), {})
+
+    def test_period_delete_refreshes_its_month(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.contract.reporting_periods.get(start_date=date(2023, 3, 1)).delete()
+        self.assertNotIn((date(2023, 3, 1), 'Uptime'), self._trend())
+        self.assertEqual(len(self._trend()), 22)
+
+    def test_rebuild_command(self):
+        expected = self._trend()
+        ComplianceTrend.objects.all().delete()
+        call_command('rebuild_compliance_trends', stdout=StringIO())
+        self.assertEqual(self._trend(), expected)
+
+    def test_trend_api(self):
+        self.client.force_login(User.objects.create_user('analyst', password='password'))
+        url = reverse('api:compliance-trend')
+
+        with self.assertNumQueries(4):
+            response = self.client.get(url, {'start': '2023-02', 'end': '2023-03'})
+        self.assertEqual(response.json(), [
+            {'month': '2023-02', 'total_items': 2, 'compliant_items': 1, 'compliance_percentage': 50.0},
+            {'month': '2023-03', 'total_items': 2, 'compliant_items': 1, 'compliance_percentage': 50.0},
+        ])
+
+        response = self.client.get(url, {'end': '2023-01', 'by': 'sli'})
+        self.assertEqual(
+            [(row['sli'], row['compliance_percentage']) for row in response.json()],
+            sorted([(self.sli_fix.id, 100.0), (self.sli_uptime.id, 0.0)])
+        )
+        self.assertEqual(self.client.get(url, {'end': '2023-01', 'by': 'sli'}, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+        self.assertEqual(self.client.get(url, {'start': 'last year'}).status_code, 400)
+
+
+class SLIStatisticsTests(ComplianceDataMixin, TestCase):
+    """
+    Tests for the statistics over the measurement history.
+    """
+
+    UPTIME = [99.95, 99, 99, 99.95, 99, 99, 99, 99.95, 99.95, 99, 99, 99.95]
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        for period, value in zip(cls.contract.reporting_periods.order_by('start_date'), cls.UPTIME):
+            Measurement.objects.filter(reporting_period=period, sli=cls.sli_uptime).update(calculated_value=value)
+
+    def _statistics(self):
+        with self.assertNumQueries(2):
+            return {result['sla'].name: result for result in sli_statistics.contract_sla_statistics(self.contract.id)}
+
+    def test_statistics(self):
+        stats = self._statistics()
+        self.assertEqual(set(stats), {'Fix', 'Uptime'})
+
+        uptime = stats['Uptime']
+        self.assertEqual(uptime['count'], 12)
+        self.assertAlmostEqual(uptime['mean'], 1192.75 / 12)
+        self.assertAlmostEqual(uptime['p50'], 99.0)
+        self.assertAlmostEqual(uptime['max'], 99.95)
+        self.assertEqual(uptime['threshold']['breaches'], 7)
+        self.assertEqual(uptime['threshold']['longest_breach_streak'], 3)
+        self.assertEqual(uptime['threshold']['current_breach_streak'], 0)
+        self.assertAlmostEqual(uptime['threshold']['latest_margin'], 0.05)
+
+        fix = stats['Fix']['threshold']
+        self.assertEqual((fix['breaches'], fix['mean_margin'], fix['margin_drift']), (0, 2.0, 0.0))
+
+    def test_contract_page_and_api(self):
+        self.client.force_login(User.objects.create_user('analyst', password='password'))
+        response = self.client.get(reverse('contracts:contract_detail', args=[self.contract.id]))
+        self.assertContains(response, 'SLI Statistics')
+
+        response = self.client.get(reverse('api:contract-statistics', args=[self.contract.id]))
+        data = {row['sla_name']: row for row in response.json()}
+        self.assertEqual(data['Uptime']['threshold']['breaches'], 7)
+        self.assertEqual(self.client.get(
+            reverse('api:contract-statistics', args=[self.contract.id]), HTTP_IF_NONE_MATCH=response['ETag']
+        ).status_code, 304)
+
+
+class JobQueueTests(ComplianceDataMixin, TestCase):
+    """
+    Tests for the database-backed job queue.
+    """
+
+    def setUp(self):
+        self.period = self.contract.reporting_periods.first()
+        self.client.force_login(User.objects.create_user('user', password='password'))
+
+    def test_enqueue_is_deduplicated_per_period(self):
+        periods = list(self.contract.reporting_periods.all()[:3])
+        Job.enqueue_reports(periods)
+        jobs = Job.enqueue_reports(periods + [periods[0]])
+        self.assertEqual(len(jobs), 3)
+        self.assertEqual(Job.objects.count(), 3)
+
+        job = Job.enqueue_periods(self.contract)
+        self.assertEqual(Job.enqueue_periods(self.contract), job)
+
+    def test_period_detail_queues_report_instead_of_generating(self):
+        url = reverse('contracts:reporting_period_detail', args=[self.period.id])
+        response = self.client.get(url)
+        self.assertContains(response, 'Queued')
+        self.assertFalse(ComplianceReport.objects.exists())
+        self.client.get(url)
+        self.assertEqual(Job.objects.count(), 1)
+
+        [job] = Job.claim(10)
+        self.assertEqual(execute_job(job.id), Job.SUCCEEDED)
+        response = self.client.get(url)
+        self.assertEqual(response.context['total_items'], 2)
+        self.assertNotContains(response, 'Queued')
+
+    def test_generate_report_redirects_to_period(self):
+        response = self.client.get(reverse('contracts:generate_report', args=[self.period.id]))
+        self.assertRedirects(
+            response, reverse('contracts:reporting_period_detail', args=[self.period.id]), fetch_redirect_response=False
+        )
+        self.assertEqual(Job.objects.get().status, Job.PENDING)
+
+    def test_failing_job_is_retried_then_failed(self):
+        Job.enqueue_periods(self.contract)
+        failing = {Job.GENERATE_PERIODS: Mock(side_effect=RuntimeError('boom'))}
+        with patch.dict(jobs.JOB_HANDLERS, failing), self.assertLogs('contracts.jobs', 'ERROR'):
+            statuses = [execute_job(Job.claim(1)[0].id) for _ in range(jobs.JOB_MAX_ATTEMPTS)]
+
+        self.assertEqual(statuses, [Job.PENDING] * (jobs.JOB_MAX_ATTEMPTS - 1) + [Job.FAILED])
+        job = Job.objects.get()
+        self.assertIn('boom', job.error)
+        self.assertEqual(Job.claim(1), [])
+
+    def test_latest_job_uses_key_index(self):
+        plan = Job.objects.filter(key=Job.periods_key(self.contract.id)).order_by('-id').explain()
+        self.assertIn('contracts_j_key_f6281a_idx', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_finished_jobs_are_pruned(self):
+        old, recent, pending = Job.enqueue_reports(self.contract.reporting_periods.all()[:3])
+        for job in (old, recent):
+            job.finish(Job.SUCCEEDED)
+        Job.objects.filter(pk=old.pk).update(finished_at=timezone.now() - jobs.JOB_RETENTION * 2)
+
+        self.assertEqual(jobs.process_jobs(Mock(map=Mock(return_value=[Job.SUCCEEDED])), 1), {Job.SUCCEEDED: 1})
+        self.assertFalse(Job.objects.filter(pk=old.pk).exists())
+        self.assertEqual(Job.objects.count(), 2)
+
+    def test_requeue_stale_jobs(self):
+        Job.enqueue_reports([self.period])
+        [job] = Job.claim(1)
+        Job.objects.filter(pk=job.pk).update(started_at=timezone.now() - jobs.JOB_STALE_AFTER * 2)
+        self.assertEqual(Job.requeue_stale(timezone.now() - jobs.JOB_STALE_AFTER), 1)
+        self.assertEqual(Job.claim(1)[0].pk, job.pk)
+
+
+class JobWorkerTests(TransactionTestCase):
+    """
+    Tests for the job worker command, which runs jobs on pool threads with their
+    own database connections. A single worker is used because the in-memory test
+    database does not wait for locks held by concurrent writers.
+    """
+
+    def test_worker_processes_queue(self):
+        # Saving a new active contract queues its reporting periods instead of generating them
+        contract = Contract.objects.create(
+            tenant=Tenant.objects.create(name='Worker'),
+            name='Contract',
+            effective_date=date(2023, 1, 1),
+            expiration_date=date(2023, 12, 31),
+            status='ACTIVE',
+        )
+        self.assertEqual(contract.reporting_periods.count(), 0)
+        self.assertEqual(Job.latest(Job.periods_key(contract.pk)).status, Job.PENDING)
+
+        out = StringIO()
+        call_command('process_jobs', '--once', '--workers', '1', stdout=out)
+        self.assertIn('1 succeeded', out.getvalue())
+        self.assertEqual(contract.reporting_periods.count(), 12)
+
+        Job.enqueue_reports(contract.reporting_periods.all())
+        call_command('process_jobs', '--once', '--workers', '1', stdout=out)
+        self.assertIn('12 succeeded', out.getvalue())
+        self.assertEqual(ComplianceReport.objects.count(), 12)
+
+
+class BulkRegenerationTests(ComplianceDataMixin, TestCase):
+    """
+    Tests for the sharded bulk regeneration of compliance reports.
+    """
+
+    def test_list_shards(self):
+        other = Contract.objects.create(
+            tenant=self.contract.tenant, name='Other', effective_date=date(2023, 1, 1),
+            expiration_date=date(2023, 3, 31), status='ACTIVE',
+        )
+        other.generate_reporting_periods()
+        self.assertEqual(list_shards('contract'), [])
+        self.assertEqual(list_shards('contract', create_missing=True), [self.contract.id, other.id])
+        self.assertEqual(list_shards('tenant', create_missing=True), [self.contract.tenant_id])
+        self.assertEqual(list_shards('contract', create_missing=True, contract_ids=[other.id]), [other.id])
+
+    def test_regenerate_shard_in_batches(self):
+        result = regenerate_shard('contract', self.contract.id, batch_size=5, create_missing=True)
+        self.assertEqual((result['shard'], result['reports'], result['items']), (self.contract.id, 12, 24))
+        self.assertEqual(ComplianceReport.objects.count(), 12)
+
+        # Without create_missing only periods that have a report are regenerated
+        ComplianceReport.objects.first().delete()
+        self.assertEqual(regenerate_shard('tenant', self.contract.tenant_id)['reports'], 11)
+
+    def test_checkpoint(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'checkpoint.json')
+            checkpoint = Checkpoint(path, 'contract')
+            checkpoint.load()
+            checkpoint.mark_done(3)
+            checkpoint.mark_done(1)
+
+            resumed = Checkpoint(path, 'contract')
+            resumed.load()
+            self.assertEqual(resumed.done, {1, 3})
+            with self.assertRaises(ValueError):
+                Checkpoint(path, 'tenant').load()
+
+            resumed.remove()
+            self.assertFalse(os.path.exists(path))
+
+
+class RegenerateComplianceCommandTests(ComplianceDataMixin, TransactionTestCase):
+    """
+    Tests for the regenerate_compliance command. A single thread worker is used for
+    the same reason as in JobWorkerTests.
+    """
+
+    def setUp(self):
+        self.setUpTestData()
+
+    def test_regenerate_resumes_from_checkpoint(self):
+        other = Contract.objects.create(
+            tenant=self.contract.tenant, name='Other', effective_date=date(2023, 1, 1),
+            expiration_date=date(2023, 3, 31), status='ACTIVE',
+        )
+        other.generate_reporting_periods()
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'checkpoint.json')
+            checkpoint = Checkpoint(path, 'contract')
+            checkpoint.mark_done(other.id)
+
+            out = StringIO()
+            call_command(
+                'regenerate_compliance', '--create-missing', '--pool', 'thread', '--workers', '1',
+                '--checkpoint', path, stdout=out
+            )
+            self.assertIn('1 contract shards already done', out.getvalue())
+            self.assertIn('Regenerated 12 compliance reports with 24 items', out.getvalue())
+            self.assertFalse(os.path.exists(path))
+
+        self.assertEqual(ComplianceReport.objects.count(), 12)
+        self.assertFalse(ComplianceReport.objects.filter(reporting_period__contract=other).exists())
+        trend = ComplianceTrend.objects.filter(sli=self.sli_fix)
+        self.assertEqual(sum(trend.values_list('total_items', flat=True)), 12)
+
+    def test_checkpoint_of_other_sharding_is_rejected(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'checkpoint.json')
+            Checkpoint(path, 'tenant').mark_done(1)
+            with self.assertRaises(CommandError):
+                call_command('regenerate_compliance', '--checkpoint', path, stdout=StringIO())
+
+
+class ReportingPeriodGenerationTests(TestCase):
+    """
+    Tests for the bulk reporting period generation.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tenant = Tenant.objects.create(name='Demo')
+
+    def _contract(self, **kwargs):
+        defaults = {
+            'tenant': self.tenant,
+            'name': 'Contract',
+            'effective_date': date(2023, 1, 1),
+            'expiration_date': date(2032, 12, 31),
+            'status': 'DRAFT',
+        }
+        defaults.update(kwargs)
+        return Contract.objects.create(**defaults)
+
+    def test_generate_reporting_periods_is_single_insert(self):
+        contract = self._contract()
+
+        with self.assertNumQueries(2):
+            periods = contract.generate_reporting_periods()
+
+        self.assertEqual(len(periods), 120)
+        first = contract.reporting_periods.first()
+        self.assertEqual((first.start_date, first.end_date), (date(2023, 1, 1), date(2023, 1, 31)))
+
+    def test_generate_reporting_periods_is_idempotent(self):
+        contract = self._contract(status='ACTIVE', reporting_frequency='QUARTERLY')
+        self.assertEqual(len(contract.generate_reporting_periods()), 40)
+
+        self.assertEqual(contract.generate_reporting_periods(), [])
+        self.assertEqual(contract.reporting_periods.count(), 40)
+
+        contract.expiration_date = date(2033, 12, 31)
+        contract.save()
+        self.assertEqual(len(contract.generate_reporting_periods()), 4)
+
+    def test_generate_reporting_periods_for_many_contracts(self):
+        for i in range(5):
+            self._contract(name=f'Contract {i}', reporting_frequency='YEARLY')
+
+        with self.assertNumQueries(3):
+            periods = Contract.objects.generate_reporting_periods()
+
+        self.assertEqual(len(periods), 50)
+        self.assertEqual(Contract.objects.generate_reporting_periods(), [])
+
+    def test_extend_reporting_periods_command(self):
+        contract = self._contract(status='ACTIVE', expiration_date=None, effective_date=date.today())
+        contract.generate_reporting_periods()
+        initial_count = contract.reporting_periods.count()
+        last_period = contract.reporting_periods.last()
+        self.assertGreater(last_period.end_date, last_period.start_date)
+
+        call_command('extend_reporting_periods', '--days', '400', stdout=StringIO())
+        self.assertGreater(contract.reporting_periods.count(), initial_count)
+
+        count = contract.reporting_periods.count()
+        call_command('extend_reporting_periods', '--days', '400', stdout=StringIO())
+        self.assertEqual(contract.reporting_periods.count(), count)
+
+
+class SyntheticDataTests(TestCase):
+    """
+    Tests for the synthetic data generator used by the load benchmark.
+    """
+
+    def test_generate_synthetic_data(self):
+        counts = generate_synthetic_data(
+            tenants=2, contracts_per_tenant=3, sla_depth=3, sla_width=2, years=1, slis=3
+        )
+        self.assertEqual(counts, {
+            'tenants': 2, 'slis': 3, 'contracts': 6, 'reporting_periods': 72,
+            'slas': 6 * 7, 'measurements': 72 * 3, 'compliance_reports': 72,
+        })
+
+        contract = Contract.objects.first()
+        leaves = ServiceLevelAgreement.objects.filter(contract=contract).leaves()
+        self.assertEqual(leaves.count(), 4)
+        self.assertTrue(all(sla.depth == 2 and sla.sli_id for sla in leaves))
+        self.assertEqual(
+            sum(ComplianceTrend.objects.values_list('total_items', flat=True)),
+            ComplianceReportItem.objects.count()
+        )
+
+    def test_generate_synthetic_data_command_uses_bulk_inserts(self):
+        with CaptureQueriesContext(connection) as context:
+            call_command('generate_synthetic_data', '--tenants', '5', '--no-reports', stdout=StringIO())
+        self.assertEqual(Contract.objects.count(), 50)
+        self.assertEqual(Measurement.objects.count(), 50 * 24 * 5)
+        # SQLite limits the rows per INSERT, but not one query per object
+        self.assertLess(len(context.captured_queries), 100)
+
+
+class InstrumentationTests(ComplianceDataMixin, TestCase):
+    """
+    Tests for the request instrumentation middleware and context manager.
+    """
+
+    def setUp(self):
+        self.client.force_login(User.objects.create_user('user', password='password'))
+
+    def test_instrument_detects_repeated_queries(self):
+        with instrument() as metrics:
+            for period in ReportingPeriod.objects.filter(contract=self.contract):
+                Measurement.objects.filter(reporting_period=period).count()
+
+        self.assertEqual(len(metrics.queries), 13)
+        self.assertEqual(list(metrics.duplicates().values()), [12])
+        self.assertGreater(metrics.total_time, 0)
+
+    def test_server_timing_header(self):
+        url = reverse('contracts:contract_detail', args=[self.contract.id])
+        with self.assertLogs('contracts.instrumentation', 'INFO') as logs:
+            response = self.client.get(url)
+
+        self.assertRegex(response['Server-Timing'], r'db;dur=[\d.]+;desc="\d+ queries", tpl;dur=[\d.]+')
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual((record['view'], record['status']), ('contracts:contract_detail', 200))
+        self.assertGreater(record['template_ms'], 0)
+        self.assertNotIn('sql', record)
+
+    def test_duplicate_threshold_setting(self):
+        url = reverse('contracts:contract_detail', args=[self.contract.id])
+        for threshold, reported in ((1, True), (1000, False)):
+            with override_settings(INSTRUMENTATION_DUPLICATE_THRESHOLD=threshold), \
+                    self.assertLogs('contracts.instrumentation', 'INFO') as logs:
+                response = self.client.get(url)
+            record = json.loads(logs.records[0].getMessage())
+            self.assertEqual(bool(record['duplicates']), reported)
+            self.assertEqual('repeated queries' in response['Server-Timing'], reported)
+
+    @override_settings(INSTRUMENTATION_SLOW_REQUEST_MS=0, INSTRUMENTATION_SQL_SAMPLE_RATE=1)
+    def test_slow_request_logs_sql(self):
+        with self.assertLogs('contracts.instrumentation', 'WARNING') as logs:
+            self.client.get(reverse('contracts:dashboard'))
+
+        record = json.loads(logs.records[0].getMessage())
+        self.assertTrue(record['slow'])
+        self.assertEqual(len(record['sql']), record['queries'])
+
+
+class MetricsTests(ComplianceDataMixin, TestCase):
+    """
+    Tests for the Prometheus metrics shared through a SQLite store.
+    """
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings_override = override_settings(METRICS_STORE=os.path.join(directory.name, 'metrics.sqlite3'))
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        metrics._buffer.clear()
+        cache.clear()
+
+    def test_metrics_of_all_processes_are_summed(self):
+        metrics.increment('contracts_reporting_periods_created_total', 3)
+        metrics.flush()
+        # Another process adds its own increments to the same store
+        metrics.increment('contracts_reporting_periods_created_total', 4)
+        self.assertIn('contracts_reporting_periods_created_total 7\n', metrics.render())
+
+    def test_report_generation_metrics(self):
+        ComplianceReport.generate_for_periods(self.contract.reporting_periods.all()[:2])
+        text = metrics.render()
+        self.assertIn('contracts_reports_generated_total 2\n', text)
+        self.assertIn('contracts_report_generation_duration_seconds_count 1\n', text)
+        self.assertIn('contracts_report_items_bucket{le="1.0"} 0\n', text)
+        self.assertIn('contracts_report_items_bucket{le="5.0"} 2\n', text)
+        self.assertIn('contracts_report_items_sum 4\n', text)
+
+    def test_metrics_endpoint(self):
+        self.client.force_login(User.objects.create_user('user', password='password'))
+        self.client.get(reverse('contracts:contract_detail', args=[self.contract.id]))
+
+        response = self.client.get('/metrics')
+        self.assertEqual(response['Content-Type'], metrics.CONTENT_TYPE)
+        text = response.content.decode()
+        self.assertIn('# TYPE contracts_request_duration_seconds histogram', text)
+        self.assertIn('contracts_request_duration_seconds_count{view="contracts:contract_detail"} 1\n', text)
+        self.assertRegex(text, r'contracts_cache_requests_total\{cache="sla_tree",result="(hit|miss)"\} \d+')
+
+        self.assertEqual(self.client.get('/metrics', REMOTE_ADDR='10.0.0.1').status_code, 403)
+
+    def test_fragment_cache_requests(self):
+        self.client.force_login(User.objects.create_user('user', password='password'))
+        url = reverse('contracts:contract_detail', args=[self.contract.id])
+        self.client.get(url)
+        self.client.get(url)
+
+        # The overview and statistics fragments, missing then cached
+        text = metrics.render()
+        self.assertIn('contracts_cache_requests_total{cache="fragment",result="miss"} 2\n', text)
+        self.assertIn('contracts_cache_requests_total{cache="fragment",result="hit"} 2\n', text)
+
+
+class FragmentCacheTests(ComplianceDataMixin, TestCase):
+    """
+    Tests for the versioned fragment caching of the dashboard and detail pages.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(User.objects.create_user('user', password='password'))
+        self.period = self.contract.reporting_periods.first()
+        ComplianceReport.generate_for_periods([self.period])
+
+    def _get(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response, [query['sql'] for query in context.captured_queries]
+
+    def test_cached_report_is_served_without_loading_it(self):
+        url = reverse('contracts:reporting_period_detail', args=[self.period.id])
+        _, miss_queries = self._get(url)
+        response, hit_queries = self._get(url)
+
+        self.assertContains(response, 'Non-compliant')
+        self.assertLess(len(hit_queries), len(miss_queries))
+        self.assertFalse([sql for sql in hit_queries if 'contracts_compliancereportitem' in sql])
+
+    def test_measurement_change_invalidates_report_and_statistics(self):
+        period_url = reverse('contracts:reporting_period_detail', args=[self.period.id])
+        contract_url = reverse('contracts:contract_detail', args=[self.contract.id])
+        self._get(period_url)
+        self._get(contract_url)
+
+        measurement = Measurement.objects.get(reporting_period=self.period, sli=self.sli_uptime)
+        measurement.calculated_value = 99.95
+        measurement.save()
+
+        response, _ = self._get(period_url)
+        self.assertContains(response, '99.95')
+        self.assertNotContains(response, 'Non-compliant')
+        self.assertContains(self._get(contract_url)[0], '99.08')
+
+    def test_contract_change_invalidates_dashboard(self):
+        url = reverse('contracts:dashboard')
+        self._get(url)
+        _, hit_queries = self._get(url)
+        self.assertFalse([sql for sql in hit_queries if 'contracts_contract' in sql])
+
+        self.contract.name = 'Renamed'
+        self.contract.save()
+        self.assertContains(self._get(url)[0], 'Renamed')
+
+        self.contract.tenant.name = 'Other tenant'
+        self.contract.tenant.save()
+        self.assertContains(self._get(reverse('contracts:contract_detail', args=[self.contract.id]))[0], 'Other tenant')
+
+
+def reload_urls():
+    """
+    Reload the URLconfs, which select the page views from the ASYNC_VIEWS setting.
+    """
+    importlib.reload(contracts_urls)
+    importlib.reload(config_urls)
+    clear_url_caches()
+
+
+class AsyncViewTests(ComplianceDataMixin, TestCase):
+    """
+    Tests for the async versions of the dashboard and detail pages.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(reload_urls)
+        self.enterContext(override_settings(ASYNC_VIEWS=True))
+        reload_urls()
+        self.user = User.objects.create_user('user', password='password')
+        self.period = self.contract.reporting_periods.first()
+        ComplianceReport.generate_for_periods([self.period])
+
+    def _get(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = async_to_sync(self.async_client.get)(url)
+        return response, [query['sql'] for query in context.captured_queries]
+
+    def test_fragment_cache_requests_are_counted_once(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.enterContext(override_settings(METRICS_STORE=os.path.join(directory.name, 'metrics.sqlite3')))
+        metrics._buffer.clear()
+        self.async_client.force_login(self.user)
+        url = reverse('contracts:contract_detail', args=[self.contract.id])
+        self._get(url)
+        self._get(url)
+
+        # The overview and statistics fragments, missing then cached
+        text = metrics.render()
+        self.assertIn('contracts_cache_requests_total{cache="fragment",result="miss"} 2\n', text)
+        self.assertIn('contracts_cache_requests_total{cache="fragment",result="hit"} 2\n', text)
+
+    def test_pages_use_async_views(self):
+        for url in (
+            reverse('contracts:dashboard'),
+            reverse('contracts:contract_detail', args=[self.contract.id]),
+            reverse('contracts:reporting_period_detail', args=[self.period.id]),
+        ):
+            self.assertTrue(asyncio.iscoroutinefunction(resolve(url).func))
+
+    def test_login_required(self):
+        response, _ = self._get(reverse('contracts:dashboard'))
+        self.assertEqual(response.status_code, 302)
+        self.assertIn(reverse('login'), response['Location'])
+
+    def test_pages(self):
+        self.async_client.force_login(self.user)
+        response, _ = self._get(reverse('contracts:dashboard'))
+        self.assertContains(response, 'Contract')
+
+        response, _ = self._get(reverse('contracts:contract_detail', args=[self.contract.id]))
+        self.assertContains(response, 'Mitigation')
+        self.assertContains(response, 'padding-left: 2em;')
+        self.assertContains(response, 'Demo')
+
+        response, _ = self._get(reverse('contracts:reporting_period_detail', args=[self.period.id]))
+        self.assertContains(response, 'Non-compliant')
+
+        response, _ = self._get(reverse('contracts:contract_detail', args=[0]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_cached_fragments_are_not_loaded(self):
+        self.async_client.force_login(self.user)
+        url = reverse('contracts:reporting_period_detail', args=[self.period.id])
+        _, miss_queries = self._get(url)
+        response, hit_queries = self._get(url)
+
+        self.assertContains(response, 'Non-compliant')
+        self.assertLess(len(hit_queries), len(miss_queries))
+        self.assertFalse([sql for sql in hit_queries if 'contracts_compliancereportitem' in sql])
+
+        url = reverse('contracts:dashboard')
+        self._get(url)
+        response, hit_queries = self._get(url)
+        self.assertContains(response, 'Contract')
+        self.assertFalse([sql for sql in hit_queries if 'contracts_contract' in sql])
+
+    def test_fragment_expiring_after_the_check_is_rendered_with_its_data(self):
+        self.async_client.force_login(self.user)
+        # The fragments are reported as cached but are missing when rendered
+        with patch('contracts.async_views.afragment_cached', AsyncMock(return_value=True)):
+            response, _ = self._get(reverse('contracts:dashboard'))
+            self.assertContains(response, 'Active Contracts')
+            self.assertContains(response, self.contract.name)
+            response, _ = self._get(reverse('contracts:contract_detail', args=[self.contract.id]))
+            self.assertContains(response, 'padding-left: 2em;')
+            response, _ = self._get(reverse('contracts:reporting_period_detail', args=[self.period.id]))
+            self.assertContains(response, 'Non-compliant')
+
+        # The fragments cached by these renders are complete
+        response, _ = self._get(reverse('contracts:dashboard'))
+        self.assertContains(response, self.contract.name)
+
+    def test_requests_are_instrumented(self):
+        self.async_client.force_login(self.user)
+        response, queries = self._get(reverse('contracts:contract_detail', args=[self.contract.id]))
+        self.assertIn(f'desc="{len(queries)} queries"', response['Server-Timing'])
+
+
+class SLATreeQueryCountTests(ComplianceDataMixin, TestCase):
+    """
+    Regression tests ensuring the SLA tree pages issue a fixed number of
+    queries regardless of the size of the SLA tree.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.user = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+        self.period = self.contract.reporting_periods.first()
+        ComplianceReport.objects.create(reporting_period=self.period).generate()
+
+    def _add_subtree(self, depth):
+        parent = None
+        for level in range(depth):
+            parent = ServiceLevelAgreement.objects.create(
+                contract=self.contract, parent=parent, name=f'Level {level}', sli=self.sli_fix,
+                threshold_type='MAX', threshold_value=float(level)
+            )
+
+    def _count_queries(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries)
+
+    def _assert_constant_queries(self, url):
+        baseline = self._count_queries(url)
+        self._add_subtree(5)
+        self._add_subtree(5)
+        self.assertEqual(self._count_queries(url), baseline)
+
+    def test_contract_detail_query_count(self):
+        self._assert_constant_queries(reverse('contracts:contract_detail', args=[self.contract.id]))
+
+    def test_reporting_period_detail_query_count(self):
+        self._assert_constant_queries(reverse('contracts:reporting_period_detail', args=[self.period.id]))
+        self.assertContains(
+            self.client.get(reverse('contracts:reporting_period_detail', args=[self.period.id])),
+            'Level 4', count=2
+        )
+
+    def test_deep_sla_tree_renders(self):
+        # Deep enough to exceed the recursion limit when rendered with nested includes
+        self._add_subtree(150)
+        cache.clear()
+        response = self.client.get(reverse('contracts:reporting_period_detail', args=[self.period.id]))
+        self.assertContains(response, 'Level 149')
+        self.assertContains(response, 'padding-left: 150em;')
+
+        # The path of the deepest SLA is stored in full and its subtree is found by it
+        deepest = ServiceLevelAgreement.objects.get(name='Level 149')
+        self.assertEqual(len(deepest.path), 150 * (SLA_PATH_SEGMENT_WIDTH + 1))
+        root = ServiceLevelAgreement.objects.get(name='Level 0')
+        self.assertEqual(ServiceLevelAgreement.objects.subtree(root, include_self=False).count(), 149)
+
+
+class SLATreeCacheTests(ComplianceDataMixin, TestCase):
+    """
+    Tests for caching the SLA tree structure of a contract.
+    """
+
+    def setUp(self):
+        cache.clear()
+
+    def test_sla_tree_is_cached(self):
+        get_sla_tree(self.contract.id)
+        with self.assertNumQueries(0):
+            tree = get_sla_tree(self.contract.id)
+
+        self.assertEqual([node['sla'].name for node in tree], ['Mitigation'])
+        self.assertEqual([node['sla'].name for node in tree[0]['children']], ['Fix', 'Uptime', 'Unmeasured'])
+
+    def test_sla_rows_are_pre_ordered(self):
+        rows = build_sla_rows(self.contract)
+        self.assertEqual(
+            [(row['sla'].name, row['depth']) for row in rows],
+            [('Mitigation', 0), ('Fix', 1), ('Uptime', 1), ('Unmeasured', 1)]
+        )
+        self.assertIsNone(rows[0]['report_item'])
+
+    def test_sla_change_invalidates_tree(self):
+        get_sla_tree(self.contract.id)
+        ServiceLevelAgreement.objects.filter(name='Fix').get().delete()
+
+        tree = get_sla_tree(self.contract.id)
+        self.assertEqual([node['sla'].name for node in tree[0]['children']], ['Uptime', 'Unmeasured'])
+
+    def test_sli_change_invalidates_tree(self):
+        get_sla_tree(self.contract.id)
+        self.sli_fix.name = 'Time to Resolve'
+        self.sli_fix.save()
+
+        tree = get_sla_tree(self.contract.id)
+        self.assertEqual(tree[0]['children'][0]['sla'].sli.name, 'Time to Resolve')
+
+
+class SLAPathTests(ComplianceDataMixin, TestCase):
+    """
+    Tests for the materialized path index of the SLA hierarchy.
+    """
+
+    def test_paths_are_maintained_on_insert(self):
+        root = ServiceLevelAgreement.objects.get(name='Mitigation')
+        fix = ServiceLevelAgreement.objects.get(name='Fix')
+        self.assertEqual(root.depth, 0)
+        self.assertEqual(fix.depth, 1)
+        self.assertEqual(fix.path, root.path + f'{fix.pk:010d}/')
+
+    def test_subtree_and_leaves(self):
+        root = ServiceLevelAgreement.objects.get(name='Mitigation')
+        fix = ServiceLevelAgreement.objects.get(name='Fix')
+        ServiceLevelAgreement.objects.create(contract=self.contract, parent=fix, name='Fix detail')
+
+        subtree = ServiceLevelAgreement.objects.subtree(root).tree_order()
+        self.assertEqual(
+            [sla.name for sla in subtree],
+            ['Mitigation', 'Fix', 'Fix detail', 'Uptime', 'Unmeasured']
+        )
+        self.assertEqual(
+            sorted(ServiceLevelAgreement.objects.subtree(root, include_self=False).leaves().values_list('name', flat=True)),
+            ['Fix detail', 'Unmeasured', 'Uptime']
+        )
+
+    def test_move_rewrites_subtree_paths(self):
+        fix = ServiceLevelAgreement.objects.get(name='Fix')
+        detail = ServiceLevelAgreement.objects.create(contract=self.contract, parent=fix, name='Fix detail')
+        other_root = ServiceLevelAgreement.objects.create(contract=self.contract, name='Availability')
+
+        fix.parent = other_root
+        fix.save()
+
+        detail.refresh_from_db()
+        self.assertEqual(detail.path, other_root.path + f'{fix.pk:010d}/{detail.pk:010d}/')
+        self.assertEqual(detail.depth, 2)
+
+        fix.parent = None
+        fix.save()
+        detail.refresh_from_db()
+        self.assertEqual((detail.path, detail.depth), (f'{fix.pk:010d}/{detail.pk:010d}/', 1))
+
+    def test_cannot_move_below_descendant(self):
+        root = ServiceLevelAgreement.objects.get(name='Mitigation')
+        root.parent = ServiceLevelAgreement.objects.get(name='Fix')
+        with self.assertRaises(ValidationError):
+            root.clean()
+
+    def test_rebuild_paths(self):
+        ServiceLevelAgreement.objects.update(path='', depth=0)
+        self.assertEqual(ServiceLevelAgreement.rebuild_paths(), 4)
+        self.assertEqual(ServiceLevelAgreement.objects.get(name='Fix').depth, 1)
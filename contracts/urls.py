@@ -1,14 +1,19 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import async_views, views
 
 app_name = 'contracts'
 
+# Views of the read-heavy pages, async when deployed with ASGI (see async_views.py)
+page_views = async_views if getattr(settings, 'ASYNC_VIEWS', False) else views
+
 urlpatterns = [
-    path('', views.dashboard, name='dashboard'),
+    path('', page_views.dashboard, name='dashboard'),
     path('tenant/<int:tenant_id>/', views.tenant_detail, name='tenant_detail'),
-    path('contract/<int:contract_id>/', views.contract_detail, name='contract_detail'),
+    path('contract/<int:contract_id>/', page_views.contract_detail, name='contract_detail'),
     path('template/<int:template_id>/', views.template_detail, name='template_detail'),
     path('party/<int:party_id>/', views.party_detail, name='party_detail'),
-    path('reporting-period/<int:period_id>/', views.reporting_period_detail, name='reporting_period_detail'),
+    path('reporting-period/<int:period_id>/', page_views.reporting_period_detail, name='reporting_period_detail'),
+    path('export/compliance/', views.export_compliance, name='export_compliance'),
     path('reporting-period/<int:period_id>/generate/', views.generate_report, name='generate_report'),
 ]
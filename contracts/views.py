@@ -1,5 +1,8 @@
+from functools import partial
+
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
+from django.http import HttpResponseBadRequest, StreamingHttpResponse
 from django.db.models import Count, Avg, Q
 from django.contrib import messages
 from django.utils import timezone
@@ -8,51 +11,33 @@ from .models import (
     Tenant, Contract, ReportingPeriod, 
     ComplianceReport, ComplianceReportItem,
     ServiceLevelAgreement, Measurement,
-    ContractTemplate, Document, Party
+    ContractTemplate, Document, Party, Job
 )
+from .export import EXPORT_CONTENT_TYPES, EXPORT_WRITERS, export_rows, parse_export_filters
+from .fragments import FRAGMENT_CACHE_TIMEOUT, get_fragment_versions, lazy, lazy_context
+from .pagination import CONTRACT_LIST_CONTEXT_NAMES, contract_list_context
+from .sla_tree import build_sla_rows, get_sla_tree_version
+from .sli_statistics import contract_sla_statistics
 
 @login_required
 def dashboard(request):
     """
     Dashboard view showing contracts and summary statistics.
+    The page content is a cached fragment; its data is only loaded on a cache miss.
     """
-    contracts = Contract.objects.all().select_related('tenant', 'template')
+    contracts = Contract.objects.with_latest_compliance().select_related('tenant', 'template')
 
-    # Get compliance statistics for each contract
-    for contract in contracts:
-        # Get the latest reporting period with a compliance report
-        latest_period = ReportingPeriod.objects.filter(
-            contract=contract,
-            compliance_report__isnull=False
-        ).order_by('-end_date').first()
-
-        if latest_period:
-            try:
-                report = latest_period.compliance_report
-                items = report.items.all()
-                compliant_count = items.filter(is_compliant=True).count()
-                total_count = items.count()
-
-                if total_count > 0:
-                    contract.compliance_percentage = (compliant_count / total_count) * 100
-                else:
-                    contract.compliance_percentage = None
-
-                contract.latest_report_date = report.generated_at
-                contract.latest_period = latest_period
-            except ComplianceReport.DoesNotExist:
-                contract.compliance_percentage = None
-                contract.latest_report_date = None
-                contract.latest_period = None
-        else:
-            contract.compliance_percentage = None
-            contract.latest_report_date = None
-            contract.latest_period = None
+    def load_listing():
+        list_context = contract_list_context(request, contracts)
+        return {'contracts': list_context['page'], **list_context}
 
     context = {
-        'contracts': contracts,
-        'total_contracts': Contract.objects.count(),
-        'total_active_contracts': Contract.objects.filter(status='ACTIVE').count(),
+        **lazy_context(load_listing, ('contracts', *CONTRACT_LIST_CONTEXT_NAMES)),
+        'tenants': Tenant.objects.order_by('name'),
+        'total_contracts': lazy(Contract.objects.count),
+        'total_active_contracts': lazy(Contract.objects.filter(status='ACTIVE').count),
+        'fragment_versions': get_fragment_versions(contracts=None),
+        'fragment_timeout': FRAGMENT_CACHE_TIMEOUT,
     }
 
     return render(request, 'contracts/dashboard.html', context)
@@ -62,40 +47,20 @@ def tenant_detail(request, tenant_id):
     """
     Tenant detail view showing all contracts for a tenant.
     """
-    tenant = get_object_or_404(Tenant, id=tenant_id)
-    contracts = Contract.objects.filter(tenant=tenant)
-
-    # Get compliance statistics for each contract
-    for contract in contracts:
-        # Get the latest reporting period with a compliance report
-        latest_period = ReportingPeriod.objects.filter(
-            contract=contract,
-            compliance_report__isnull=False
-        ).order_by('-end_date').first()
-
-        if latest_period:
-            try:
-                report = latest_period.compliance_report
-                items = report.items.all()
-                compliant_count = items.filter(is_compliant=True).count()
-                total_count = items.count()
-
-                if total_count > 0:
-                    contract.compliance_percentage = (compliant_count / total_count) * 100
-                else:
-                    contract.compliance_percentage = None
-
-                contract.latest_report_date = report.generated_at
-            except ComplianceReport.DoesNotExist:
-                contract.compliance_percentage = None
-                contract.latest_report_date = None
-        else:
-            contract.compliance_percentage = None
-            contract.latest_report_date = None
+    tenant = get_object_or_404(
+        Tenant.objects.annotate(
+            contract_count=Count('contracts'),
+            active_contract_count=Count('contracts', filter=Q(contracts__status='ACTIVE')),
+        ),
+        id=tenant_id
+    )
+    contracts = Contract.objects.filter(tenant=tenant).with_latest_compliance().select_related('template')
+    list_context = contract_list_context(request, contracts)
 
     context = {
         'tenant': tenant,
-        'contracts': contracts,
+        'contracts': list_context['page'],
+        **list_context,
     }
 
     return render(request, 'contracts/tenant_detail.html', context)
@@ -106,8 +71,11 @@ def contract_detail(request, contract_id):
     Contract detail view showing all reporting periods and their compliance status.
     Allows filtering by reporting period and number of periods to show.
     Also shows the SLA tree with associated SLIs.
+
+    The contract overview, SLA tree and SLI statistics are cached fragments; the
+    reporting periods table shows live job status and is rendered every time.
     """
-    contract = get_object_or_404(Contract, id=contract_id)
+    contract = get_object_or_404(Contract.objects.select_related('tenant', 'template'), id=contract_id)
 
     # Get filter parameters from request
     months = request.GET.get('months', '12')  # Default to 12 months
@@ -119,7 +87,7 @@ def contract_detail(request, contract_id):
         months = 12
 
     # Get all reporting periods for this contract
-    all_periods = ReportingPeriod.objects.filter(contract=contract).order_by('-start_date')
+    all_periods = ReportingPeriod.objects.filter(contract=contract).select_related('compliance_report').order_by('-start_date')
 
     # Apply filter if specified
     if months:
@@ -128,43 +96,31 @@ def contract_detail(request, contract_id):
     else:
         reporting_periods = all_periods
 
-    # Get compliance statistics for each reporting period
+    # Get compliance statistics and the latest report generation job for each reporting period
+    jobs = Job.latest_by_key([Job.report_key(period.id) for period in reporting_periods])
     for period in reporting_periods:
+        period.job = jobs.get(Job.report_key(period.id))
         try:
-            report = period.compliance_report
-            items = report.items.all()
-            compliant_count = items.filter(is_compliant=True).count()
-            total_count = items.count()
-
-            if total_count > 0:
-                period.compliance_percentage = (compliant_count / total_count) * 100
-            else:
-                period.compliance_percentage = None
-
+            period.compliance_percentage = period.compliance_report.compliance_percentage
             period.has_report = True
-        except (ComplianceReport.DoesNotExist, AttributeError):
+        except ComplianceReport.DoesNotExist:
             period.compliance_percentage = None
             period.has_report = False
 
-    # Build SLA tree for the contract
-    root_slas = ServiceLevelAgreement.objects.filter(
-        contract=contract,
-        parent__isnull=True
-    )
-
-    # Build a tree structure for the template
-    sla_tree = []
-    for root_sla in root_slas:
-        sla_node = _build_sla_tree(root_sla, [])  # Empty list as there are no report items in this context
-        if sla_node:
-            sla_tree.append(sla_node)
-
     context = {
         'contract': contract,
         'reporting_periods': reporting_periods,
         'all_periods_count': all_periods.count(),
         'months': months,
-        'sla_tree': sla_tree,
+        # SLA tree rows for the contract (there are no report items in this context)
+        'sla_rows': lazy(partial(build_sla_rows, contract)),
+        'sla_statistics': lazy(partial(contract_sla_statistics, contract.id)),
+        'periods_job': Job.latest(Job.periods_key(contract.id)),
+        'fragment_versions': {
+            **get_fragment_versions(contract=contract.id),
+            'sla_tree': get_sla_tree_version(contract.id),
+        },
+        'fragment_timeout': FRAGMENT_CACHE_TIMEOUT,
     }
 
     return render(request, 'contracts/contract_detail.html', context)
@@ -173,51 +129,46 @@ def contract_detail(request, contract_id):
 def reporting_period_detail(request, period_id):
     """
     Reporting period detail view showing the compliance report with SLA details.
+    The report is a cached fragment; its items and SLA tree are only loaded on a cache miss.
     """
-    period = get_object_or_404(ReportingPeriod, id=period_id)
+    period = get_object_or_404(
+        ReportingPeriod.objects.select_related('contract__tenant', 'compliance_report'), id=period_id
+    )
+    job = Job.latest(Job.report_key(period.id))
 
-    # Check if a compliance report exists, if not, create one
+    # Check if a compliance report exists, if not, queue its generation
     try:
         report = period.compliance_report
     except ComplianceReport.DoesNotExist:
-        report = ComplianceReport.objects.create(reporting_period=period)
-        report.generate()
-        messages.success(request, "A new compliance report has been generated.")
-
-    # Get all report items
-    report_items = report.items.all().select_related('sla', 'measurement')
+        report = None
+        if job is None or not job.is_active:
+            job = Job.enqueue_reports([period])[0]
 
-    # Calculate overall compliance
-    total_items = report_items.count()
-    compliant_items = report_items.filter(is_compliant=True).count()
+    def load_report():
+        if report is None:
+            return {'report_items': [], 'sla_rows': build_sla_rows(period.contract)}
 
-    if total_items > 0:
-        compliance_percentage = (compliant_items / total_items) * 100
-    else:
-        compliance_percentage = None
-
-    # Organize items by SLA hierarchy
-    root_slas = ServiceLevelAgreement.objects.filter(
-        contract=period.contract,
-        parent__isnull=True
-    )
-
-    # Build a tree structure for the template
-    sla_tree = []
-    for root_sla in root_slas:
-        sla_node = _build_sla_tree(root_sla, report_items)
-        if sla_node:
-            sla_tree.append(sla_node)
+        # Get all report items and organize them by SLA hierarchy
+        report_items = report.items.all().select_related('sla', 'measurement', 'measurement__sli')
+        return {
+            'report_items': report_items,
+            'sla_rows': build_sla_rows(period.contract, report_items, report.rollups.all()),
+        }
 
     context = {
         'period': period,
         'contract': period.contract,
         'report': report,
-        'report_items': report_items,
-        'compliance_percentage': compliance_percentage,
-        'compliant_items': compliant_items,
-        'total_items': total_items,
-        'sla_tree': sla_tree,
+        'job': job,
+        **lazy_context(load_report, ('report_items', 'sla_rows')),
+        'compliance_percentage': report.compliance_percentage if report else None,
+        'compliant_items': report.compliant_items if report else 0,
+        'total_items': report.total_items if report else 0,
+        'fragment_versions': {
+            **get_fragment_versions(contract=period.contract_id, period=period.id),
+            'sla_tree': get_sla_tree_version(period.contract_id),
+        },
+        'fragment_timeout': FRAGMENT_CACHE_TIMEOUT,
     }
 
     return render(request, 'contracts/reporting_period_detail.html', context)
@@ -225,19 +176,14 @@ def reporting_period_detail(request, period_id):
 @login_required
 def generate_report(request, period_id):
     """
-    Generate or regenerate a compliance report for a reporting period.
+    Queue the generation or regeneration of a compliance report for a reporting period.
     """
     period = get_object_or_404(ReportingPeriod, id=period_id)
 
-    try:
-        report = period.compliance_report
-    except ComplianceReport.DoesNotExist:
-        report = ComplianceReport.objects.create(reporting_period=period)
-
-    report.generate()
-    messages.success(request, "Compliance report has been generated successfully.")
+    Job.enqueue_reports([period])
+    messages.success(request, "Compliance report generation has been queued.")
 
-    return redirect('reporting_period_detail', period_id=period.id)
+    return redirect('contracts:reporting_period_detail', period_id=period.id)
 
 @login_required
 def template_detail(request, template_id):
@@ -245,35 +191,7 @@ def template_detail(request, template_id):
     Contract template detail view showing template information and related contracts.
     """
     template = get_object_or_404(ContractTemplate, id=template_id)
-    related_contracts = Contract.objects.filter(template=template).select_related('tenant')
-
-    # Get compliance statistics for each related contract
-    for contract in related_contracts:
-        # Get the latest reporting period with a compliance report
-        latest_period = ReportingPeriod.objects.filter(
-            contract=contract,
-            compliance_report__isnull=False
-        ).order_by('-end_date').first()
-
-        if latest_period:
-            try:
-                report = latest_period.compliance_report
-                items = report.items.all()
-                compliant_count = items.filter(is_compliant=True).count()
-                total_count = items.count()
-
-                if total_count > 0:
-                    contract.compliance_percentage = (compliant_count / total_count) * 100
-                else:
-                    contract.compliance_percentage = None
-
-                contract.latest_report_date = report.generated_at
-            except ComplianceReport.DoesNotExist:
-                contract.compliance_percentage = None
-                contract.latest_report_date = None
-        else:
-            contract.compliance_percentage = None
-            contract.latest_report_date = None
+    related_contracts = Contract.objects.filter(template=template).with_latest_compliance().select_related('tenant')
 
     context = {
         'template': template,
@@ -290,8 +208,10 @@ def party_detail(request, party_id):
     """
     party = get_object_or_404(Party, id=party_id)
 
-    # Get all contracts where this party is associated
-    contracts = party.contracts.all().select_related('tenant', 'template')
+    # Get the page of contracts where this party is associated
+    contracts = party.contracts.with_latest_compliance().select_related('tenant', 'template')
+    list_context = contract_list_context(request, contracts)
+    contracts = list_context['page']
 
     # Separate contracts where party is buyer vs seller
     buyer_contracts = []
@@ -303,64 +223,32 @@ def party_detail(request, party_id):
         elif party.type == 'SELLER':
             seller_contracts.append(contract)
 
-    # Get compliance statistics for each contract
-    for contract in contracts:
-        # Get the latest reporting period with a compliance report
-        latest_period = ReportingPeriod.objects.filter(
-            contract=contract,
-            compliance_report__isnull=False
-        ).order_by('-end_date').first()
-
-        if latest_period:
-            try:
-                report = latest_period.compliance_report
-                items = report.items.all()
-                compliant_count = items.filter(is_compliant=True).count()
-                total_count = items.count()
-
-                if total_count > 0:
-                    contract.compliance_percentage = (compliant_count / total_count) * 100
-                else:
-                    contract.compliance_percentage = None
-
-                contract.latest_report_date = report.generated_at
-            except ComplianceReport.DoesNotExist:
-                contract.compliance_percentage = None
-                contract.latest_report_date = None
-        else:
-            contract.compliance_percentage = None
-            contract.latest_report_date = None
-
     context = {
         'party': party,
         'buyer_contracts': buyer_contracts,
         'seller_contracts': seller_contracts,
+        **list_context,
     }
 
     return render(request, 'contracts/party_detail.html', context)
 
-def _build_sla_tree(sla, report_items):
+@login_required
+def export_compliance(request):
     """
-    Helper function to build a tree structure of SLAs with their report items.
+    Stream compliance report items as CSV or XLSX, filtered by the ``tenant``,
+    ``contract``, ``start``, ``end`` and ``status`` query parameters.
     """
-    # Find the report item for this SLA
-    report_item = None
-    for item in report_items:
-        if item.sla_id == sla.id:
-            report_item = item
-            break
-
-    # Build node for this SLA
-    node = {
-        'sla': sla,
-        'report_item': report_item,
-        'children': []
-    }
-
-    # Add children recursively
-    for child_sla in sla.children.all():
-        child_node = _build_sla_tree(child_sla, report_items)
-        if child_node:
-            node['children'].append(child_node)
+    format = request.GET.get('format', 'csv')
+    if format not in EXPORT_WRITERS:
+        return HttpResponseBadRequest(f'Unsupported format, expected one of {", ".join(EXPORT_WRITERS)}')
+    try:
+        filters = parse_export_filters(request.GET)
+    except ValueError as e:
+        return HttpResponseBadRequest(str(e))
 
-    return node
+    response = StreamingHttpResponse(
+        EXPORT_WRITERS[format](export_rows(**filters)),
+        content_type=EXPORT_CONTENT_TYPES[format],
+    )
+    response['Content-Disposition'] = f'attachment; filename="compliance.{format}"'
+    return response